@@ -1,7 +1,11 @@
+import os
 import torch
 import open_clip
+import cv2
 import torch.nn.functional as F
 from PIL import Image
+from src.core.analysis.preprocessing import TensorPreprocessor
+from src.utils.onnx_backend import OnnxImageEncoder
 from src.utils.logger import logger
 from src.utils.config_loader import cfg 
 
@@ -51,6 +55,35 @@ class ActionRecognizer:
         self.text_embeddings = self._encode_text(self.prompts)
         logger.info(f"Monitoring actions: {self.prompts}")
 
+        # Softmax temperature (CLIP's logit scale); 100 matches the trained CoCa value
+        self.logit_scale = float(cfg['action'].get('logit_scale', 100.0))
+
+        # 4. Batching: how many clips may share one encode_image call
+        self.max_batch_size = max(1, cfg['action'].get('max_batch_size', 8))
+
+        # 5. Image transform: 'tensor' (batched, no PIL) or 'pil' (open_clip reference transform)
+        self.preprocess_mode = cfg['action'].get('preprocess', 'tensor')
+        self.tensor_preprocess = TensorPreprocessor(
+            image_size=getattr(self.model.visual, 'image_size', 224),
+            mean=getattr(self.model.visual, 'image_mean', None),
+            std=getattr(self.model.visual, 'image_std', None),
+            device=self.device,
+            half=self.device == 'cuda'
+        )
+
+        # 6. Image tower backend: 'torch' (eager) or 'onnx' (ONNX Runtime, optional INT8)
+        self.backend = cfg['action'].get('backend', 'torch')
+        self.onnx_encoder = None
+        if self.backend == 'onnx':
+            weights_name = os.path.splitext(os.path.basename(pretrained))[0]
+            self.onnx_encoder = OnnxImageEncoder(
+                self.model,
+                name=f"{model_name}_{weights_name}_image",
+                image_size=self.tensor_preprocess.image_size,
+                quantize=cfg['action'].get('quantize', 'none')
+            )
+            logger.info(f"Phase 2 image tower running on ONNX Runtime: {self.onnx_encoder.model_path}")
+
     def _encode_text(self, text_list):
         """
         Converts text strings into mathematical vectors.
@@ -75,34 +108,114 @@ class ActionRecognizer:
         if not frame_list:
             return None
 
+        return self.get_action_scores({0: frame_list}).get(0)
+
+    def get_action_scores(self, clips, cache=None):
+        """
+        Batched version of get_action_score.
+        Input: Dictionary { tracker_id: [window_size Numpy Images] }
+        Output: Dictionary { tracker_id: { "punching": 0.85, ... } }
+
+        Every clip in the batch goes through ONE encode_image call, which keeps
+        the CPU/GPU saturated instead of paying the per-call overhead per track.
+        The number of clips per forward pass is capped by action.max_batch_size.
+
+        If an EmbeddingCache is given and the clips carry `frame_ids`, only crops
+        that were never seen before are encoded; the rest come from the cache.
+        """
+        results = {}
+        pending = [(tracker_id, clip) for tracker_id, clip in clips.items() if clip]
+
+        for start in range(0, len(pending), self.max_batch_size):
+            chunk = pending[start:start + self.max_batch_size]
+
+            # 1. Split every clip into cached embeddings and crops still to encode
+            rows_per_clip = []
+            to_encode = []
+            for tracker_id, clip in chunk:
+                frame_ids = getattr(clip, 'frame_ids', None) if cache is not None else None
+                rows = []
+                for i, crop in enumerate(clip):
+                    cached = cache.get(tracker_id, frame_ids[i]) if frame_ids else None
+                    if cached is None:
+                        to_encode.append(crop)
+                    rows.append(cached)
+                rows_per_clip.append((tracker_id, frame_ids, rows))
+
+            # 2. Run the AI (one forward pass for every new crop of the chunk)
+            try:
+                new_features = self._encode_images(to_encode) if to_encode else None
+            except Exception as e:
+                logger.error(f"Image encoding failed: {e}")
+                for tracker_id, _ in chunk:
+                    results[tracker_id] = None
+                continue
+
+            # 3. Fill the gaps, remember the new embeddings and score each clip
+            offset = 0
+            for tracker_id, frame_ids, rows in rows_per_clip:
+                for i, row in enumerate(rows):
+                    if row is not None:
+                        continue
+                    rows[i] = new_features[offset]
+                    offset += 1
+                    if frame_ids:
+                        cache.put(tracker_id, frame_ids[i], rows[i])
+                results[tracker_id] = self._score_clip(torch.stack(rows))
+
+        return results
+
+    def _encode_images(self, frame_list):
+        """
+        Preprocesses and encodes a flat list of crops.
+        Output: Normalized image embeddings, one row per crop.
+        """
         # 1. Preprocess Images (Numpy -> Tensor)
-        try:
-            # Stack all 16 frames into one batch
-            images = [self.preprocess(Image.fromarray(f)).unsqueeze(0) for f in frame_list]
-            image_batch = torch.cat(images).to(self.device)
+        if self.preprocess_mode == 'pil':
+            image_batch = self._preprocess_pil(frame_list)
+        else:
+            image_batch = self.tensor_preprocess(frame_list)
+
+        # 2. Encode and normalize (Required for Cosine Similarity)
+        if self.onnx_encoder is not None:
+            # The exported tower already normalizes
+            image_features = self.onnx_encoder(image_batch)
+            return image_features.to(self.device, dtype=self.text_embeddings.dtype)
 
-            # Convert to FP16 if using GPU
-            if self.device == 'cuda':
-                image_batch = image_batch.half()
-                
-        except Exception as e:
-            logger.error(f"Image preprocessing failed: {e}")
-            return None
-        
-        # 2. Run the AI
         with torch.no_grad():
             image_features = self.model.encode_image(image_batch)
             image_features /= image_features.norm(dim=-1, keepdim=True)
 
-            # 3. Calculate Similarity (The Dot Product)
-            raw_similarity = image_features @ self.text_embeddings.T   
-            scaled_similarity = 100.0 * raw_similarity
-            # 4. Softmax to get percentages (0.0 to 1.0)
-            probs = F.softmax(scaled_similarity, dim=-1)            
-            # 5. Aggregate (Take the average score across the 16 frames)
-            avg_scores = probs.mean(dim=0).cpu().numpy()
+        return image_features
+
+    def _preprocess_pil(self, frame_list):
+        """
+        Reference path: the open_clip PIL transform, one crop at a time.
+        """
+        # Crops come from OpenCV (BGR); PIL expects RGB
+        images = [self.preprocess(Image.fromarray(cv2.cvtColor(f, cv2.COLOR_BGR2RGB))).unsqueeze(0) for f in frame_list]
+        image_batch = torch.cat(images).to(self.device)
+
+        # Convert to FP16 if using GPU
+        if self.device == 'cuda':
+            image_batch = image_batch.half()
+
+        return image_batch
+
+    def _score_clip(self, image_features):
+        """
+        Turns the normalized image features of ONE clip into a score dictionary.
+        """
+        with torch.no_grad():
+            # 1. Calculate Similarity (The Dot Product)
+            raw_similarity = image_features @ self.text_embeddings.T
+            scaled_similarity = self.logit_scale * raw_similarity
+            # 2. Softmax to get percentages (0.0 to 1.0)
+            probs = F.softmax(scaled_similarity, dim=-1)
+            # 3. Aggregate (Take the average score across the clip frames)
+            avg_scores = probs.mean(dim=0).float().cpu().numpy()
             max_raw_sim = raw_similarity.mean(dim=0).max().item()
-            
+
         # Map scores back to text labels
         result = {prompt: score for prompt, score in zip(self.prompts, avg_scores)}
         # --- THE OSR GATEKEEPER ---
@@ -113,4 +226,4 @@ class ActionRecognizer:
            # Return a dummy result that forces the State Machine into IDLE
             return {"unknown_benign_activity": 1.0}
 
-        return result
\ No newline at end of file
+        return result
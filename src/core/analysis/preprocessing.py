@@ -0,0 +1,53 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+from open_clip import OPENAI_DATASET_MEAN, OPENAI_DATASET_STD
+
+
+class TensorPreprocessor:
+    """
+    Fast path for the Phase 2 image transform.
+    Responsibility:
+    1. Takes the 224x224 uint8 BGR crops produced by EvidenceManager.
+    2. Converts BGR -> RGB and applies the CLIP mean/std normalization as one
+       batched tensor op, without the per-frame PIL round-trip.
+    """
+    def __init__(self, image_size=224, mean=None, std=None, device='cpu', half=False):
+        if isinstance(image_size, int):
+            image_size = (image_size, image_size)
+        self.image_size = tuple(image_size)
+        self.device = device
+        self.half = half
+
+        mean = mean or OPENAI_DATASET_MEAN
+        std = std or OPENAI_DATASET_STD
+
+        # Fold the 1/255 scaling into the constants: (x/255 - m)/s == (x - 255m)/(255s)
+        self.pixel_mean = torch.tensor(mean, device=device).view(1, 3, 1, 1) * 255.0
+        self.pixel_std = torch.tensor(std, device=device).view(1, 3, 1, 1) * 255.0
+
+    def __call__(self, frames):
+        """
+        Input: (N, H, W, 3) uint8 BGR array, or a list of (H, W, 3) crops
+        Output: (N, 3, H, W) normalized RGB tensor on the target device
+        """
+        # 1. Numpy -> Tensor (zero-copy when a stacked array is passed in)
+        if not isinstance(frames, np.ndarray):
+            frames = np.stack(frames)
+        batch = torch.from_numpy(np.ascontiguousarray(frames)).to(self.device)
+
+        # 2. BGR -> RGB and NHWC -> NCHW
+        batch = batch.flip(-1).permute(0, 3, 1, 2).float()
+
+        # 3. Only resize if the crops do not already match the model input
+        if tuple(batch.shape[-2:]) != self.image_size:
+            batch = F.interpolate(batch, size=self.image_size, mode='bicubic', align_corners=False)
+
+        # 4. Normalize (one broadcasted op for the whole batch)
+        batch = (batch - self.pixel_mean) / self.pixel_std
+
+        # Convert to FP16 if using GPU
+        if self.half:
+            batch = batch.half()
+
+        return batch
@@ -1,7 +1,8 @@
-import cv2
-import base64
+import time
 from .interface import IVisionReasoner
+from .keyframes import KeyframeSampler, encode_jpeg_base64, read_keyframes_sequential
 from src.utils.config_loader import cfg
+from src.utils.logger import logger
 
 class BaseVisionReasoner(IVisionReasoner):
     """
@@ -20,24 +21,23 @@ class BaseVisionReasoner(IVisionReasoner):
         self.jpeg_quality = cfg['vlm']['extraction'].get('jpeg_quality', 80)
         self.prompt = cfg['vlm'].get('prompt', "Analyze frames. Output JSON.")
 
+    def create_keyframe_sampler(self) -> KeyframeSampler:
+        """Sampler fed by the incident writer, so keyframes are ready when the file closes."""
+        return KeyframeSampler(self.num_frames, self.resize_dim, self.jpeg_quality)
+
+    def _get_keyframes(self, video_path: str, frames_b64: list = None) -> list:
+        """Keyframes captured during recording if available, otherwise read back from the file."""
+        if frames_b64:
+            return frames_b64
+        return self._extract_frames_as_base64(video_path)
+
     def _extract_frames_as_base64(self, video_path: str) -> list:
         """
-        Extracts evenly-spaced frames from the incident video.
+        Extracts evenly-spaced frames from the incident video (single sequential pass).
         """
-        cap = cv2.VideoCapture(video_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames == 0: return []
-            
-        step = max(1, total_frames // self.num_frames)
-        frame_indices = [i * step for i in range(self.num_frames)]
-        
-        base64_frames = []
-        for idx in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-            ret, frame = cap.read()
-            if ret:
-                frame = cv2.resize(frame, self.resize_dim)
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
-                base64_frames.append(base64.b64encode(buffer).decode('utf-8'))
-        cap.release()
-        return base64_frames
\ No newline at end of file
+        start = time.perf_counter()
+        frames = read_keyframes_sequential(video_path, self.num_frames)
+        base64_frames = [encode_jpeg_base64(frame, self.resize_dim, self.jpeg_quality) for frame in frames]
+        logger.info(f"Keyframes read back from file: {len(base64_frames)} in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms ({video_path})")
+        return base64_frames
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .interface import IVisionReasoner
+from src.utils.logger import logger
+
+
+def dhash(image_b64: str) -> int:
+    """64-bit difference hash of one base64 JPEG keyframe (robust to re-encoding and small shifts)."""
+    data = np.frombuffer(base64.b64decode(image_b64), dtype=np.uint8)
+    gray = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+class CachedVisionReasoner(IVisionReasoner):
+    """
+    Result cache in front of any vision reasoner.
+    Responsibility:
+    1. Keys every report by the perceptual hashes (dHash) of its keyframes plus the
+       model id and prompt, so a repeating scene reuses the previous VLM answer.
+    2. Matches within a tolerance (mean Hamming distance per keyframe), expires entries
+       after `ttl_seconds` and evicts the least recently used beyond `max_entries`.
+    3. Persists to a JSON file so the cache survives restarts, and counts its hit rate.
+    Everything else (keyframe sampler, settings) is forwarded to the wrapped reasoner.
+    """
+    def __init__(self, inner, path=None, ttl_seconds=600, max_entries=256, max_hamming=6):
+        self.inner = inner
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_hamming = max_hamming
+
+        model_id = getattr(inner, 'model_id', type(inner).__name__)
+        prompt = getattr(inner, 'prompt', '')
+        self.signature = hashlib.sha1(f"{model_id}\n{prompt}".encode()).hexdigest()[:16]
+
+        self.entries = OrderedDict()  # key -> { signature, hashes, report, created, source }, LRU last
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def __getattr__(self, name):
+        # Only called for attributes this class does not define
+        if name == 'inner':
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def analyze_incident(self, video_path: str, frames_b64: list = None) -> dict:
+        frames_b64 = frames_b64 or self.inner._extract_frames_as_base64(video_path)
+        hashes = self._hash_frames(frames_b64)
+        cached = self._lookup(hashes, video_path)
+        if cached is not None:
+            return cached
+
+        report = self.inner.analyze_incident(video_path, frames_b64=frames_b64)
+        self._store(hashes, report, video_path)
+        return report
+
+    async def analyze_incident_async(self, video_path: str, frames_b64: list = None) -> dict:
+        frames_b64 = frames_b64 or await asyncio.to_thread(self.inner._extract_frames_as_base64, video_path)
+        hashes = await asyncio.to_thread(self._hash_frames, frames_b64)
+        cached = self._lookup(hashes, video_path)
+        if cached is not None:
+            return cached
+
+        report = await self.inner.analyze_incident_async(video_path, frames_b64=frames_b64)
+        await asyncio.to_thread(self._store, hashes, report, video_path)
+        return report
+
+    def cache_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    # --- Internals ---
+
+    @staticmethod
+    def _hash_frames(frames_b64):
+        hashes = []
+        for image in frames_b64 or []:
+            try:
+                hashes.append(dhash(image))
+            except Exception:
+                return [] # Undecodable keyframe: never cache
+        return hashes
+
+    def _distance(self, a, b):
+        """Mean Hamming distance per keyframe, or None if the clips are not comparable."""
+        if len(a) != len(b) or not a:
+            return None
+        return sum(bin(x ^ y).count("1") for x, y in zip(a, b)) / len(a)
+
+    def _lookup(self, hashes, video_path):
+        if not hashes:
+            return None
+
+        now = time.time()
+        with self._lock:
+            best_key, best_distance = None, None
+            for key, entry in list(self.entries.items()):
+                if now - entry['created'] > self.ttl_seconds:
+                    del self.entries[key]
+                    continue
+                if entry['signature'] != self.signature:
+                    continue
+                distance = self._distance(hashes, entry['hashes'])
+                if distance is not None and distance <= self.max_hamming and \
+                        (best_distance is None or distance < best_distance):
+                    best_key, best_distance = key, distance
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(best_key)
+            entry = self.entries[best_key]
+
+        logger.info(f"VLM cache hit for {video_path} (same scene as {entry['source']}, "
+                    f"distance {best_distance:.1f} bits, hit rate {self.cache_stats()['hit_rate']:.0%})")
+        return dict(copy.deepcopy(entry['report']), cache_hit=True, cached_from=entry['source'])
+
+    def _store(self, hashes, report, video_path):
+        # Failed analyses are not worth remembering
+        if not hashes or not isinstance(report, dict) or 'error' in report:
+            return
+
+        key = hashlib.sha1(f"{self.signature}:{hashes}".encode()).hexdigest()
+        with self._lock:
+            # Own copy: callers may keep using (and mutating) the report they got back
+            self.entries[key] = {"signature": self.signature, "hashes": hashes, "report": copy.deepcopy(report),
+                                 "created": time.time(), "source": video_path}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable VLM cache {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, entry in saved.items():
+            if now - entry['created'] <= self.ttl_seconds:
+                entry['hashes'] = [int(h, 16) for h in entry['hashes']]
+                self.entries[key] = entry
+        logger.info(f"VLM cache loaded: {len(self.entries)} entries from {self.path}")
+
+    def _save(self):
+        """Atomic rewrite (called with the lock held). Hashes are stored as hex strings."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".partial"
+        data = {key: dict(entry, hashes=[f"{h:016x}" for h in entry['hashes']]) for key, entry in self.entries.items()}
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import os
 from .base_strategy import BaseVisionReasoner
 from src.utils.logger import logger
@@ -14,22 +16,59 @@ class CloudQwenStrategy(BaseVisionReasoner):
     def __init__(self):
         super().__init__()
         self.model_id = cfg['vlm'].get('cloud_model_id', 'qwen-vl-max')
+        # DashScope's OpenAI-compatible endpoint (both the sync and the async path)
+        self.base_url = cfg['vlm'].get('cloud_base_url', 'https://dashscope.aliyuncs.com/compatible-mode/v1')
+        self.client = None
+        self.async_client = None
         logger.info(f"Cloud VLM Strategy Initialized: {self.model_id}")
 
-    def analyze_incident(self, video_path: str) -> dict:
+    def analyze_incident(self, video_path: str, frames_b64: list = None) -> dict:
         """
         Analyzes the incident video using the cloud-based Qwen model.
         """
+        b64_images = self._get_keyframes(video_path, frames_b64)
+        if not b64_images: return {"threat_detected": False, "description": "Read error."}
+
         try:
-            import dashscope
-            dashscope.api_key = os.getenv("QWEN_API_KEY", "MISSING_KEY")
-            b64_images = self._extract_frames_as_base64(video_path)
-            
-            response = dashscope.MultiModalConversation.call(
-                model=self.model_id,
-                messages=[{'role': 'user', 'content': [{"image": f"data:image/jpeg;base64,{img}"} for img in b64_images] + [{"text": self.prompt}]}]
-            )
-            return {"threat_detected": True, "description": "Cloud processing placeholder."}
-        except ImportError:
-            logger.error("Cloud SDK 'dashscope' not installed. Run: pip install dashscope")
-            return {"threat_detected": False}
\ No newline at end of file
+            if self.client is None:
+                import httpx
+                self.client = httpx.Client(timeout=cfg['vlm'].get('workers', {}).get('timeout_seconds', 60))
+            response = self.client.post(**self._chat_request(b64_images))
+            response.raise_for_status()
+            return self._parse_report(response.json())
+        except Exception as e:
+            logger.error(f"Cloud Qwen API Failed: {e}")
+            return {"error": str(e), "threat_detected": False}
+
+    async def analyze_incident_async(self, video_path: str, frames_b64: list = None) -> dict:
+        """
+        Non-blocking variant for the Phase 3 worker pool (one pooled httpx client).
+        Errors are raised so the pool can retry.
+        """
+        b64_images = frames_b64 or await asyncio.to_thread(self._extract_frames_as_base64, video_path)
+        if not b64_images: return {"threat_detected": False, "description": "Read error."}
+
+        if self.async_client is None:
+            import httpx
+            self.async_client = httpx.AsyncClient(timeout=None) # The pool applies the timeout
+        response = await self.async_client.post(**self._chat_request(b64_images))
+        response.raise_for_status()
+        return self._parse_report(response.json())
+
+    def _chat_request(self, b64_images: list) -> dict:
+        """Chat-completions request shared by both paths (keyword arguments of client.post)."""
+        return {
+            "url": f"{self.base_url.rstrip('/')}/chat/completions",
+            "headers": {"Authorization": f"Bearer {os.getenv('QWEN_API_KEY', 'MISSING_KEY')}"},
+            "json": {
+                "model": self.model_id,
+                "messages": [{"role": "user", "content":
+                    [{"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img}"}} for img in b64_images] +
+                    [{"type": "text", "text": self.prompt}]}],
+                "response_format": {"type": "json_object"}
+            }
+        }
+
+    @staticmethod
+    def _parse_report(body: dict) -> dict:
+        return json.loads(body["choices"][0]["message"]["content"])
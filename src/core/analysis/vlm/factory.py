@@ -21,7 +21,7 @@ class VisionReasonerFactory:
         if not strategy_config:
             logger.error(f"No strategy configured for VLM provider: {provider}. Falling back to LocalOllamaStrategy.")
             from .local_strategy import LocalOllamaStrategy
-            return LocalOllamaStrategy()
+            return VisionReasonerFactory._with_cache(LocalOllamaStrategy())
             
         module_path = strategy_config.get('module')
         class_name = strategy_config.get('class_name')
@@ -31,8 +31,23 @@ class VisionReasonerFactory:
             module = importlib.import_module(module_path)
             # Retrieve the class from the module
             StrategyClass = getattr(module, class_name)
-            # Instantiate and return the strategy class
-            return StrategyClass()
+            # Instantiate and return the strategy class (behind the result cache, if enabled)
+            return VisionReasonerFactory._with_cache(StrategyClass())
         except (ImportError, AttributeError) as e:
             logger.error(f"Failed to dynamically load VLM Strategy {module_path}.{class_name}: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    @staticmethod
+    def _with_cache(reasoner: IVisionReasoner) -> IVisionReasoner:
+        cache_cfg = cfg['vlm'].get('cache', {})
+        if not cache_cfg.get('enabled', False):
+            return reasoner
+
+        from .cache import CachedVisionReasoner
+        return CachedVisionReasoner(
+            reasoner,
+            path=cache_cfg.get('path', 'data/cache/vlm_cache.json'),
+            ttl_seconds=cache_cfg.get('ttl_seconds', 600),
+            max_entries=cache_cfg.get('max_entries', 256),
+            max_hamming=cache_cfg.get('max_hamming', 6)
+        )
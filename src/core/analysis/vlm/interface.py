@@ -1,7 +1,18 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class IVisionReasoner(ABC):
     @abstractmethod
-    def analyze_incident(self, video_path: str) -> dict:
-        """Analyze video footage and return a structured JSON threat report."""
-        pass
\ No newline at end of file
+    def analyze_incident(self, video_path: str, frames_b64: list = None) -> dict:
+        """
+        Analyze video footage and return a structured JSON threat report.
+        frames_b64: keyframes already captured during recording (skips re-reading the file).
+        """
+        pass
+
+    async def analyze_incident_async(self, video_path: str, frames_b64: list = None) -> dict:
+        """
+        Async variant used by the Phase 3 worker pool. Unlike analyze_incident, failures
+        are raised (the pool retries them). Default: the blocking call in a thread.
+        """
+        return await asyncio.to_thread(self.analyze_incident, video_path, frames_b64)
@@ -0,0 +1,77 @@
+import cv2
+import base64
+
+
+def encode_jpeg_base64(frame, resize_dim, jpeg_quality):
+    """Resizes (if needed) and JPEG-encodes one frame for the VLM request."""
+    if (frame.shape[1], frame.shape[0]) != tuple(resize_dim):
+        frame = cv2.resize(frame, resize_dim)
+    _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality])
+    return base64.b64encode(buffer).decode('utf-8')
+
+
+class KeyframeSampler:
+    """
+    Picks evenly spaced keyframes while an incident is being written.
+    Responsibility:
+    1. Sees every frame once, in order, without knowing the final clip length.
+    2. Keeps at most 2 * num_frames downscaled candidates: when full, every other
+       candidate is dropped and the sampling stride doubles.
+    3. Returns num_frames evenly spaced frames as soon as the recording closes,
+       so Phase 3 never has to reopen (and seek through) the incident MP4.
+    """
+    def __init__(self, num_frames=8, resize_dim=(480, 270), jpeg_quality=80):
+        self.num_frames = max(1, num_frames)
+        self.resize_dim = tuple(resize_dim)
+        self.jpeg_quality = jpeg_quality
+
+        self.candidates = []
+        self.stride = 1
+        self.seen = 0
+
+    def add(self, frame):
+        # Only candidates pay for the resize
+        if self.seen % self.stride == 0:
+            self.candidates.append(cv2.resize(frame, self.resize_dim))
+            if len(self.candidates) >= 2 * self.num_frames:
+                self.candidates = self.candidates[::2]
+                self.stride *= 2
+        self.seen += 1
+
+    def keyframes(self):
+        if len(self.candidates) <= self.num_frames:
+            return list(self.candidates)
+        step = len(self.candidates) / self.num_frames
+        return [self.candidates[int(i * step)] for i in range(self.num_frames)]
+
+    def encode(self):
+        """The selected keyframes as base64 JPEGs, oldest first."""
+        return [encode_jpeg_base64(frame, self.resize_dim, self.jpeg_quality) for frame in self.keyframes()]
+
+
+def read_keyframes_sequential(video_path, num_frames):
+    """
+    Fallback when no in-memory keyframes exist: ONE sequential pass over the file.
+    grab() skips the colour conversion of unwanted frames and nothing seeks,
+    so the cost is a single linear decode instead of one GOP decode per keyframe.
+    """
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total_frames <= 0:
+        cap.release()
+        return []
+
+    step = max(1, total_frames // num_frames)
+    wanted = {i * step for i in range(num_frames)}
+    last = max(wanted)
+
+    frames = []
+    for idx in range(last + 1):
+        if not cap.grab():
+            break
+        if idx in wanted:
+            ret, frame = cap.retrieve()
+            if ret:
+                frames.append(frame)
+    cap.release()
+    return frames
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import ollama
 from .base_strategy import BaseVisionReasoner
@@ -14,15 +15,17 @@ class LocalOllamaStrategy(BaseVisionReasoner):
     """
     def __init__(self):
         super().__init__()
-        self.client = ollama
+        self.host = cfg['vlm'].get('host') # None: OLLAMA_HOST or http://localhost:11434
+        self.client = ollama.Client(host=self.host)
+        self.async_client = None # Created inside the Phase 3 event loop (pooled HTTP connections)
         self.model_id = cfg['vlm'].get('model_id', 'qwen2.5vl:3b')
         logger.info(f"Local VLM Strategy Initialized: {self.model_id}")
 
-    def analyze_incident(self, video_path: str) -> dict:
+    def analyze_incident(self, video_path: str, frames_b64: list = None) -> dict:
         """
         Analyzes the incident video using the local Ollama model.
         """
-        b64_images = self._extract_frames_as_base64(video_path)
+        b64_images = self._get_keyframes(video_path, frames_b64)
         if not b64_images: return {"threat_detected": False, "description": "Read error."}
 
         try:
@@ -34,4 +37,20 @@ class LocalOllamaStrategy(BaseVisionReasoner):
             return json.loads(response['message']['content'])
         except Exception as e:
             logger.error(f"Local Ollama API Failed: {e}")
-            return {"error": str(e), "threat_detected": False}
\ No newline at end of file
+            return {"error": str(e), "threat_detected": False}
+
+    async def analyze_incident_async(self, video_path: str, frames_b64: list = None) -> dict:
+        """
+        Non-blocking variant for the Phase 3 worker pool. Errors are raised so the pool can retry.
+        """
+        b64_images = frames_b64 or await asyncio.to_thread(self._extract_frames_as_base64, video_path)
+        if not b64_images: return {"threat_detected": False, "description": "Read error."}
+
+        if self.async_client is None:
+            self.async_client = ollama.AsyncClient(host=self.host)
+        response = await self.async_client.chat(
+            model=self.model_id,
+            messages=[{'role': 'user', 'content': self.prompt, 'images': b64_images}],
+            format='json'
+        )
+        return json.loads(response['message']['content'])
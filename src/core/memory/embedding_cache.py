@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+
+class EmbeddingCache:
+    """
+    The Embedding Memory.
+    Responsibility:
+    1. Remembers the normalized CoCa image embedding of every crop it has seen.
+    2. Keyed by (tracker_id, frame_index) so a crop is encoded exactly ONCE,
+       even though consecutive sliding windows share most of their frames.
+
+    Each track owns a small ring buffer: once it holds `capacity` frames, the
+    oldest frame is overwritten by the newest one.
+    """
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+
+        # The Main Database: { tracker_id: OrderedDict{ frame_index: embedding } }
+        self.entries = {}
+
+        # The analysis worker writes while the main loop evicts
+        self._lock = threading.Lock()
+
+    def open(self, tracker_id):
+        """Creates the ring for a newly tracked person."""
+        with self._lock:
+            self.entries.setdefault(tracker_id, OrderedDict())
+
+    def get(self, tracker_id, frame_index):
+        """Returns the cached embedding, or None if this crop was never encoded."""
+        with self._lock:
+            ring = self.entries.get(tracker_id)
+            if ring is None:
+                return None
+            return ring.get(frame_index)
+
+    def put(self, tracker_id, frame_index, embedding):
+        """Stores one embedding, overwriting the oldest slot when the ring is full."""
+        with self._lock:
+            ring = self.entries.get(tracker_id)
+            # The person already left (evicted while the clip was being encoded)
+            if ring is None:
+                return
+            ring[frame_index] = embedding
+            while len(ring) > self.capacity:
+                ring.popitem(last=False)
+
+    def evict(self, tracker_id):
+        """Drops every embedding of a track (called when the person leaves)."""
+        with self._lock:
+            self.entries.pop(tracker_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(ring) for ring in self.entries.values())
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    Offline store of normalized CoCa image embeddings for a whole dataset.
+    Responsibility:
+    1. Keeps every encoded crop once, plus the exact clips (windows) Phase 2 would
+       have scored, indexed by video, track and frame.
+    2. Re-scores those clips against any prompt set with pure matrix multiplies,
+       so prompt / temperature / OSR sweeps never touch the image tower again.
+
+    Layout (one folder per store):
+        embeddings.bin  (N, D) float16 raw, memory-mapped
+        rows.npy        (N, 3) int64   [video_id, tracker_id, frame_index] of each embedding
+        clips.npy       (C, W) int64   row indices of every clip, oldest frame first
+        clip_index.npy  (C, 3) int64   [video_id, tracker_id, frame_index] when the clip was emitted
+        videos.json     [{ video, label, frames }, ...] (video_id = position)
+        meta.json       window_size, stride, dim, model
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "videos.json"), "r", encoding="utf-8") as f:
+            self.videos = json.load(f)
+
+        self.rows = np.load(os.path.join(path, "rows.npy"), mmap_mode="r")
+        self.clips = np.load(os.path.join(path, "clips.npy"), mmap_mode="r")
+        self.clip_index = np.load(os.path.join(path, "clip_index.npy"), mmap_mode="r")
+        self.embeddings = np.memmap(
+            os.path.join(path, "embeddings.bin"), dtype=np.float16, mode="r",
+            shape=(len(self.rows), self.meta["dim"])
+        ) if len(self.rows) else np.zeros((0, self.meta["dim"]), np.float16)
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    def load_text_cache(self):
+        """{ prompt: embedding } computed by earlier sweeps (same model as the images)."""
+        path = os.path.join(self.path, "text_embeddings.npz")
+        if not os.path.exists(path):
+            return {}
+        data = np.load(path)
+        return {str(p): e for p, e in zip(data["prompts"], data["embeddings"])}
+
+    def save_text_cache(self, cache):
+        prompts = list(cache)
+        np.savez(os.path.join(self.path, "text_embeddings.npz"),
+                 prompts=np.array(prompts), embeddings=np.stack([cache[p] for p in prompts]))
+
+    def score(self, text_embeddings, logit_scale=100.0, osr_threshold=0.25, chunk_size=65536):
+        """
+        Scores every stored clip against a prompt set, exactly like ActionRecognizer._score_clip.
+        Input: (P, D) normalized text embeddings
+        Output: (top_prompt, top_score) arrays of length C; top_prompt is -1 where the
+                OSR gate fires ("unknown_benign_activity", score 1.0).
+        """
+        if len(self.clips) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        text = np.asarray(text_embeddings, dtype=np.float32)
+
+        # 1. Raw cosine similarity of every stored crop against every prompt
+        #    (chunked so a large store is never fully expanded to float32)
+        raw = np.empty((len(self.rows), len(text)), dtype=np.float32)           # (N, P)
+        for start in range(0, len(self.rows), chunk_size):
+            chunk = np.asarray(self.embeddings[start:start + chunk_size], dtype=np.float32)
+            raw[start:start + chunk_size] = chunk @ text.T
+
+        # 2. Per-frame softmax with the chosen temperature
+        logits = logit_scale * raw
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        # 3. Average over each clip's frames
+        clip_rows = np.asarray(self.clips)
+        avg_scores = probs[clip_rows].mean(axis=1)                              # (C, P)
+        max_raw_sim = raw[clip_rows].mean(axis=1).max(axis=1)                   # (C,)
+
+        top_prompt = avg_scores.argmax(axis=1)
+        top_score = avg_scores[np.arange(len(top_prompt)), top_prompt]
+
+        # 4. The OSR gatekeeper
+        unknown = max_raw_sim < osr_threshold
+        top_prompt[unknown] = -1
+        top_score[unknown] = 1.0
+        return top_prompt, top_score
+
+
+class EmbeddingStoreWriter:
+    """
+    Builds a store video by video. Published atomically by close().
+    """
+    def __init__(self, path, window_size, stride, model_name):
+        self.path = path
+        self.tmp_path = path + ".partial"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+
+        self.meta = {"window_size": window_size, "stride": stride, "model": model_name, "dim": None}
+        self.videos = []
+        self.rows, self.clips, self.clip_index = [], [], []
+        self.embeddings_file = open(os.path.join(self.tmp_path, "embeddings.bin"), "wb")
+
+        self._row_of = {}   # (tracker_id, frame_index) -> row, for the current video
+        self._video_id = -1
+
+    def begin_video(self, video_path, label):
+        self._video_id = len(self.videos)
+        self.videos.append({"video": os.path.abspath(video_path), "label": label, "frames": 0})
+        self._row_of = {}
+
+    def end_video(self, frames):
+        self.videos[self._video_id]["frames"] = frames
+
+    def has(self, tracker_id, frame_index):
+        return (tracker_id, frame_index) in self._row_of
+
+    def add_embeddings(self, keys, embeddings):
+        """Appends new rows. keys: [(tracker_id, frame_index)], embeddings: (K, D) normalized."""
+        embeddings = np.asarray(embeddings, dtype=np.float16)
+        if self.meta["dim"] is None:
+            self.meta["dim"] = int(embeddings.shape[1])
+        self.embeddings_file.write(np.ascontiguousarray(embeddings).tobytes())
+        for tracker_id, frame_index in keys:
+            self._row_of[(tracker_id, frame_index)] = len(self.rows)
+            self.rows.append((self._video_id, tracker_id, frame_index))
+
+    def add_clip(self, tracker_id, frame_ids):
+        """Records one emitted clip (every frame must already have a row)."""
+        self.clips.append([self._row_of[(tracker_id, f)] for f in frame_ids])
+        self.clip_index.append((self._video_id, tracker_id, frame_ids[-1]))
+
+    def close(self):
+        self.embeddings_file.close()
+        self.meta["dim"] = self.meta["dim"] or 0
+        window = self.meta["window_size"]
+        np.save(os.path.join(self.tmp_path, "rows.npy"), np.asarray(self.rows, dtype=np.int64).reshape(-1, 3))
+        np.save(os.path.join(self.tmp_path, "clips.npy"), np.asarray(self.clips, dtype=np.int64).reshape(-1, window))
+        np.save(os.path.join(self.tmp_path, "clip_index.npy"), np.asarray(self.clip_index, dtype=np.int64).reshape(-1, 3))
+        with open(os.path.join(self.tmp_path, "videos.json"), "w", encoding="utf-8") as f:
+            json.dump(self.videos, f, indent=4)
+        with open(os.path.join(self.tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=4)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+        return EmbeddingStore(self.path)
@@ -3,6 +3,18 @@ import numpy as np
 from collections import deque
 from src.utils.logger import logger
 from src.utils.config_loader import cfg
+from src.core.memory.embedding_cache import EmbeddingCache
+
+
+class Clip(list):
+    """
+    A window of crops that also remembers which frame each crop came from.
+    Behaves exactly like the plain list the Action Engine always received.
+    """
+    def __init__(self, crops, frame_ids):
+        super().__init__(crops)
+        self.frame_ids = list(frame_ids)
+
 
 class EvidenceManager:
     """
@@ -10,60 +22,94 @@ class EvidenceManager:
     Responsibility: 
     1. Holds a temporal buffer (history) for each tracked person.
     2. Pre-processes crops (Resize to 224x224) for the Action Engine.
+    3. Owns the per-track embedding cache so each crop is encoded only once.
     """
-    def __init__(self):
+    def __init__(self, embedding_cache=None, namespace=None):
         # Configuration
         self.window_size = cfg['action'].get('window_size', 16)
+        # Temporal stride: keep one crop every `stride` frames of each track.
+        # A window therefore covers window_size * stride frames of real time.
+        self.stride = max(1, cfg['action'].get('stride', 1))
         
         # Standard input size for CoCa/CLIP
         self.target_size = (224, 224) 
         
         # The Main Database: { tracker_id: deque([frame1, frame2, ...]) }
         self.buffers = {}
-        
-    def update(self, frame, detections):
+        # Frame index of every crop in the buffers: { tracker_id: deque([idx1, idx2, ...]) }
+        self.frame_ids = {}
+        # Frames seen per track since it appeared (drives the stride sampling)
+        self.track_ages = {}
+        self.frame_index = 0
+
+        # Embeddings survive for a little more than one window (the worker may lag behind)
+        self.embedding_cache = embedding_cache or EmbeddingCache(capacity=2 * self.window_size)
+        # Several cameras may share one cache; the namespace keeps their track IDs apart
+        self.namespace = namespace
+
+    def update(self, frame, detections, crops=None):
         """
         Input: 
             - frame: The full raw video frame (H, W, 3)
             - detections: The Supervision Detections object (boxes, tracker_ids)
+            - crops: Optional precomputed 224x224 crops, one per detection (e.g. from the
+                     Phase 1 cache). When given, `frame` is not needed and may be None.
         
         Output:
             - ready_clips: A Dictionary { tracker_id: [window_size frames] } of who is ready to be analyzed.
         """
         active_ids = set()
         ready_clips = {}
+        frame_index = self.frame_index
+        self.frame_index += 1
 
         # If no detections, return empty
         if detections.tracker_id is None:
             return ready_clips
 
         # 1. Loop through every detected person
-        for box, tracker_id in zip(detections.xyxy, detections.tracker_id):
+        for i, (box, tracker_id) in enumerate(zip(detections.xyxy, detections.tracker_id)):
             tracker_id = int(tracker_id)
             active_ids.add(tracker_id)
             
-            # 2. Crop and Resize (The "Smart" Pre-processing)
-            crop = self._process_crop(frame, box)
+            # 2. Stride Sampling: only every `stride`-th frame of a track is kept
+            age = self.track_ages.get(tracker_id, 0)
+            self.track_ages[tracker_id] = age + 1
+            if age % self.stride != 0:
+                continue
+
+            # 3. Crop and Resize (The "Smart" Pre-processing)
+            crop = crops[i] if crops is not None else self._process_crop(frame, box)
             
-            # 3. Initialize buffer if new person
+            # 4. Initialize buffer if new person
             if tracker_id not in self.buffers:
                 self.buffers[tracker_id] = deque(maxlen=self.window_size)
+                self.frame_ids[tracker_id] = deque(maxlen=self.window_size)
+                self.embedding_cache.open(self.cache_key(tracker_id))
             
-            # 4. Add to Memory
+            # 5. Add to Memory
             self.buffers[tracker_id].append(crop)
+            self.frame_ids[tracker_id].append(frame_index)
             
-            # 5. Check if we have enough history to analyze
-            # We only send data if we have exactly window_size frames
+            # 6. Check if we have enough history to analyze
+            # We only send data if we have exactly window_size frames,
+            # and only on the frame that just added a new sample
             if len(self.buffers[tracker_id]) == self.window_size:
                 # Convert deque to list for the AI Engine
-                ready_clips[tracker_id] = list(self.buffers[tracker_id])
+                ready_clips[tracker_id] = Clip(self.buffers[tracker_id], self.frame_ids[tracker_id])
 
-        # 6. Garbage Collection (Memory Cleanup)
+        # 7. Garbage Collection (Memory Cleanup)
         # If a person left the frame, delete their buffer to save RAM
         self._cleanup_inactive_ids(active_ids)
 
         return ready_clips
 
+    def cache_key(self, tracker_id):
+        """The key under which this track's embeddings live in the (possibly shared) cache."""
+        if self.namespace is None:
+            return tracker_id
+        return (self.namespace, tracker_id)
+
     def _process_crop(self, frame, box):
         """
         Safe cropping logic. Handles cases where the box goes off-screen.
@@ -97,4 +143,7 @@ class EvidenceManager:
         
         for mid in existing_ids:
             if mid not in active_ids:
-                del self.buffers[mid]
\ No newline at end of file
+                del self.buffers[mid]
+                del self.frame_ids[mid]
+                self.track_ages.pop(mid, None)
+                self.embedding_cache.evict(self.cache_key(mid))
@@ -1,83 +1,160 @@
+import heapq
+import threading
 import time
+from collections import namedtuple
+
+# Read-only copy of one track's state, safe to use outside the lock
+StateView = namedtuple("StateView", ["level", "label", "strike_count", "vlm_summary"])
 
 class ThreatState:
-    def __init__(self):
+    __slots__ = ("level", "label", "vlm_summary", "last_seen", "strike_count")
+
+    def __init__(self, now):
         self.level = 0           # 0: Green (Safe), 1: Orange (Suspect), 2: Red (Confirmed)
         self.label = "analyzing" # Text to display on the bounding box
         self.vlm_summary = None  # The detailed JSON report from Qwen
-        self.last_seen = time.time()
+        self.last_seen = now     # time.monotonic() of the last update
         self.strike_count = 0    # How many times Phase 2 triggered
 
+    def view(self):
+        return StateView(self.level, self.label, self.strike_count, self.vlm_summary)
+
 class SecurityStateManager:
     """
     The Brain (Logic Layer).
-    Responsibility: 
+    Responsibility:
     1. Decides if someone is suspicious (Orange) or confirmed dangerous (Red).
     2. Holds the "Memory" of the incident (the VLM report).
+    Thread-safe: the analysis worker, the VLM pool and the render loop share it.
+    Readers get StateView copies (view / snapshot) instead of the live objects.
     """
-    def __init__(self, alert_trigger_count=3):
+    def __init__(self, alert_trigger_count=3, expiry_seconds=10.0):
         self.states = {} # Maps tracker_id to ThreatState
         self.trigger_count = alert_trigger_count
+        self.expiry_seconds = expiry_seconds
+
+        self._lock = threading.Lock()
+        # Min-heap of (last_seen, tracker_id). Entries go stale when a track is seen again;
+        # stale ones are skipped on pop, so cleanup only touches what may have expired.
+        self._expiry = []
+
+    def _ensure_exists(self, tracker_id, now):
+        """Call with the lock held."""
+        state = self.states.get(tracker_id)
+        if state is None:
+            state = self.states[tracker_id] = ThreatState(now)
+        self._touch(tracker_id, state, now)
+        return state
 
-    def _ensure_exists(self, tracker_id):
-        if tracker_id not in self.states:
-            self.states[tracker_id] = ThreatState()
-        self.states[tracker_id].last_seen = time.time()
-        return self.states[tracker_id]
+    def _touch(self, tracker_id, state, now):
+        state.last_seen = now
+        heapq.heappush(self._expiry, (now, tracker_id))
+
+        # Bound the stale entries (a track seen many times leaves many of them behind)
+        if len(self._expiry) > 4 * len(self.states) + 64:
+            self._expiry = [(s.last_seen, tid) for tid, s in self.states.items()]
+            heapq.heapify(self._expiry)
 
     def update_phase2(self, tracker_id, is_violent, action_label, confidence):
-        """Called multiple times per second by the fast CoCa model."""
-        state = self._ensure_exists(tracker_id)
-        
-        # INFINITE LATCH: If already Red, completely ignore Phase 2 updates.
-        if state.level == 2:
-            return
-
-        if is_violent:
-            state.strike_count += 1
-            if state.strike_count >= self.trigger_count:
-                state.level = 1 # Escalate to Orange
-                state.label = f"{action_label.upper()} ({confidence:.0%})"
+        """
+        Called multiple times per second by the fast CoCa model.
+        Returns the track's level after the update.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._ensure_exists(tracker_id, now)
+
+            # INFINITE LATCH: If already Red, completely ignore Phase 2 updates.
+            if state.level == 2:
+                return state.level
+
+            if is_violent:
+                state.strike_count += 1
+                if state.strike_count >= self.trigger_count:
+                    state.level = 1 # Escalate to Orange
+                    state.label = f"{action_label.upper()} ({confidence:.0%})"
+                else:
+                    state.label = f"suspicious ({state.strike_count}/{self.trigger_count})"
             else:
-                state.label = f"suspicious ({state.strike_count}/{self.trigger_count})"
-        else:
-            # If safe, reset strikes but keep level at 0
-            state.strike_count = 0
-            state.level = 0
-            state.label = f"{action_label} ({confidence:.0%})"
+                # If safe, reset strikes but keep level at 0
+                state.strike_count = 0
+                state.level = 0
+                state.label = f"{action_label} ({confidence:.0%})"
+            return state.level
 
     def update_phase3(self, tracker_id, threat_detected, vlm_summary):
         """Called once by the slow Qwen model when analysis finishes."""
-        state = self._ensure_exists(tracker_id)
-        
-        if threat_detected:
-            # LOCK TO RED
-            state.level = 2 
-            state.label = "CONFIRMED THREAT"
-            state.vlm_summary = vlm_summary
-        else:
-            # False alarm. Downgrade from Orange back to Green.
-            state.level = 0
-            state.strike_count = 0
-
-    def get_ui_data(self, tracker_id):
-        """Returns the color and text for the Visualizer."""
-        if tracker_id not in self.states:
+        now = time.monotonic()
+        with self._lock:
+            state = self._ensure_exists(tracker_id, now)
+
+            if threat_detected:
+                # LOCK TO RED
+                state.level = 2
+                state.label = "CONFIRMED THREAT"
+                state.vlm_summary = vlm_summary
+            else:
+                # False alarm. Downgrade from Orange back to Green.
+                state.level = 0
+                state.strike_count = 0
+
+    def mark_unverified(self, tracker_id, reason):
+        """
+        Phase 3 failed (timeout, retries exhausted). The track keeps its level: a slow VLM
+        is no evidence that the scene is safe.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._ensure_exists(tracker_id, now)
+            if state.level == 2:
+                return
+            state.label = "UNVERIFIED (VLM failed)"
+            state.vlm_summary = reason
+
+    def view(self, tracker_id):
+        """StateView of one track, or None if it has no state."""
+        with self._lock:
+            state = self.states.get(tracker_id)
+            return state.view() if state else None
+
+    def snapshot(self, tracker_ids=None):
+        """
+        Consistent { tracker_id: StateView } taken under one lock, e.g. once per rendered frame.
+        tracker_ids: restrict to these tracks (default: all).
+        """
+        with self._lock:
+            if tracker_ids is None:
+                return {tid: state.view() for tid, state in self.states.items()}
+            return {tid: self.states[tid].view() for tid in tracker_ids if tid in self.states}
+
+    def get_ui_data(self, tracker_id, snapshot=None):
+        """Returns the color and text for the Visualizer (from `snapshot` if given)."""
+        state = snapshot.get(tracker_id) if snapshot is not None else self.view(tracker_id)
+        if state is None:
             return (0, 255, 0), "analyzing" # Default Green
-            
-        state = self.states[tracker_id]
+
         if state.level == 0: color = (0, 255, 0)       # Green
         elif state.level == 1: color = (0, 165, 255)   # Orange
         else: color = (0, 0, 255)                      # Red
-        
+
         return color, state.label
 
     def cleanup(self, active_ids):
-        """Removes memory of IDs that have left the camera for more than 10 seconds."""
-        current_time = time.time()
-        expired_ids = [
-            tid for tid, state in self.states.items() 
-            if tid not in active_ids and (current_time - state.last_seen > 10.0)
-        ]
-        for tid in expired_ids:
-            del self.states[tid]
\ No newline at end of file
+        """
+        Removes memory of IDs that have left the camera for more than `expiry_seconds`.
+        Costs O(expired log n): only heap entries older than the cutoff are looked at.
+        """
+        now = time.monotonic()
+        cutoff = now - self.expiry_seconds
+        active_ids = set(active_ids)
+
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < cutoff:
+                seen, tid = heapq.heappop(self._expiry)
+                state = self.states.get(tid)
+                if state is None or state.last_seen != seen:
+                    continue # Stale entry: the track was seen again (or already removed)
+                if tid in active_ids:
+                    self._touch(tid, state, now) # Still on camera
+                else:
+                    del self.states[tid]
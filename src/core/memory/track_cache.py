@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import supervision as sv
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+
+CROP_SHAPE = (224, 224, 3)
+
+
+class CachedTracks:
+    """
+    Read side of one cached video.
+    Everything is memory-mapped: replaying a video touches only the rows it reads.
+
+    Layout of a cache entry (one folder per key):
+        offsets.npy     (n_frames + 1,) int64   rows of frame i are offsets[i]:offsets[i+1]
+        xyxy.npy        (M, 4) float32
+        confidence.npy  (M,) float32
+        tracker_id.npy  (M,) int64
+        crops.bin       (M, 224, 224, 3) uint8, raw (optional)
+        meta.json       video path, frame count, detector config
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.n_frames = self.meta["n_frames"]
+
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.xyxy = np.load(os.path.join(path, "xyxy.npy"), mmap_mode="r")
+        self.confidence = np.load(os.path.join(path, "confidence.npy"), mmap_mode="r")
+        self.tracker_id = np.load(os.path.join(path, "tracker_id.npy"), mmap_mode="r")
+
+        self.crops = None
+        crops_path = os.path.join(path, "crops.bin")
+        if self.meta.get("has_crops") and len(self.xyxy) > 0:
+            self.crops = np.memmap(crops_path, dtype=np.uint8, mode="r", shape=(len(self.xyxy), *CROP_SHAPE))
+
+    def frames(self):
+        """
+        Yields (frame_index, detections, crops) in video order.
+        `crops` is None when the cache was built without them.
+        """
+        for i in range(self.n_frames):
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            detections = sv.Detections(
+                xyxy=np.array(self.xyxy[start:end]),
+                confidence=np.array(self.confidence[start:end]),
+                class_id=np.zeros(end - start, dtype=int),
+                tracker_id=np.array(self.tracker_id[start:end])
+            )
+            crops = self.crops[start:end] if self.crops is not None else None
+            yield i, detections, crops
+
+
+class TrackCacheWriter:
+    """
+    Write side: collects one video's Phase 1 output frame by frame.
+    The entry only becomes visible (atomic rename) once the whole video is written.
+    """
+    def __init__(self, final_path, meta, store_crops=False):
+        self.final_path = final_path
+        self.tmp_path = final_path + ".partial"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+
+        self.meta = meta
+        self.store_crops = store_crops
+        self.offsets = [0]
+        self.xyxy, self.confidence, self.tracker_id = [], [], []
+        self.crops_file = open(os.path.join(self.tmp_path, "crops.bin"), "wb") if store_crops else None
+
+    def add(self, detections, crops=None):
+        """Records the tracked detections (and their 224x224 crops) of the next frame."""
+        n = len(detections)
+        if n:
+            self.xyxy.append(np.asarray(detections.xyxy, dtype=np.float32))
+            confidence = detections.confidence if detections.confidence is not None else np.ones(n)
+            self.confidence.append(np.asarray(confidence, dtype=np.float32))
+            tracker_id = detections.tracker_id if detections.tracker_id is not None else np.full(n, -1)
+            self.tracker_id.append(np.asarray(tracker_id, dtype=np.int64))
+            if self.crops_file is not None:
+                for crop in crops:
+                    self.crops_file.write(np.ascontiguousarray(crop, dtype=np.uint8).tobytes())
+        self.offsets.append(self.offsets[-1] + n)
+
+    def close(self):
+        """Flushes everything to disk and publishes the entry."""
+        if self.crops_file is not None:
+            self.crops_file.close()
+
+        np.save(os.path.join(self.tmp_path, "offsets.npy"), np.asarray(self.offsets, dtype=np.int64))
+        np.save(os.path.join(self.tmp_path, "xyxy.npy"),
+                np.concatenate(self.xyxy) if self.xyxy else np.zeros((0, 4), np.float32))
+        np.save(os.path.join(self.tmp_path, "confidence.npy"),
+                np.concatenate(self.confidence) if self.confidence else np.zeros(0, np.float32))
+        np.save(os.path.join(self.tmp_path, "tracker_id.npy"),
+                np.concatenate(self.tracker_id) if self.tracker_id else np.zeros(0, np.int64))
+
+        self.meta.update({"n_frames": len(self.offsets) - 1, "has_crops": self.store_crops})
+        with open(os.path.join(self.tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=4)
+
+        shutil.rmtree(self.final_path, ignore_errors=True)
+        os.replace(self.tmp_path, self.final_path)
+        logger.info(f"Phase 1 cache written: {self.final_path} ({self.offsets[-1]} boxes)")
+
+    def abort(self):
+        if self.crops_file is not None:
+            self.crops_file.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class TrackCache:
+    """
+    On-disk cache of Phase 1 output (YOLO + ByteTrack) per video.
+    Responsibility:
+    1. Keys every entry by the video file's content hash + the detector config.
+    2. Lets prompt / threshold / trigger-count sweeps replay tracks instead of
+       decoding and detecting every frame again.
+    """
+    def __init__(self, cache_dir="data/cache/phase1", store_crops=False):
+        self.cache_dir = cache_dir
+        self.store_crops = store_crops
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _file_hash(video_path, chunk_size=1 << 20):
+        digest = hashlib.sha1()
+        with open(video_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _detector_signature(self):
+        """Everything that changes Phase 1 output. Prompts and thresholds are NOT part of it."""
+        settings = {"detection": cfg['detection'], "crops": self.store_crops}
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+    def key_for(self, video_path):
+        return f"{self._file_hash(video_path)[:20]}_{self._detector_signature()}"
+
+    def load(self, video_path, key=None):
+        """Returns CachedTracks, or None on a cache miss."""
+        path = os.path.join(self.cache_dir, key or self.key_for(video_path))
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        return CachedTracks(path)
+
+    def writer(self, video_path, key=None):
+        key = key or self.key_for(video_path)
+        meta = {"video": os.path.abspath(video_path), "key": key, "detection": cfg['detection']}
+        return TrackCacheWriter(os.path.join(self.cache_dir, key), meta, store_crops=self.store_crops)
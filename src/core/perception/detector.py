@@ -3,6 +3,36 @@ from ultralytics import YOLO
 import supervision as sv
 from src.utils.config_loader import cfg
 from src.utils.logger import logger
+from src.utils import onnx_backend
+from src.core.perception.propagation import BoxPropagator
+from src.core.perception.regions import DetectionRegions
+
+
+class TrackingSession:
+    """
+    Per-stream tracking state.
+    Responsibility:
+    1. Owns the stream's ByteTrack instance (track IDs never leak between cameras).
+    2. Remembers where the last YOLO keyframe was and propagates boxes in between.
+    3. Holds the camera's detection regions (ROIs / tiles), None for full-frame YOLO.
+    """
+    def __init__(self, tracker, detection_interval=1, propagation="velocity", regions=None):
+        self.tracker = tracker
+        self.detection_interval = max(1, detection_interval)
+        self.propagator = BoxPropagator(method=propagation)
+        self.regions = regions
+        self.frame_index = 0
+        self.force_keyframe = False
+
+    def is_keyframe(self):
+        """YOLO runs on the first frame and then every `detection_interval` frames."""
+        return (self.force_keyframe or self.propagator.keyframe_detections is None
+                or self.frame_index % self.detection_interval == 0)
+
+    def resume(self):
+        """After frames were skipped (e.g. motion gate), detect again instead of propagating stale boxes."""
+        self.force_keyframe = True
+
 
 class Detector:
     def __init__(self):
@@ -12,34 +42,137 @@ class Detector:
         self.conf_thresh = cfg['detection']['confidence_threshold']
         self.target_classes = cfg['detection']['target_classes']
 
+        # Detection skipping: run YOLO every N frames, propagate boxes in between
+        self.detection_interval = max(1, cfg['detection'].get('detection_interval', 1))
+        self.propagation = cfg['detection'].get('propagation', 'velocity')
+
         logger.info(f"Loading YOLO model from {model_path} to {self.device}...")
         
         # 2. Initialize YOLO
+        # backend "torch": PyTorch eager. backend "onnx": exported (optionally INT8) model on ONNX Runtime
+        self.backend = cfg['detection'].get('backend', 'torch')
         try:
             self.model = YOLO(model_path)
-            self.model.to(self.device)
+            if self.backend == 'onnx':
+                self._load_onnx(model_path)
+            else:
+                self.model.to(self.device)
             
             # Warmup (prevents lag on first frame)
-            self.model(torch.zeros(1, 3, 640, 640).to(self.device).half() if self.device == 'cuda' else torch.zeros(1, 3, 640, 640))
+            self.model(torch.zeros(1, 3, 640, 640).to(self.device).half() if self.device == 'cuda' and self.backend != 'onnx' else torch.zeros(1, 3, 640, 640))
+
+            if self.backend == 'onnx':
+                self._configure_onnx_session()
             
         except Exception as e:
             logger.critical(f"Failed to load YOLO model: {e}")
             raise e
 
         # 3. Initialize ByteTrack (via Supervision)
+        # The default session serves single-camera use; each extra stream gets its own
         logger.info("Initializing ByteTrack...")
-        self.tracker = sv.ByteTrack(
+        self.session = self.create_session()
+
+    def _load_onnx(self, model_path):
+        """Swaps the PyTorch weights for the cached ONNX export."""
+        quantize = cfg['detection'].get('quantize', 'none')
+        self.onnx_path = onnx_backend.export_yolo(self.model, model_path, quantize=quantize)
+        logger.info(f"Detector running on ONNX Runtime: {self.onnx_path}")
+        self.model = YOLO(self.onnx_path, task='detect')
+
+    def _configure_onnx_session(self):
+        """
+        Ultralytics opens its own onnxruntime session with default thread pools.
+        Replace it with one that honours onnx.intra_op_threads / inter_op_threads.
+        """
+        backend = getattr(getattr(self.model, 'predictor', None), 'model', None)
+        if backend is None or not hasattr(backend, 'session'):
+            logger.warning("Could not reach the YOLO ONNX session; using default thread settings.")
+            return
+        backend.session = onnx_backend.create_session(self.onnx_path)
+
+    def create_tracker(self, detection_interval=1):
+        """
+        Creates an independent ByteTrack instance.
+        ByteTrack counts lost frames in update() calls; when YOLO only runs every
+        N frames we lower its frame rate so lost tracks still expire after ~1 s.
+        """
+        return sv.ByteTrack(
             track_activation_threshold=0.25,
             lost_track_buffer=30,
             minimum_matching_threshold=0.8,
-            frame_rate=30
+            frame_rate=max(1, round(30 / detection_interval))
+        )
+
+    def create_session(self, detection_interval=None, propagation=None, regions=None):
+        """
+        Creates the tracking state of one stream.
+        One YOLO model can serve many cameras, but track IDs must never leak between them.
+        """
+        interval = detection_interval or self.detection_interval
+        return TrackingSession(
+            self.create_tracker(interval),
+            detection_interval=interval,
+            propagation=propagation or self.propagation,
+            regions=regions
         )
 
-    def process_frame(self, frame):
+    def create_regions(self, rois=None, tiling=None):
         """
-        Input: Raw Frame (numpy array)
+        Detection regions of one camera: its ROI polygons plus `detection.tiling`
+        (overridden per camera by `tiling`). Returns None for plain full-frame detection.
+        """
+        settings = dict(cfg['detection'].get('tiling', {}), **(tiling or {}))
+        regions = DetectionRegions(
+            rois=rois,
+            tiled=settings.get('enabled', False),
+            tile_size=settings.get('tile_size', 640),
+            overlap=settings.get('overlap', 0.2),
+            nms_threshold=settings.get('nms_threshold', 0.5)
+        )
+        return regions if regions.enabled else None
+
+    def process_frame(self, frame, session=None):
+        """
+        Input: Raw Frame (numpy array), optional per-stream TrackingSession
         Output: Tracked Detections (Supervision object)
         """
+        session = session or self.session
+        frame_index = session.frame_index
+        is_keyframe = session.is_keyframe()
+        session.frame_index += 1
+        session.force_keyframe = False
+
+        # Between keyframes: move the last tracked boxes, keep their IDs
+        if not is_keyframe:
+            return session.propagator.propagate(frame, frame_index)
+
+        detections = self.detect(frame, session.regions)
+
+        # D. Update Tracker
+        detections = session.tracker.update_with_detections(detections)
+        session.propagator.on_keyframe(detections, frame, frame_index)
+
+        return detections
+
+    def detect(self, frame, regions=None):
+        """
+        Raw YOLO detections (persons only), before tracking.
+        With `regions` (DetectionRegions), only the ROI / tile crops are inferred, as one
+        batch, and the results come back merged in frame coordinates.
+        """
+        if regions is not None:
+            crops = regions.crops(frame)
+            if not crops:
+                return sv.Detections.empty()
+            if self.backend == 'onnx':
+                # The ONNX export has a fixed batch of 1 (dynamic=False): one crop per call
+                results = [self.model(crop, verbose=False, conf=self.conf_thresh)[0] for crop in crops]
+            else:
+                results = self.model(crops, verbose=False, conf=self.conf_thresh)
+            per_window = [self._persons(sv.Detections.from_ultralytics(r)) for r in results]
+            return regions.merge(per_window, frame.shape)
+
         # A. Inference
         results = self.model(frame, verbose=False, conf=self.conf_thresh)[0]
 
@@ -47,11 +180,10 @@ class Detector:
         detections = sv.Detections.from_ultralytics(results)
 
         # C. Filter (Keep only Persons - Class ID 0)
-        # We assume '0' is person in the config. 
-        # Ideally, we filter by the list in config, but for now we hardcode class_id comparison for speed
-        detections = detections[detections.class_id == 0]
-
-        # D. Update Tracker
-        detections = self.tracker.update_with_detections(detections)
+        return self._persons(detections)
 
-        return detections
\ No newline at end of file
+    @staticmethod
+    def _persons(detections):
+        # We assume '0' is person in the config.
+        # Ideally, we filter by the list in config, but for now we hardcode class_id comparison for speed
+        return detections[detections.class_id == 0]
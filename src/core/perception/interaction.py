@@ -0,0 +1,138 @@
+import numpy as np
+from collections import deque
+
+
+def nearest_neighbor_distances(xyxy, radius):
+    """
+    Spatial grid over one frame's boxes.
+    For every box: distance to the closest other box center, in box sizes
+    (center distance / mean of the two box sizes). np.inf when nobody is within `radius`.
+    Boxes are bucketed by center into cells of `radius` x largest box size, so only the
+    3x3 neighbouring cells are compared instead of every pair.
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    nearest = np.full(len(xyxy), np.inf, dtype=np.float32)
+    if len(xyxy) < 2:
+        return nearest
+
+    centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+    sizes = np.maximum(xyxy[:, 2:] - xyxy[:, :2], 1.0).max(axis=1)
+
+    # 1. Bucket centers. Two boxes within `radius` are at most radius * max(size) apart
+    cell = max(radius * float(sizes.max()), 1.0)
+    cells = {}
+    for i, key in enumerate(map(tuple, np.floor(centers / cell).astype(np.int64))):
+        cells.setdefault(key, []).append(i)
+
+    # 2. Compare each cell with its neighbourhood only
+    for (cx, cy), members in cells.items():
+        candidates = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in cells.get((cx + dx, cy + dy), ())]
+        if len(candidates) < 2:
+            continue
+        members, candidates = np.asarray(members), np.asarray(candidates)
+        distances = np.linalg.norm(centers[members, None] - centers[None, candidates], axis=2)
+        normalized = distances / ((sizes[members, None] + sizes[None, candidates]) / 2)
+        normalized[members[:, None] == candidates[None, :]] = np.inf
+        nearest[members] = normalized.min(axis=1)
+
+    nearest[nearest > radius] = np.inf
+    return nearest
+
+
+class InteractionGate:
+    """
+    Decides which ready clips of a stream are worth a Phase 2 (CoCa) slot.
+    Responsibility:
+    1. Passes tracks that are close enough to someone else to interact (fight, kick, punch).
+    2. Passes a lone person only once every `isolated_sample_frames` (0: never).
+    3. Fall path: watches each track's box shape every frame (no model). A box that goes from
+       upright to lying within `fall_window_frames` lets the track's clips through for
+       `fall_hold_frames`, so CoCa can still confirm "person falling down".
+    Everything is counted in frames of the stream, so file replays behave like live cameras.
+    """
+    def __init__(self, radius=1.5, isolated_sample_frames=150, fall_detection=True,
+                 standing_ratio=1.3, lying_ratio=0.9, fall_window_frames=30, fall_hold_frames=60):
+        self.radius = radius
+        self.isolated_sample_frames = max(0, int(isolated_sample_frames))
+        self.fall_detection = fall_detection
+        self.standing_ratio = standing_ratio
+        self.lying_ratio = lying_ratio
+        self.fall_window_frames = max(2, int(fall_window_frames))
+        self.fall_hold_frames = max(1, int(fall_hold_frames))
+
+        self.frame_index = 0
+        self.shapes = {}         # tracker_id -> deque of recent box height / width ratios
+        self.fall_until = {}     # tracker_id -> last frame index its clips pass as a fall
+        self.last_sampled = {}   # tracker_id -> frame index of its last isolated sample
+
+        # --- Counters ---
+        self.clips_in = 0
+        self.clips_interacting = 0
+        self.clips_sampled = 0
+        self.clips_fall = 0
+        self.falls = 0
+
+    def select(self, ready_clips, detections):
+        """Call once per frame. Returns the subset of `ready_clips` that goes to Phase 2."""
+        frame = self.frame_index
+        self.frame_index += 1
+        if detections.tracker_id is None or len(detections) == 0:
+            self._forget(set())
+            return {}
+
+        tracker_ids = [int(tid) for tid in detections.tracker_id]
+        self._observe_shapes(tracker_ids, detections.xyxy, frame)
+        self._forget(set(tracker_ids))
+        if not ready_clips:
+            return ready_clips
+
+        nearest = dict(zip(tracker_ids, nearest_neighbor_distances(detections.xyxy, self.radius)))
+        selected = {}
+        for tracker_id, clip in ready_clips.items():
+            self.clips_in += 1
+            if np.isfinite(nearest.get(tracker_id, np.inf)):
+                self.clips_interacting += 1
+            elif self.fall_until.get(tracker_id, -1) >= frame:
+                self.clips_fall += 1
+            elif self._sample_due(tracker_id, frame):
+                self.last_sampled[tracker_id] = frame
+                self.clips_sampled += 1
+            else:
+                continue
+            selected[tracker_id] = clip
+        return selected
+
+    def stats(self):
+        passed = self.clips_interacting + self.clips_sampled + self.clips_fall
+        return {"clips_in": self.clips_in, "interacting": self.clips_interacting, "sampled": self.clips_sampled,
+                "fall": self.clips_fall, "gated": self.clips_in - passed, "falls": self.falls}
+
+    def _sample_due(self, tracker_id, frame):
+        """A lone person's first clip passes, then one every `isolated_sample_frames`."""
+        if not self.isolated_sample_frames:
+            return False
+        last = self.last_sampled.get(tracker_id)
+        return last is None or frame - last >= self.isolated_sample_frames
+
+    def _observe_shapes(self, tracker_ids, xyxy, frame):
+        """Cheap fall heuristic: height/width ratio dropping from upright to lying."""
+        if not self.fall_detection:
+            return
+        sizes = np.maximum(np.asarray(xyxy)[:, 2:] - np.asarray(xyxy)[:, :2], 1.0)
+        for tracker_id, (w, h) in zip(tracker_ids, sizes):
+            ratio = float(h / w)
+            history = self.shapes.get(tracker_id)
+            if history is None:
+                history = self.shapes[tracker_id] = deque(maxlen=self.fall_window_frames)
+            if ratio < self.lying_ratio and history and max(history) >= self.standing_ratio:
+                if self.fall_until.get(tracker_id, -1) < frame:
+                    self.falls += 1
+                self.fall_until[tracker_id] = frame + self.fall_hold_frames
+                history.clear() # One fall, one trigger
+            history.append(ratio)
+
+    def _forget(self, active_ids):
+        """Drops the per-track state of tracks that left the frame."""
+        for table in (self.shapes, self.fall_until, self.last_sampled):
+            for tracker_id in [tid for tid in table if tid not in active_ids]:
+                del table[tracker_id]
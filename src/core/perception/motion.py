@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap gate in front of Phase 1 and Phase 2.
+    Responsibility:
+    1. Scores motion on a small grayscale copy of the frame against a running-average
+       background (a few hundred microseconds per frame).
+    2. Keeps perception asleep while the score stays below `motion_threshold`;
+       wakes up on the first frame with motion and stays awake for `hold_frames`.
+    3. Counts seen / skipped frames so the saving per camera is visible.
+    """
+    def __init__(self, width=160, pixel_threshold=25, motion_threshold=0.002,
+                 hold_frames=60, background_alpha=0.05):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.hold_frames = max(1, int(hold_frames))
+        self.background_alpha = background_alpha
+
+        self.background = None   # float32 running average of the small gray frames
+        self.hold = 0            # Frames left before going back to sleep
+        self.awake = False       # Perception ran on the last frame (its update() returned True)
+        self.last_score = 0.0
+
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.wakeups = 0
+
+    def update(self, frame):
+        """
+        Feeds one frame. Returns True if perception should run on it.
+        """
+        self.frames_seen += 1
+        small = self._prepare(frame)
+
+        # First frame (or new resolution): nothing to compare with, run perception
+        if self.background is None or self.background.shape != small.shape:
+            self.background = small.astype(np.float32)
+            self.hold = self.hold_frames
+            self.awake = True
+            return True
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        self.last_score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        cv2.accumulateWeighted(small, self.background, self.background_alpha)
+
+        if self.last_score >= self.motion_threshold:
+            if not self.awake:
+                self.wakeups += 1 # Motion after at least one skipped frame
+            self.hold = self.hold_frames
+        elif self.hold > 0:
+            self.hold -= 1
+        else:
+            self.frames_skipped += 1
+            self.awake = False
+            return False
+
+        self.awake = True
+        return True
+
+    @property
+    def is_awake(self):
+        """True if perception ran on the last frame (the tracker has not missed any frame)."""
+        return self.awake
+
+    def skipped_ratio(self):
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
+
+    def stats(self):
+        return {"seen": self.frames_seen, "skipped": self.frames_skipped,
+                "skipped_ratio": self.skipped_ratio(), "wakeups": self.wakeups, "score": self.last_score}
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, int(round(h * self.width / w)))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
@@ -0,0 +1,100 @@
+import cv2
+import dataclasses
+import numpy as np
+
+
+class BoxPropagator:
+    """
+    Moves tracked boxes forward on frames where YOLO does not run.
+    Responsibility:
+    1. 'velocity': constant-velocity prediction from the last two YOLO keyframes.
+    2. 'flow': sparse Lucas-Kanade optical flow on a downscaled grayscale frame.
+    Track IDs are never changed, so EvidenceManager sees the same people.
+    """
+    def __init__(self, method="velocity", flow_scale=0.25, grid=3):
+        self.method = method
+        self.flow_scale = flow_scale
+        self.grid = grid
+
+        self.keyframe_detections = None
+        self.keyframe_index = 0
+        self.velocities = {}        # { tracker_id: (4,) pixels per frame }
+        self.current_xyxy = None    # Last propagated boxes ('flow' moves them frame by frame)
+        self.prev_gray = None
+
+    def on_keyframe(self, detections, frame, frame_index):
+        """Learns box velocities from a fresh set of tracked YOLO detections."""
+        if self.keyframe_detections is not None and detections.tracker_id is not None \
+                and self.keyframe_detections.tracker_id is not None:
+            elapsed = max(1, frame_index - self.keyframe_index)
+            previous = {int(t): box for box, t in zip(self.keyframe_detections.xyxy, self.keyframe_detections.tracker_id)}
+            velocities = {}
+            for box, tracker_id in zip(detections.xyxy, detections.tracker_id):
+                old_box = previous.get(int(tracker_id))
+                if old_box is not None:
+                    velocities[int(tracker_id)] = (box - old_box) / elapsed
+            self.velocities = velocities
+
+        self.keyframe_detections = detections
+        self.keyframe_index = frame_index
+        self.current_xyxy = detections.xyxy.copy()
+        if self.method == "flow":
+            self.prev_gray = self._to_gray(frame)
+
+    def propagate(self, frame, frame_index):
+        """Returns the keyframe detections with boxes moved to the current frame."""
+        detections = self.keyframe_detections
+        if detections is None or len(detections) == 0:
+            return detections
+
+        if self.method == "flow":
+            xyxy = self._flow_step(frame)
+        else:
+            elapsed = frame_index - self.keyframe_index
+            xyxy = detections.xyxy.copy()
+            if detections.tracker_id is not None:
+                for i, tracker_id in enumerate(detections.tracker_id):
+                    velocity = self.velocities.get(int(tracker_id))
+                    if velocity is not None:
+                        xyxy[i] += velocity * elapsed
+
+        # Keep the boxes inside the image
+        h, w = frame.shape[:2]
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, w - 1)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h - 1)
+        self.current_xyxy = xyxy
+
+        return dataclasses.replace(detections, xyxy=xyxy.astype(detections.xyxy.dtype))
+
+    def _to_gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+
+    def _flow_step(self, frame):
+        """Shifts every box by the median flow of a small point grid inside it."""
+        gray = self._to_gray(frame)
+        xyxy = self.current_xyxy.copy()
+
+        # 1. A grid x grid lattice of points inside each (downscaled) box
+        steps = (np.arange(self.grid) + 0.5) / self.grid
+        points = []
+        for x1, y1, x2, y2 in xyxy * self.flow_scale:
+            xs = x1 + steps * (x2 - x1)
+            ys = y1 + steps * (y2 - y1)
+            points.extend((x, y) for y in ys for x in xs)
+        points = np.float32(points).reshape(-1, 1, 2)
+
+        # 2. One pyramidal LK call for every box at once
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None)
+        self.prev_gray = gray
+
+        # 3. Median displacement per box (robust to points on the background)
+        per_box = self.grid * self.grid
+        flow = (new_points - points).reshape(len(xyxy), per_box, 2) / self.flow_scale
+        valid = status.reshape(len(xyxy), per_box).astype(bool)
+        for i in range(len(xyxy)):
+            if valid[i].any():
+                dx, dy = np.median(flow[i][valid[i]], axis=0)
+                xyxy[i] += (dx, dy, dx, dy)
+
+        return xyxy
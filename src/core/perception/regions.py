@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+import supervision as sv
+
+
+class DetectionRegions:
+    """
+    Where YOLO looks on a high-resolution camera.
+    Responsibility:
+    1. Turns the camera's ROI polygons into crop windows (their bounding rectangles),
+       or the whole frame when no ROI is set.
+    2. Optionally cuts every window into overlapping tiles of ~`tile_size` px, so YOLO's
+       640 px input keeps distant people at their native resolution.
+    3. Maps the per-crop detections back to frame coordinates, drops those whose
+       foot point lies outside the ROIs and merges the tile overlaps with NMS.
+    Polygons are lists of [x, y] points, in pixels or normalized (all values <= 1).
+    """
+    def __init__(self, rois=None, tiled=False, tile_size=640, overlap=0.2, nms_threshold=0.5):
+        self.rois = [np.asarray(polygon, dtype=np.float32) for polygon in (rois or [])]
+        self.tiled = tiled
+        self.tile_size = max(32, int(tile_size))
+        self.overlap = min(max(overlap, 0.0), 0.9)
+        self.nms_threshold = nms_threshold
+
+        # Windows and ROI mask depend on the resolution only: built once per frame shape
+        self._shape = None
+        self._windows = []
+        self._mask = None
+
+    @property
+    def enabled(self):
+        return bool(self.rois) or self.tiled
+
+    def windows(self, frame_shape):
+        """Crop windows (x1, y1, x2, y2) in frame pixels for this resolution."""
+        if frame_shape[:2] != self._shape:
+            self._build(frame_shape[:2])
+        return self._windows
+
+    def crops(self, frame):
+        """Views (no copies) of the frame for every window."""
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in self.windows(frame.shape)]
+
+    def merge(self, per_window, frame_shape):
+        """
+        per_window: one sv.Detections per window, in crop coordinates.
+        Returns a single sv.Detections in frame coordinates.
+        """
+        windows = self.windows(frame_shape)
+        parts = []
+        for (x1, y1, _, _), detections in zip(windows, per_window):
+            if len(detections) == 0:
+                continue
+            detections.xyxy = detections.xyxy + np.array([x1, y1, x1, y1], dtype=detections.xyxy.dtype)
+            parts.append(detections)
+        if not parts:
+            return sv.Detections.empty()
+
+        merged = sv.Detections.merge(parts)
+        if self._mask is not None:
+            merged = merged[self.inside_roi(merged)]
+        if len(windows) > 1 and len(merged) > 1:
+            merged = merged.with_nms(threshold=self.nms_threshold, class_agnostic=True)
+        return merged
+
+    def inside_roi(self, detections):
+        """True for boxes whose bottom-center (where the person stands) is inside an ROI."""
+        h, w = self._mask.shape
+        xs = np.clip(((detections.xyxy[:, 0] + detections.xyxy[:, 2]) / 2).astype(int), 0, w - 1)
+        ys = np.clip(detections.xyxy[:, 3].astype(int), 0, h - 1)
+        return self._mask[ys, xs]
+
+    def _build(self, shape):
+        h, w = shape
+        self._shape = shape
+
+        # 1. One window per ROI (bounding rectangle), else the full frame
+        if self.rois:
+            polygons = [self._to_pixels(polygon, w, h) for polygon in self.rois]
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(mask, polygons, 1)
+            self._mask = mask.astype(bool)
+            regions = []
+            for polygon in polygons:
+                x, y, bw, bh = cv2.boundingRect(polygon)
+                if bw > 0 and bh > 0:
+                    regions.append((x, y, min(x + bw, w), min(y + bh, h)))
+        else:
+            self._mask = None
+            regions = [(0, 0, w, h)]
+
+        # 2. Overlapping tiles inside each window
+        if self.tiled:
+            regions = [tile for region in regions for tile in self._tile(region)]
+        self._windows = regions
+
+    def _tile(self, region):
+        x1, y1, x2, y2 = region
+        stride = max(1, int(self.tile_size * (1.0 - self.overlap)))
+        xs = self._starts(x1, x2, stride)
+        ys = self._starts(y1, y2, stride)
+        return [(x, y, min(x + self.tile_size, x2), min(y + self.tile_size, y2)) for y in ys for x in xs]
+
+    def _starts(self, start, end, stride):
+        """Tile origins along one axis; the last tile is shifted back so it ends on the border."""
+        if end - start <= self.tile_size:
+            return [start]
+        starts = list(range(start, end - self.tile_size, stride))
+        starts.append(end - self.tile_size)
+        return starts
+
+    @staticmethod
+    def _to_pixels(polygon, w, h):
+        if polygon.size and polygon.max() <= 1.0:
+            polygon = polygon * np.array([w, h], dtype=np.float32)
+        return np.round(polygon).astype(np.int32).reshape(-1, 1, 2)
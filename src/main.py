@@ -1,10 +1,20 @@
+import argparse
 from src.utils.config_loader import cfg
 from src.pipelines.rapid_flow import RapidPipeline
 
 if __name__ == "__main__":
-    # Get video path from config
+    parser = argparse.ArgumentParser(description="Violence Action Detection pipeline")
+    parser.add_argument("--headless", action="store_true", default=None,
+                        help="Run without any display window (overrides system.headless)")
+    args = parser.parse_args()
+
+    # Get video path(s) from config
     video_path = cfg['paths']['input_source']
+    sources = cfg['paths'].get('input_sources') or []
     
     # Initialize and Run
-    app = RapidPipeline()
-    app.run(video_path)
\ No newline at end of file
+    app = RapidPipeline(headless=args.headless)
+    if sources:
+        app.run_streams(sources)
+    else:
+        app.run(video_path)
@@ -0,0 +1,187 @@
+import cv2
+import queue
+import threading
+import time
+import numpy as np
+
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+
+
+class IncidentRecording:
+    """
+    Handle of one incident file. The capture loop keeps it while the incident is open.
+    """
+    def __init__(self, stream, path, fps, size, threat_id, keyframes=None):
+        self.stream = stream
+        self.path = path
+        self.fps = fps
+        self.size = size              # (width, height)
+        self.threat_id = threat_id
+        self.keyframes = keyframes    # Optional KeyframeSampler fed with every written frame
+        self.keyframes_b64 = None     # Filled when the file is closed
+
+        self.pre_roll_frames = 0
+        self.frames_written = 0
+        self.frames_dropped = 0       # Post-event frames skipped because the writer lagged
+        self.failed = False
+
+
+class IncidentWriter:
+    """
+    Writes incident videos on a dedicated thread.
+    Responsibility:
+    1. Opens the VideoWriter and flushes the pre-roll off the capture loop.
+    2. Encodes the post-event frames in order; at most `queue_size` frames wait at once.
+       policy "drop": a full queue skips the frame (counted), capture never waits.
+       policy "block": capture waits up to `block_timeout` seconds, then drops.
+       Open and close messages do not count against that bound: they are never
+       dropped, and each one is handled after the frames queued before it.
+    3. Feeds the recording's keyframe sampler with every frame it writes.
+    4. Calls on_finished(recording) only after the file has been released.
+    """
+    def __init__(self, on_finished, queue_size=64, policy="drop", block_timeout=0.5):
+        self.on_finished = on_finished
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.queue = queue.Queue()  # Unbounded: the frame bound is frame_slots
+        self.frame_slots = threading.Semaphore(max(1, int(queue_size)))
+
+        # Totals over the whole run
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.incidents_finished = 0
+
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+
+    # --- Capture-loop side (cheap, never encodes) ---
+
+    def start(self, stream, path, fps, size, pre_roll, threat_id=None, keyframes=None):
+        """
+        Opens a new incident. `pre_roll` is an iterable of frames (oldest first) that
+        now belongs to the writer; it is consumed on the writer thread.
+        """
+        recording = IncidentRecording(stream, path, fps, size, threat_id, keyframes)
+        self.queue.put(("open", recording, pre_roll))
+        return recording
+
+    def write(self, recording, frame):
+        """
+        Queues one post-event frame. The frame is copied (the caller keeps drawing on it).
+        Returns False if the frame was dropped.
+        """
+        if recording.failed:
+            return False
+        if self.policy == "block":
+            admitted = self.frame_slots.acquire(timeout=self.block_timeout)
+        else:
+            admitted = self.frame_slots.acquire(blocking=False)
+        if not admitted:
+            recording.frames_dropped += 1
+            self.frames_dropped += 1
+            return False
+        self.queue.put(("frame", recording, np.array(frame, copy=True)))
+        return True
+
+    def finish(self, recording):
+        """
+        Closes the incident after the frames already queued for it.
+        The hand-off happens once the file is released.
+        """
+        self.queue.put(("close", recording, None))
+
+    def stop(self):
+        """Writes everything still queued, then stops the thread."""
+        self.queue.put(("stop", None, None))
+        self.thread.join()
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "written": self.frames_written,
+                "dropped": self.frames_dropped, "incidents": self.incidents_finished}
+
+    # --- Writer thread ---
+
+    def _writer_loop(self):
+        writers = {}  # recording -> cv2.VideoWriter
+        while True:
+            kind, recording, payload = self.queue.get()
+            try:
+                if kind == "stop":
+                    break
+                if kind == "open":
+                    try:
+                        writers[recording] = self._open(recording, payload)
+                    except Exception:
+                        recording.failed = True # close() must not hand a broken file to Phase 3
+                        raise
+                elif kind == "frame":
+                    self.frame_slots.release()
+                    writer = writers.get(recording)
+                    if writer is not None:
+                        with metrics.timer("incident_write"):
+                            writer.write(payload)
+                        if recording.keyframes is not None:
+                            recording.keyframes.add(payload)
+                        recording.frames_written += 1
+                        self.frames_written += 1
+                elif kind == "close":
+                    self._close(recording, writers.pop(recording, None))
+            except Exception as e:
+                logger.error(f"Incident writer error ({recording.path if recording else kind}): {e}")
+            finally:
+                self.queue.task_done()
+
+        # Never leave a half-written file behind
+        for recording, writer in writers.items():
+            self._close(recording, writer)
+
+    def _open(self, recording, pre_roll):
+        start = time.perf_counter()
+
+        # Using 'avc1' for H.264 web-safe encoding so it plays perfectly on GitHub
+        writer = cv2.VideoWriter(recording.path, cv2.VideoWriter_fourcc(*'avc1'), recording.fps, recording.size)
+        if not writer.isOpened():
+            logger.error(f"Could not open incident file for writing: {recording.path}")
+            recording.failed = True
+            return None
+
+        # Flush the PRE-EVENT buffer to file
+        try:
+            for frame in pre_roll:
+                writer.write(frame)
+                if recording.keyframes is not None:
+                    recording.keyframes.add(frame)
+                recording.pre_roll_frames += 1
+        except Exception:
+            writer.release()
+            raise
+        self.frames_written += recording.pre_roll_frames
+        metrics.observe("incident_preroll_flush", time.perf_counter() - start)
+
+        logger.debug(f"Pre-roll flushed: {recording.pre_roll_frames} frames in "
+                     f"{(time.perf_counter() - start) * 1000:.0f} ms ({recording.path})")
+        return writer
+
+    def _close(self, recording, writer):
+        if writer is not None:
+            writer.release()
+        if recording.failed:
+            return
+
+        # Keyframes come from memory: Phase 3 can start without reopening the file
+        if recording.keyframes is not None:
+            start = time.perf_counter()
+            recording.keyframes_b64 = recording.keyframes.encode()
+            recording.keyframes = None
+            logger.info(f"Keyframes captured during recording: {len(recording.keyframes_b64)} in "
+                        f"{(time.perf_counter() - start) * 1000:.0f} ms ({recording.path})")
+
+        self.incidents_finished += 1
+        logger.info(f"Incident recording finalized: {recording.path} "
+                    f"({recording.pre_roll_frames} pre-roll + {recording.frames_written} frames, "
+                    f"{recording.frames_dropped} dropped)")
+        try:
+            self.on_finished(recording)
+        except Exception as e:
+            logger.error(f"Incident hand-off failed: {e}")
@@ -4,269 +4,501 @@ import threading
 import os
 import time
 import json
-
-from collections import deque
+import math
+import signal
 
 from src.utils.logger import logger
 from src.utils.config_loader import cfg
 from src.utils.visualization import Visualizer
+from src.utils.metrics import metrics
 
 from src.core.perception.detector import Detector
-from src.core.memory.evidence import EvidenceManager
-from src.core.memory.state_manager import SecurityStateManager
+from src.core.memory.embedding_cache import EmbeddingCache
 from src.core.analysis.action_rec import ActionRecognizer
 from src.core.analysis.vlm import VisionReasonerFactory
+from src.pipelines.stream_context import StreamContext
+from src.pipelines.incident_writer import IncidentWriter
+from src.pipelines.vlm_pool import VLMWorkerPool
+from src.pipelines.scheduler import Phase2Scheduler
 
 
 class RapidPipeline:
     """
     The main pipeline that orchestrates the entire system.
+    One model instance per phase is shared by every camera stream.
     """
-    def __init__(self):
-        """Initializes the pipeline."""
+    def __init__(self, headless=None, detector=None, brain=None, reasoner=None, visualizer=None):
+        """
+        Initializes the pipeline.
+
+        Args:
+            headless: Skip all windows and display calls (rack servers). Defaults to system.headless.
+            detector, brain, reasoner, visualizer: Replacements for the real models
+                (e.g. the stubs in tests/benchmarks). Built from the config when omitted.
+        """
 
         logger.info("Initializing Asynchronous Pipeline...")
-        
-        self.detector = Detector()
-        self.memory = EvidenceManager()
-        self.visualizer = Visualizer()
-        self.brain = ActionRecognizer()
-        self.reasoner = VisionReasonerFactory.create()
-        
+
+        self.detector = detector or Detector()
+        self.visualizer = visualizer or Visualizer()
+        self.brain = brain or ActionRecognizer()
+        self.reasoner = reasoner or VisionReasonerFactory.create()
+
         self.conf_threshold = cfg['action']['threshold']
         self.alert_trigger_count = cfg['action'].get('alert_trigger_count', 3)
-        
-        self.safe_actions = cfg['action'].get('safe_prompts', []) + ['unknown_benign_activity']    
+
+        self.safe_actions = cfg['action'].get('safe_prompts', []) + ['unknown_benign_activity']
         self.ui_labels = cfg['action'].get('ui_labels', {})
 
-        self.state_manager = SecurityStateManager(self.alert_trigger_count)
-        
-        self.analysis_queue = queue.Queue(maxsize=1)
+        # One embedding cache for all streams (keys are namespaced per stream)
+        window_size = cfg['action'].get('window_size', 16)
+        self.embedding_cache = EmbeddingCache(capacity=2 * window_size)
+        self.streams = []
+        self.next_stream_index = 0
+
+        # --- Display ---
+        self.headless = cfg['system'].get('headless', False) if headless is None else headless
+        # Callables fed with (stream_id, annotated_frame); frames are only annotated when someone looks
+        self.preview_consumers = []
+        self.stop_requested = False
+
+        # The queue holds up to one full batch; the worker drains it in one go
+        self.max_batch_size = self.brain.max_batch_size
+        self.analysis_queue = queue.Queue(maxsize=self.max_batch_size)
         self.running = True
-        self.next_target_index = 0  
-        
+
+        # Threat-aware ordering of the Phase 2 candidates (replaces round-robin)
+        scheduler_cfg = cfg['action'].get('scheduler', {})
+        self.scheduler = Phase2Scheduler(
+            trigger_count=self.alert_trigger_count,
+            budget_ms_per_frame=scheduler_cfg.get('budget_ms_per_frame'),
+            max_wait_seconds=scheduler_cfg.get('max_wait_seconds', 2.0),
+            weights=scheduler_cfg.get('weights'),
+            proximity_range=scheduler_cfg.get('proximity_range', 1.5)
+        )
+
         # Start Background Worker
         self.worker_thread = threading.Thread(target=self._analysis_worker, daemon=True)
         self.worker_thread.start()
 
         # ---: Incident Recording Settings ---
         self.record_incidents = cfg['system'].get('record_incident', True)
-        self.fps_estimate = 30 # Default, will be updated in run()
-        self.pre_buffer_size = cfg['system'].get('pre_event_seconds', 2) * self.fps_estimate
-        self.post_buffer_size = cfg['system'].get('post_event_seconds', 3) * self.fps_estimate
-        
-
-        # --- Phase 3 VLM ---
-        self.vlm_queue = queue.Queue()
-        self.vlm_worker_thread = threading.Thread(target=self._vlm_worker, daemon=True)
-        self.vlm_worker_thread.start()
-
-
-        self.frame_buffer = deque(maxlen=self.pre_buffer_size)
-        self.is_recording_incident = False
-        self.post_alert_counter = 0
-        self.incident_writer = None
+        # Pre-roll flush and H.264 encoding run on their own thread, never on the capture loop
+        self.incident_writer = IncidentWriter(
+            on_finished=self._on_incident_saved,
+            queue_size=cfg['system'].get('incident_queue_size', 64),
+            policy=cfg['system'].get('incident_backpressure', 'drop'),
+            block_timeout=cfg['system'].get('incident_block_timeout', 0.5)
+        )
+
+        # --- Phase 3 VLM: several incidents in flight, each bounded by a timeout ---
+        vlm_workers = cfg['vlm'].get('workers', {})
+        self.vlm_pool = VLMWorkerPool(
+            self.reasoner, on_report=self._handle_vlm_report,
+            concurrency=vlm_workers.get('concurrency', 2),
+            timeout=vlm_workers.get('timeout_seconds', 60),
+            max_retries=vlm_workers.get('max_retries', 2),
+            retry_backoff=vlm_workers.get('retry_backoff_seconds', 2.0)
+        )
 
     def run(self, source_path):
         """
         Runs the pipeline on the given source path using a clean, phase-based execution loop.
         """
-        cap, w, h, out_dir = self._setup_environment(source_path)
-        if not cap:
+        self.run_streams([source_path])
+
+    def run_streams(self, sources):
+        """
+        Runs the pipeline on several sources at once.
+        Streams are serviced round-robin, one frame each, so every camera gets
+        the same share of the detector and of the Phase 2 batch.
+        """
+        out_dir = self._setup_environment(sources)
+        if not self.streams:
             return
 
+        self._start_metrics()
+        previous_handlers = self._install_signal_handlers()
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret: 
+            while not self.stop_requested:
+                active_streams = [s for s in self.streams if not s.finished]
+                if not active_streams:
                     break
-                
-                # 0. Context Maintenance
-                self.frame_buffer.append(frame.copy())
-                
-                # 1. Phase 1: Spatial Perception & Memory
-                detections, ready_clips = self._run_phase1_perception(frame)
-                
-                # 2. Phase 2: Action Recognition Dispatch
-                self._dispatch_phase2_analysis(ready_clips)
-                
-                # 3. Visualization Mapping
-                out_frame = self.visualizer.draw(frame, detections, state_manager=self.state_manager)
-                
-                # 4. Phase 3 & Recording: Evidence Management
-                self._handle_incident_recording(out_frame, w, h, out_dir)
-                
-                # 5. UI Rendering
-                if not self._render_ui(out_frame):
+
+                # Rotate who goes first so no camera is always served last
+                offset = self.next_stream_index % len(active_streams)
+                self.next_stream_index += 1
+                phase2_share = max(1, math.ceil(self.max_batch_size / len(active_streams)))
+
+                keep_running = True
+                for i in range(len(active_streams)):
+                    stream = active_streams[(offset + i) % len(active_streams)]
+                    if not self._process_stream_frame(stream, out_dir, phase2_share):
+                        keep_running = False
+                        break
+
+                if not keep_running:
                     break
-                
+
         finally:
-            self._shutdown_pipeline(cap)
+            self._restore_signal_handlers(previous_handlers)
+            self._shutdown_pipeline()
+
+    def attach_preview(self, consumer):
+        """
+        Registers a preview consumer: consumer(stream_id, annotated_frame) is called per frame.
+        In headless mode this is what turns frame annotation back on.
+        """
+        self.preview_consumers.append(consumer)
+
+    def detach_preview(self, consumer):
+        if consumer in self.preview_consumers:
+            self.preview_consumers.remove(consumer)
+
+    def _process_stream_frame(self, stream, out_dir, phase2_share):
+        """
+        Runs one frame of one stream through all phases.
+        Returns False if the user asked to quit.
+        """
+        # Threaded capture: time spent waiting for the capture thread (decode is timed there)
+        with metrics.timer("capture_wait", stream=stream.stream_id):
+            frame = stream.read()
+        if frame is None:
+            return True
+        stream.mark_frame()
+        metrics.inc("frames_total", stream=stream.stream_id)
+
+        # 0. Context Maintenance: the frame was decoded straight into the pre-event ring
+
+        # 1. Phase 1: Spatial Perception & Memory (skipped on static scenes by the motion gate;
+        #    trackers and evidence buffers are simply not advanced, so every track survives)
+        perceived = stream.should_perceive(frame)
+        if perceived:
+            detections, ready_clips = self._run_phase1_perception(stream, frame)
+            stream.last_detections = detections
+        else:
+            detections, ready_clips = stream.last_detections, {} # Frozen boxes: drawn only
+
+        # 2. Phase 2: Action Recognition Dispatch (this stream submits nothing while asleep)
+        self._dispatch_phase2_analysis(stream, ready_clips, detections, phase2_share, perceived)
+
+        # 3. Visualization Mapping (skipped when nobody will ever see the frame)
+        annotated = not self.headless or stream.is_recording_incident or bool(self.preview_consumers)
+        if annotated:
+            with metrics.timer("draw", stream=stream.stream_id):
+                out_frame = self.visualizer.draw(frame, detections, state_manager=stream.state_manager)
+        else:
+            out_frame = frame
+
+        # 4. Phase 3 & Recording: Evidence Management
+        self._handle_incident_recording(stream, out_frame, out_dir)
+
+        # 5. UI Rendering
+        if not annotated:
+            return True
+        return self._render_ui(stream, out_frame)
 
     def _analysis_worker(self):
         """
         Worker function to analyze clips in the background.
+        Drains every pending track (of every stream) and scores them in ONE batched forward pass.
         """
         while self.running:
             try:
-                tracker_id, clip = self.analysis_queue.get(timeout=0.1)
-                scores = self.brain.get_action_score(clip)
-                
-                top_action = max(scores, key=scores.get)
-                top_score = scores[top_action]                
-                is_violent = top_action not in self.safe_actions
-                
-                display_name = self.ui_labels.get(top_action, top_action)
-                
-                # Delegate to the Brain
-                self.state_manager.update_phase2(tracker_id, is_violent, display_name, top_score)
-                
-                # Trigger recording only if the state manager escalated to Orange (Level 1)
-                current_state = self.state_manager.states.get(tracker_id)
-                if current_state and current_state.level == 1 and not self.is_recording_incident:
-                    if self.record_incidents:
-                        self.is_recording_incident = True
-                        self.post_alert_counter = self.post_buffer_size
-                        self.current_threat_id = tracker_id # Remember who caused the recording
-
-                self.analysis_queue.task_done()
-
+                stream, tracker_id, clip = self.analysis_queue.get(timeout=0.1)
             except queue.Empty:
                 continue
+
+            # Drain whatever else is waiting (latest clip per track wins)
+            owners = {}
+            batch = {}
+            drained = 0
+            while True:
+                key = stream.memory.cache_key(tracker_id)
+                owners[key] = (stream, tracker_id)
+                batch[key] = clip
+                drained += 1
+                if drained >= self.max_batch_size:
+                    break
+                try:
+                    stream, tracker_id, clip = self.analysis_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            try:
+                start = time.perf_counter()
+                all_scores = self.brain.get_action_scores(batch, cache=self.embedding_cache)
+                elapsed = time.perf_counter() - start
+                self.scheduler.record_service_time(elapsed, len(batch))
+                metrics.observe("phase2_batch", elapsed)
+                metrics.inc("phase2_clips_total", len(batch))
+                for key, scores in all_scores.items():
+                    if scores:
+                        self._apply_phase2_result(*owners[key], scores)
             except Exception as e:
                 logger.error(f"Worker Error: {e}")
+            finally:
+                for _ in range(drained):
+                    self.analysis_queue.task_done()
 
-    def _vlm_worker(self):
-            """
-            Background thread that processes saved incident videos through the Ollama VLM.
-            """
-            while self.running:
-                try:
-                    # Sleep and wait for a completed video path to arrive
-                    video_path = self.vlm_queue.get(timeout=1.0)
-                    logger.info(f"Phase 3 Worker analyzing new evidence: {video_path}")
-                    
-                    # Send to Ollama (This takes a few seconds, but won't block the camera)
-                    report = self.reasoner.analyze_incident(video_path)
-                    
-                    # Save the JSON report right next to the video file
-                    report_path = video_path.replace('.mp4', '_report.json')
-                    with open(report_path, 'w', encoding='utf-8') as f:
-                        json.dump(report, f, indent=4)
-
-                    # Upgrade: Feedback Loop to the UI
-                    threat_detected = report.get('threat_detected', False)
-                    summary = report.get('description', '')
-                    if hasattr(self, 'current_threat_id'):
-                        self.state_manager.update_phase3(self.current_threat_id, threat_detected, summary)
-
-                        
-                    logger.info(f"Official Incident Report generated: {report_path}")
-                    self.vlm_queue.task_done()
+    def _apply_phase2_result(self, stream, tracker_id, scores):
+        """
+        Feeds one track's action scores into its stream's state machine.
+        """
+        top_action = max(scores, key=scores.get)
+        top_score = scores[top_action]
+        is_violent = top_action not in self.safe_actions
 
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    logger.error(f"Phase 3 Worker Error: {e}")
-
-    def _setup_environment(self, source_path):
-        cap = cv2.VideoCapture(source_path)
-        if not cap.isOpened(): 
-            logger.error("Failed to open input video.")
-            return None, 0, 0, ""
-
-        w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        self.fps_estimate = fps if fps > 0 else 30
-        
+        display_name = self.ui_labels.get(top_action, top_action)
+
+        # Delegate to the Brain
+        level = stream.state_manager.update_phase2(tracker_id, is_violent, display_name, top_score)
+
+        # Trigger recording only if the state manager escalated to Orange (Level 1)
+        if level == 1 and not stream.is_recording_incident:
+            if self.record_incidents:
+                stream.is_recording_incident = True
+                stream.post_alert_counter = stream.post_buffer_size
+                stream.current_threat_id = tracker_id # Remember who caused the recording
+
+    def _handle_vlm_report(self, video_path, report, context):
+        """
+        Called by the Phase 3 pool for every analyzed incident.
+        """
+        stream, threat_id = context
+        # New dict: the received one may be shared (e.g. held by the VLM cache)
+        report = dict(report, stream_id=stream.stream_id)
+
+        # Save the JSON report right next to the video file
+        report_path = video_path.replace('.mp4', '_report.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+        # A failed analysis says nothing about the scene: never downgrade the track because of it
+        if 'error' in report:
+            if threat_id is not None:
+                stream.state_manager.mark_unverified(threat_id, report['error'])
+            logger.warning(f"Phase 3 failed, track {threat_id} left unverified: {report['error']}")
+            return
+
+        # Upgrade: Feedback Loop to the UI
+        threat_detected = report.get('threat_detected', False)
+        summary = report.get('description', '')
+        if threat_id is not None:
+            stream.state_manager.update_phase3(threat_id, threat_detected, summary)
+
+        logger.info(f"Official Incident Report generated: {report_path}")
+
+    def _setup_environment(self, sources):
         out_dir = cfg['paths']['output_dir']
         os.makedirs(out_dir, exist_ok=True)
-        
+
         disp_w, disp_h = cfg['system'].get('display_resolution', [1280, 720])
-        logger.info("Pipeline started. Monitoring for incidents...")
-        
-        cv2.namedWindow("SentinAI Async System", cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)
-        cv2.resizeWindow("SentinAI Async System", disp_w, disp_h)
-        
-        return cap, w, h, out_dir
-
-    def _run_phase1_perception(self, frame):
-        detections = self.detector.process_frame(frame)
-        ready_clips = self.memory.update(frame, detections)
+
+        for index, entry in enumerate(sources):
+            stream = StreamContext.from_config(
+                entry, index, self.detector, self.embedding_cache, self.alert_trigger_count
+            )
+            if not stream.open():
+                continue
+
+            self.streams.append(stream)
+            if self.headless:
+                continue
+
+            # Single camera keeps the classic window title
+            if len(sources) == 1:
+                stream.window_name = "SentinAI Async System"
+            cv2.namedWindow(stream.window_name, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)
+            cv2.resizeWindow(stream.window_name, disp_w, disp_h)
+
+        if self.streams:
+            mode = "headless" if self.headless else "display"
+            logger.info(f"Pipeline started on {len(self.streams)} stream(s) ({mode}). Monitoring for incidents...")
+
+        return out_dir
+
+    def _run_phase1_perception(self, stream, frame):
+        with metrics.timer("detect", stream=stream.stream_id):
+            detections = self.detector.process_frame(frame, session=stream.tracking)
+        with metrics.timer("evidence_update", stream=stream.stream_id):
+            ready_clips = stream.memory.update(frame, detections)
         return detections, ready_clips
 
-    def _dispatch_phase2_analysis(self, ready_clips):
-        if not ready_clips:
-            return
+    def _dispatch_phase2_analysis(self, stream, ready_clips, detections, max_clips, perceived=True):
+        # Skipped by the motion gate: the reused boxes are stale, so they must not feed the
+        # interaction gate (fall path) or the scheduler. Other streams still get dispatched.
+        if perceived:
+            # Every visible track is active, not only those that produced a clip this frame (stride sampling)
+            visible = [] if detections.tracker_id is None else detections.tracker_id.tolist()
+            stream.state_manager.cleanup(visible)
+
+            # Lone people only get a sampled clip (or one after a fall); runs every perceived frame for the fall path
+            if stream.interaction_gate is not None:
+                ready_clips = stream.interaction_gate.select(ready_clips, detections)
 
-        available_ids = list(ready_clips.keys())
-        self.state_manager.cleanup(available_ids)
+            if ready_clips:
+                self.scheduler.submit(stream, ready_clips, detections)
 
-        if available_ids:
-            idx = self.next_target_index % len(available_ids)
-            target_id = available_ids[idx]
-            if not self.analysis_queue.full():
-                self.analysis_queue.put((target_id, ready_clips[target_id]))
-                self.next_target_index += 1
+        # Highest threat first; clips that do not fit wait for the next frame
+        self.scheduler.dispatch(self.analysis_queue, max_clips)
 
-    def _handle_incident_recording(self, out_frame, w, h, out_dir):
-        if not self.is_recording_incident:
+    def _handle_incident_recording(self, stream, out_frame, out_dir):
+        if not stream.is_recording_incident:
             return
 
-        # Initialize writer if this is the start of an incident
-        if self.incident_writer is None:
+        # Open the incident if this is its first frame (the writer thread flushes the pre-roll)
+        if stream.incident_recording is None:
             timestamp = time.strftime("%Y%m%d-%H%M%S")
-            self.current_incident_path = os.path.join(out_dir, f"incident_{timestamp}.mp4")                        
-            
-            # Using 'avc1' for H.264 web-safe encoding so it plays perfectly on GitHub
-            self.incident_writer = cv2.VideoWriter(
-                self.current_incident_path, cv2.VideoWriter_fourcc(*'avc1'), self.fps_estimate, (w, h)
+            stream.current_incident_path = os.path.join(out_dir, f"incident_{stream.stream_id}_{timestamp}.mp4")
+            logger.info(f"[{stream.stream_id}] Writing incident evidence to {stream.current_incident_path} "
+                        f"({stream.pre_event_memory_report()})")
+
+            stream.incident_recording = self.incident_writer.start(
+                stream, stream.current_incident_path, stream.fps_estimate, (stream.width, stream.height),
+                pre_roll=stream.frame_buffer.detach(), threat_id=stream.current_threat_id,
+                keyframes=self._create_keyframe_sampler()
             )
-            # Flush the PRE-EVENT buffer to file
-            for buffered_frame in self.frame_buffer:
-                self.incident_writer.write(buffered_frame)
-
-            logger.info(f"Writing incident evidence to {self.current_incident_path}")
-        
-        # Write the current frame
-        self.incident_writer.write(out_frame)
-        self.post_alert_counter -= 1
-        
-        # Finalize clip when aftermath window closes
-        if self.post_alert_counter <= 0:
-            self.incident_writer.release()
-            self.incident_writer = None
-            self.is_recording_incident = False
-            logger.info(f"Incident recording finalized: {self.current_incident_path}")
-
-            # Send to Phase 3
-            self.vlm_queue.put(self.current_incident_path)
-
-    def _render_ui(self, out_frame):
+
+        # Queue the current frame (dropped, not waited for, if the writer lags)
+        self.incident_writer.write(stream.incident_recording, out_frame)
+        stream.post_alert_counter -= 1
+
+        # Close the clip when the aftermath window ends; Phase 3 gets it once the file is released
+        if stream.post_alert_counter <= 0:
+            self.incident_writer.finish(stream.incident_recording)
+            stream.incident_recording = None
+            stream.is_recording_incident = False
+
+    def _on_incident_saved(self, recording):
+        """Called by the writer thread after the incident file is fully released."""
+        logger.info(f"[{recording.stream.stream_id}] Phase 3 analyzing new evidence: {recording.path}")
+        self.vlm_pool.submit(recording.path, recording.keyframes_b64, context=(recording.stream, recording.threat_id))
+
+    def _create_keyframe_sampler(self):
+        """Strategies without a sampler fall back to reading keyframes from the file."""
+        factory = getattr(self.reasoner, 'create_keyframe_sampler', None)
+        return factory() if factory else None
+
+    def _render_ui(self, stream, out_frame):
         status_color = (0, 165, 255) if not self.analysis_queue.empty() else (0, 255, 0)
-        if self.is_recording_incident: 
+        if stream.is_recording_incident:
             status_color = (0, 0, 255) # Red for recording
-        
-        cv2.circle(out_frame, (30, 30), 10, status_color, -1) 
-        cv2.imshow("SentinAI Async System", out_frame)
-        
+
+        cv2.circle(out_frame, (30, 30), 10, status_color, -1)
+
+        for consumer in self.preview_consumers:
+            try:
+                consumer(stream.stream_id, out_frame)
+            except Exception as e:
+                logger.error(f"Preview consumer failed: {e}")
+
+        # Headless: no window, no waitKey (SIGINT/SIGTERM stop the loop instead of 'q')
+        if self.headless:
+            return True
+
+        cv2.imshow(stream.window_name, out_frame)
+
         if cv2.waitKey(1) & 0xFF == ord('q'):
             return False # Signal to break the loop
         return True
 
-    def _shutdown_pipeline(self, cap):
-        cap.release()
-
-        # Graceful Shutdown Handoff
-        if self.incident_writer: 
-            self.incident_writer.release()
-            logger.info(f"Incident recording force-finalized due to shutdown: {self.current_incident_path}")
-            self.vlm_queue.put(self.current_incident_path)
+    def _start_metrics(self):
+        """Local Prometheus endpoint and/or periodic JSON dump (metrics section of the config)."""
+        metrics_cfg = cfg.get('metrics', {})
+        metrics.add_collector(self._collect_metrics)
+        metrics.start(
+            http_host=metrics_cfg.get('http_host', '127.0.0.1'),
+            http_port=metrics_cfg.get('http_port'),
+            json_path=metrics_cfg.get('json_path'),
+            json_interval=metrics_cfg.get('json_interval_seconds', 30)
+        )
+
+    def _collect_metrics(self):
+        """Refreshes queue depths, drop counts and FPS right before every export."""
+        for stream in self.streams:
+            metrics.set_gauge("fps", stream.effective_fps(), stream=stream.stream_id)
+            if stream.motion_gate is not None:
+                gate = stream.motion_gate.stats()
+                metrics.set_gauge("motion_skipped_ratio", gate['skipped_ratio'], stream=stream.stream_id)
+                metrics.set_total("motion_frames_skipped_total", gate['skipped'], stream=stream.stream_id)
+            if stream.interaction_gate is not None:
+                gate = stream.interaction_gate.stats()
+                metrics.set_total("phase2_clips_gated_total", gate['gated'], stream=stream.stream_id)
+                metrics.set_total("falls_detected_total", gate['falls'], stream=stream.stream_id)
+            capture = stream.capture_stats()
+            metrics.set_gauge("capture_lag_seconds", capture['lag_seconds'], stream=stream.stream_id)
+            metrics.set_total("capture_frames_dropped_total", capture['dropped'], stream=stream.stream_id)
+            metrics.set_total("capture_reconnects_total", capture['reconnects'], stream=stream.stream_id)
+
+        metrics.set_gauge("queue_depth", self.analysis_queue.qsize(), queue="phase2")
+        metrics.set_gauge("queue_depth", len(self.scheduler.pending), queue="phase2_pending")
+        metrics.set_gauge("queue_depth", self.incident_writer.queue.qsize(), queue="incident_writer")
+        vlm_stats = self.vlm_pool.stats()
+        metrics.set_gauge("queue_depth", vlm_stats['queued'], queue="vlm")
+        metrics.set_gauge("vlm_in_flight", vlm_stats['in_flight'])
+
+        scheduler_stats = self.scheduler.stats()
+        metrics.set_total("phase2_clips_dropped_total", scheduler_stats['dropped'])
+        metrics.set_total("phase2_clips_deferred_total", scheduler_stats['deferred'])
+        metrics.set_total("incident_frames_dropped_total", self.incident_writer.frames_dropped)
+        metrics.set_total("vlm_failures_total", vlm_stats['failed'])
+        metrics.set_total("vlm_timeouts_total", vlm_stats['timeouts'])
+
+    def _install_signal_handlers(self):
+        """
+        SIGINT/SIGTERM finish the current frame and shut down cleanly
+        (incident files are finalized and pending VLM reports are written).
+        """
+        def request_stop(signum, _frame):
+            logger.info(f"Received {signal.Signals(signum).name}. Shutting down...")
+            self.stop_requested = True
+
+        previous = {}
+        # Signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return previous
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous[sig] = signal.signal(sig, request_stop)
+        return previous
+
+    def _restore_signal_handlers(self, previous):
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    def _shutdown_pipeline(self):
+        for stream in self.streams:
+            stream.release()
+
+            # Graceful Shutdown Handoff
+            if stream.incident_recording:
+                self.incident_writer.finish(stream.incident_recording)
+                stream.incident_recording = None
+                logger.info(f"Incident recording force-finalized due to shutdown: {stream.current_incident_path}")
+
+        # Finish every queued frame; finished files reach the VLM queue before we wait on it
+        self.incident_writer.stop()
+        writer_stats = self.incident_writer.stats()
+        if writer_stats['dropped']:
+            logger.warning(f"Incident writer dropped {writer_stats['dropped']} frames "
+                           f"(raise system.incident_queue_size or use incident_backpressure: block)")
+
+        if not self.headless:
+            cv2.destroyAllWindows()
+
+        logger.info(f"Phase 2 scheduler: {self.scheduler.stats()}")
+        logger.info("Waiting for Phase 3 VLM to finish generating final reports...")
+        self.vlm_pool.join()
+        logger.info(f"Phase 3 stats: {self.vlm_pool.stats()}")
+        if hasattr(self.reasoner, 'cache_stats'):
+            logger.info(f"VLM cache: {self.reasoner.cache_stats()}")
 
-        cv2.destroyAllWindows()
+        # Last metrics dump once the final VLM reports are in
+        metrics_cfg = cfg.get('metrics', {})
+        metrics.stop(json_path=metrics_cfg.get('json_path'))
+        metrics.remove_collector(self._collect_metrics)
+        self.vlm_pool.stop()
 
-        logger.info("Waiting for Phase 3 VLM to finish generating final reports...")
-        self.vlm_queue.join()
-        
         self.running = False
-        logger.info("System shutdown complete.")
\ No newline at end of file
+        logger.info("System shutdown complete.")
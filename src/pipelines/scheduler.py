@@ -0,0 +1,162 @@
+import queue
+import time
+import numpy as np
+from src.core.perception.interaction import nearest_neighbor_distances
+
+
+class Phase2Scheduler:
+    """
+    Decides which tracks get the next Phase 2 (CoCa) slots.
+    Responsibility:
+    1. Keeps the latest ready clip of every track (of every stream) as a pending candidate.
+       A newer clip replaces an older one; clips of tracks that left are dropped.
+    2. Ranks candidates by threat level, strike count, time since their last analysis
+       and proximity to other people, so a person at 2/3 strikes is not stuck behind bystanders.
+    3. Admits only what the per-frame service-time budget allows and the queue can hold;
+       the rest stays pending (deferred), never silently lost.
+    4. Starvation guard: a track that has waited `max_wait_seconds` is served before any ranking.
+    """
+    def __init__(self, trigger_count=3, budget_ms_per_frame=None, max_wait_seconds=2.0,
+                 weights=None, proximity_range=1.5):
+        self.trigger_count = max(1, trigger_count)
+        self.budget_ms_per_frame = budget_ms_per_frame
+        self.max_wait_seconds = max_wait_seconds
+        self.weights = {"level": 4.0, "strikes": 2.0, "wait": 1.0, "proximity": 1.0}
+        self.weights.update(weights or {})
+        self.proximity_range = proximity_range
+
+        self.pending = {}        # (stream, tracker_id) -> { clip, ready_at, proximity }
+        self.last_served = {}    # (stream, tracker_id) -> monotonic time of the last dispatch
+        self.ms_per_clip = None  # EMA of the measured Phase 2 service time
+
+        # --- Counters ---
+        self.submitted = 0
+        self.dispatched = 0
+        self.deferred = 0        # Clips that missed at least one dispatch round (counted once each)
+        self.dropped = 0         # Pending clip replaced by a newer one, or its track left
+        self.starvation_promotions = 0
+        self.total_wait = 0.0    # Clip ready -> dispatched, seconds
+
+    def submit(self, stream, ready_clips, detections):
+        """Registers the clips a stream produced this frame."""
+        now = time.monotonic()
+        proximity = self._proximity(detections)
+
+        self._purge(stream)
+
+        for tracker_id, clip in ready_clips.items():
+            key = (stream, tracker_id)
+            entry = self.pending.get(key)
+            if entry is not None:
+                # Superseded before it was served: the newer clip inherits the wait
+                # (ready_at, promotion), otherwise a busy track would never look overdue
+                self.dropped += 1
+                entry["clip"] = clip
+                entry["proximity"] = proximity.get(tracker_id, 0.0)
+            else:
+                self.pending[key] = {"clip": clip, "ready_at": now, "proximity": proximity.get(tracker_id, 0.0)}
+            self.submitted += 1
+
+    def dispatch(self, analysis_queue, max_clips):
+        """Moves the highest-priority candidates into the analysis queue. Returns how many."""
+        self._purge()
+        if not self.pending:
+            return 0
+
+        now = time.monotonic()
+        limit = min(max_clips, self._budget_clips())
+        if analysis_queue.maxsize > 0:
+            limit = min(limit, analysis_queue.maxsize - analysis_queue.qsize())
+
+        ranked = sorted(self.pending, key=lambda k: self._priority(k, now), reverse=True)
+        sent = 0
+        for key in ranked[:max(int(limit), 0)]:
+            stream, tracker_id = key
+            entry = self.pending[key]
+            try:
+                analysis_queue.put_nowait((stream, tracker_id, entry["clip"]))
+            except queue.Full:
+                break
+            del self.pending[key]
+            self.last_served[key] = now
+            self.total_wait += now - entry["ready_at"]
+            sent += 1
+
+        self.dispatched += sent
+        for entry in self.pending.values():
+            if not entry.get("deferred"):
+                entry["deferred"] = True
+                self.deferred += 1
+        return sent
+
+    def record_service_time(self, seconds, clips):
+        """Fed by the analysis worker after every batch."""
+        if clips <= 0:
+            return
+        ms = seconds * 1000 / clips
+        self.ms_per_clip = ms if self.ms_per_clip is None else 0.8 * self.ms_per_clip + 0.2 * ms
+
+    def stats(self):
+        return {
+            "pending": len(self.pending), "submitted": self.submitted, "dispatched": self.dispatched,
+            "deferred": self.deferred, "dropped": self.dropped,
+            "starvation_promotions": self.starvation_promotions,
+            "avg_wait_ms": self.total_wait * 1000 / self.dispatched if self.dispatched else 0.0
+        }
+
+    # --- Internals ---
+
+    def _purge(self, stream=None):
+        """Forgets candidates whose track is gone from the evidence buffers (of `stream`, or all)."""
+        def gone(key):
+            return (stream is None or key[0] is stream) and key[1] not in key[0].memory.buffers
+
+        for key in [k for k in self.pending if gone(k)]:
+            del self.pending[key]
+            self.dropped += 1
+        for key in [k for k in self.last_served if gone(k)]:
+            del self.last_served[key]
+
+    def _budget_clips(self):
+        """Clips the per-frame service budget admits (at least one, so nothing stalls)."""
+        if not self.budget_ms_per_frame or not self.ms_per_clip:
+            return float("inf")
+        return max(1, int(self.budget_ms_per_frame // self.ms_per_clip))
+
+    def _priority(self, key, now):
+        stream, tracker_id = key
+        entry = self.pending[key]
+        waited = now - self.last_served.get(key, entry["ready_at"])
+
+        # Starvation guard: overdue tracks go first, longest wait first
+        if waited >= self.max_wait_seconds:
+            if not entry.get("promoted"):
+                entry["promoted"] = True
+                self.starvation_promotions += 1
+            return 1e6 + waited
+
+        state = stream.state_manager.view(tracker_id)
+        level = state.level if state else 0
+        strikes = state.strike_count if state else 0
+        w = self.weights
+
+        # Red is latched: Phase 2 can no longer change it, only the wait term keeps it alive
+        if level == 2:
+            return w["wait"] * waited / self.max_wait_seconds
+
+        return (w["level"] * level
+                + w["strikes"] * min(strikes / self.trigger_count, 1.0)
+                + w["wait"] * waited / self.max_wait_seconds
+                + w["proximity"] * entry["proximity"])
+
+    def _proximity(self, detections):
+        """
+        Per track: 1.0 when another person overlaps, falling to 0 at `proximity_range`
+        box sizes away.
+        """
+        if detections is None or detections.tracker_id is None or len(detections) < 2:
+            return {}
+
+        nearest = nearest_neighbor_distances(detections.xyxy, self.proximity_range)
+        closeness = np.clip(1.0 - nearest / self.proximity_range, 0.0, 1.0)
+        return {int(tid): float(c) for tid, c in zip(detections.tracker_id, closeness)}
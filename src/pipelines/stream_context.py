@@ -0,0 +1,265 @@
+import cv2
+import time
+import numpy as np
+import supervision as sv
+from collections import deque
+
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils.config_loader import cfg
+from src.utils.frame_buffer import FrameRing, create_pre_event_buffer
+from src.utils.video_io import VideoStream
+
+from src.core.memory.evidence import EvidenceManager
+from src.core.perception.motion import MotionGate
+from src.core.perception.interaction import InteractionGate
+from src.core.memory.state_manager import SecurityStateManager
+
+
+class StreamContext:
+    """
+    Everything that belongs to ONE camera.
+    Responsibility:
+    1. Owns the capture, tracker, evidence buffers and threat states of a stream.
+    2. Owns the stream's incident recording state (pre-event buffer, open recording).
+    The heavy models (YOLO, CoCa, VLM) live in the pipeline and are shared.
+    """
+    def __init__(self, stream_id, source, detector, embedding_cache, alert_trigger_count=3, motion_gate=None,
+                 roi=None, tiling=None, interaction_gate=None):
+        self.stream_id = stream_id
+        self.source = source
+        self.window_name = f"SentinAI Async System [{stream_id}]"
+
+        # --- Per-stream Phase 1 & 2 memory ---
+        self.tracking = detector.create_session(regions=detector.create_regions(roi, tiling))
+        self.memory = EvidenceManager(embedding_cache=embedding_cache, namespace=stream_id)
+        self.state_manager = SecurityStateManager(alert_trigger_count)
+
+        # --- Motion gate: skips Phase 1 & 2 on static scenes (settings merged per camera) ---
+        self.motion_settings = dict(cfg.get('motion_gate', {}), **(motion_gate or {}))
+        self.motion_gate = None
+        self.last_detections = sv.Detections.empty() # Reused (drawn) while perception sleeps
+
+        # --- Interaction gate: Phase 2 only for people close to someone (plus samples, falls) ---
+        self.interaction_settings = dict(cfg['action'].get('interaction_gate', {}), **(interaction_gate or {}))
+        self.interaction_gate = None
+
+        # --- Capture ---
+        self.cap = None
+        self.video = None          # Threaded VideoStream (file/live capture modes)
+        self.capture_mode = self._resolve_capture_mode(cfg['system'].get('capture_mode', 'auto'))
+        self._previous_frame = None
+        self.width, self.height = 0, 0
+        self.finished = False
+        self.frame_times = deque(maxlen=60) # Processing timestamps, for the effective FPS
+
+        # --- Incident Recording State ---
+        self.fps_estimate = 30 # Default, will be updated in open()
+        # Threaded capture decodes ahead of the pipeline into spare raw ring slots
+        spare = 0 if self.capture_mode == "sync" else cfg['system'].get('capture_queue_size', 4) + 2
+        self.frame_buffer = create_pre_event_buffer(0, spare=spare)
+        self._resize_buffers()
+        self.is_recording_incident = False
+        self.post_alert_counter = 0
+        self.incident_recording = None   # IncidentRecording handle while an incident is open
+        self.current_incident_path = None
+        self.current_threat_id = None
+
+    @staticmethod
+    def from_config(entry, index, detector, embedding_cache, alert_trigger_count=3):
+        """
+        Builds a stream from one `paths.input_sources` entry.
+        An entry is either a plain path/URL or a dict
+        { id: ..., source: ..., motion_gate: {...}, roi: [polygon, ...], tiling: {...}, interaction_gate: {...} }.
+        """
+        options = {}
+        if isinstance(entry, dict):
+            stream_id = str(entry.get('id', f"cam{index}"))
+            source = entry['source']
+            options = {key: entry.get(key) for key in ('motion_gate', 'roi', 'tiling', 'interaction_gate')}
+        else:
+            stream_id, source = f"cam{index}", entry
+        return StreamContext(stream_id, source, detector, embedding_cache, alert_trigger_count, **options)
+
+    def open(self):
+        """Opens the capture and adapts the buffers to the real FPS."""
+        if self.capture_mode == "sync":
+            self.cap = cv2.VideoCapture(self.source)
+            if not self.cap.isOpened():
+                logger.error(f"[{self.stream_id}] Failed to open input video: {self.source}")
+                self.finished = True
+                return False
+            self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fps = int(self.cap.get(cv2.CAP_PROP_FPS))
+        else:
+            try:
+                system = cfg['system']
+                self.video = VideoStream(self.source, queue_size=system.get('capture_queue_size', 4),
+                                         mode=self.capture_mode,
+                                         read_retries=system.get('live_read_retries', 5),
+                                         reconnect_attempts=system.get('live_reconnect_attempts', 3),
+                                         reconnect_delay=system.get('live_reconnect_delay', 1.0),
+                                         slots=self.frame_buffer if isinstance(self.frame_buffer, FrameRing) else None,
+                                         name=self.stream_id).start()
+            except ValueError:
+                logger.error(f"[{self.stream_id}] Failed to open input video: {self.source}")
+                self.finished = True
+                return False
+            self.width, self.height, fps = self.video.width, self.video.height, int(self.video.fps or 0)
+
+        self.fps_estimate = fps if fps > 0 else 30
+        self._resize_buffers()
+        self.motion_gate = self._build_motion_gate()
+        self.interaction_gate = self._build_interaction_gate()
+
+        logger.info(f"[{self.stream_id}] Stream opened: {self.width}x{self.height} @ {self.fps_estimate} FPS "
+                    f"({self.capture_mode} capture), pre-roll {self.pre_buffer_size} frames "
+                    f"({cfg['system'].get('pre_event_compression', 'none')})")
+        return True
+
+    def read(self):
+        """
+        Returns the next frame (None if none is ready yet), stored in the pre-event buffer.
+        Marks the stream finished at the end of the source.
+        """
+        if self.video is not None:
+            return self._read_threaded()
+        return self._read_sync()
+
+    def _read_threaded(self):
+        """
+        File/live modes: the frame was decoded by the capture thread, straight into a
+        pre-event ring slot (raw ring) or into a recycled frame (compressed buffer).
+        """
+        # The previous frame is no longer used by any phase: decode into it again
+        if self._previous_frame is not None:
+            self.video.recycle(self._previous_frame)
+            self._previous_frame = None
+
+        frame = self.video.read(timeout=0.05)
+        if frame is None:
+            if not self.video.running():
+                self.finished = True
+            return None
+
+        self.height, self.width = frame.shape[:2]
+        self.frame_buffer.push(frame) # Commits a ring slot in place, copies anything else
+        if self.video.slots is None:
+            self._previous_frame = frame
+        return frame
+
+    def _read_sync(self):
+        """
+        Decodes the next frame straight into the pre-event ring (no per-frame allocation).
+        """
+        slot = self.frame_buffer.next_slot((self.height, self.width, 3))
+        with metrics.timer("decode", stream=self.stream_id):
+            ret, frame = self.cap.read(slot)
+        if not ret:
+            self.finished = True
+            return None
+
+        # Backends may ignore the target (e.g. the real resolution differs from the metadata)
+        if frame is slot or np.shares_memory(frame, slot):
+            self.frame_buffer.commit()
+        else:
+            self.height, self.width = frame.shape[:2]
+            self.frame_buffer.push(frame)
+        return frame
+
+    def mark_frame(self):
+        self.frame_times.append(time.monotonic())
+
+    def effective_fps(self):
+        """Frames actually processed per second over the last ~60 frames."""
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def capture_stats(self):
+        """Frames dropped by the live policy and the decode-to-processing lag."""
+        if self.video is None:
+            return {"mode": self.capture_mode, "dropped": 0, "lag_seconds": 0.0, "reconnects": 0}
+        return {"mode": self.capture_mode, "dropped": self.video.dropped, "lag_seconds": self.video.last_lag,
+                "reconnects": self.video.reconnects}
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+        if self.video is not None:
+            if self.video.dropped:
+                logger.info(f"[{self.stream_id}] Live capture dropped {self.video.dropped} stale frames")
+            self.video.stop()
+        if self.motion_gate is not None:
+            gate = self.motion_gate.stats()
+            logger.info(f"[{self.stream_id}] Motion gate skipped {gate['skipped']}/{gate['seen']} frames "
+                        f"({gate['skipped_ratio']:.0%}), {gate['wakeups']} wake-ups")
+        if self.interaction_gate is not None:
+            gate = self.interaction_gate.stats()
+            logger.info(f"[{self.stream_id}] Interaction gate held back {gate['gated']}/{gate['clips_in']} clips "
+                        f"({gate['interacting']} interacting, {gate['sampled']} sampled, "
+                        f"{gate['fall']} fall, {gate['falls']} falls seen)")
+        self.frame_buffer.close()
+
+    def pre_event_memory_report(self):
+        """Human-readable size of the pre-event buffer (raw ring or compressed)."""
+        stats = self.frame_buffer.stats()
+        return (f"pre-roll {stats['mode']}: {stats['frames']} frames, "
+                f"{stats['bytes'] / (1024 * 1024):.1f} MB, {stats['dropped']} dropped")
+
+    def should_perceive(self, frame):
+        """
+        Motion gate decision for this frame. On wake-up the tracker is told to detect
+        right away; the tracks themselves were kept alive while asleep.
+        """
+        if self.motion_gate is None:
+            return True
+        was_awake = self.motion_gate.is_awake
+        active = self.motion_gate.update(frame)
+        if active and not was_awake:
+            self.tracking.resume()
+        return active
+
+    def _build_motion_gate(self):
+        settings = self.motion_settings
+        if not settings.get('enabled', False):
+            return None
+        return MotionGate(
+            width=settings.get('width', 160),
+            pixel_threshold=settings.get('pixel_threshold', 25),
+            motion_threshold=settings.get('motion_threshold', 0.002),
+            hold_frames=settings.get('hold_seconds', 2.0) * self.fps_estimate,
+            background_alpha=settings.get('background_alpha', 0.05)
+        )
+
+    def _build_interaction_gate(self):
+        settings = self.interaction_settings
+        if not settings.get('enabled', False):
+            return None
+        fall = settings.get('fall', {})
+        return InteractionGate(
+            radius=settings.get('radius', 1.5),
+            isolated_sample_frames=settings.get('isolated_sample_seconds', 5.0) * self.fps_estimate,
+            fall_detection=fall.get('enabled', True),
+            standing_ratio=fall.get('standing_ratio', 1.3),
+            lying_ratio=fall.get('lying_ratio', 0.9),
+            fall_window_frames=fall.get('window_seconds', 1.0) * self.fps_estimate,
+            fall_hold_frames=fall.get('hold_seconds', 2.0) * self.fps_estimate
+        )
+
+    def _resolve_capture_mode(self, mode):
+        """auto: cameras and network streams are live, files must not drop frames."""
+        if mode != "auto":
+            return mode
+        source = str(self.source)
+        if source.isdigit() or "://" in source:
+            return "live"
+        return "file"
+
+    def _resize_buffers(self):
+        self.pre_buffer_size = cfg['system'].get('pre_event_seconds', 2) * self.fps_estimate
+        self.post_buffer_size = cfg['system'].get('post_event_seconds', 3) * self.fps_estimate
+        # The ring is preallocated once per resolution and only resized when the FPS changes
+        self.frame_buffer.resize(self.pre_buffer_size)
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+
+
+class VLMWorkerPool:
+    """
+    Phase 3 worker pool.
+    Responsibility:
+    1. Runs one asyncio event loop on a background thread and analyzes up to
+       `concurrency` incidents at once through reasoner.analyze_incident_async.
+    2. Bounds every request with a timeout and retries failures a few times with backoff.
+    3. Keeps queue-depth / latency counters so a backlog is visible in the logs.
+    on_report(video_path, report, context) is called (in a thread) for every incident,
+    with an error report if all attempts failed.
+    """
+    def __init__(self, reasoner, on_report, concurrency=2, timeout=60.0, max_retries=2, retry_backoff=2.0):
+        self.reasoner = reasoner
+        self.on_report = on_report
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+
+        # --- Metrics ---
+        self.pending = 0            # Submitted and not finished (queued + in flight)
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.total_latency = 0.0    # Submit -> report, seconds
+        self._idle = threading.Condition()
+
+        self.loop = asyncio.new_event_loop()
+        self.jobs = None
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run_loop, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def submit(self, video_path, frames_b64=None, context=None):
+        """Thread-safe: queues one incident for analysis."""
+        with self._idle:
+            self.pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.pending - self.in_flight)
+        self.loop.call_soon_threadsafe(self.jobs.put_nowait, (video_path, frames_b64, context, time.monotonic()))
+
+    def join(self):
+        """Blocks until every submitted incident has been reported."""
+        with self._idle:
+            while self.pending:
+                self._idle.wait()
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def stats(self):
+        finished = self.completed + self.failed
+        return {
+            "queued": self.pending - self.in_flight, "in_flight": self.in_flight,
+            "max_queue_depth": self.max_queue_depth, "completed": self.completed, "failed": self.failed,
+            "timeouts": self.timeouts, "retries": self.retries,
+            "avg_latency_s": self.total_latency / finished if finished else 0.0
+        }
+
+    # --- Event loop thread ---
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.jobs = asyncio.Queue()
+        workers = [self.loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            for task in workers:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            self.loop.close()
+
+    async def _worker(self):
+        while True:
+            video_path, frames_b64, context, submitted_at = await self.jobs.get()
+            try:
+                await self._process(video_path, frames_b64, context, submitted_at)
+            except Exception as e:
+                logger.error(f"Phase 3 Worker Error: {e}")
+            finally:
+                with self._idle:
+                    self.pending -= 1
+                    self._idle.notify_all()
+
+    async def _process(self, video_path, frames_b64, context, submitted_at):
+        self.in_flight += 1
+        report, last_error = None, None
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    attempt_start = time.perf_counter()
+                    report = await asyncio.wait_for(
+                        self.reasoner.analyze_incident_async(video_path, frames_b64=frames_b64), self.timeout
+                    )
+                    metrics.observe("vlm_request", time.perf_counter() - attempt_start)
+                    break
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    last_error = f"VLM request timed out after {self.timeout} s"
+                except Exception as e:
+                    last_error = str(e)
+
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    logger.warning(f"Phase 3 attempt {attempt + 1} failed ({last_error}); retrying: {video_path}")
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        finally:
+            self.in_flight -= 1
+
+        if report is None:
+            self.failed += 1
+            report = {"error": last_error, "threat_detected": False}
+            logger.error(f"Phase 3 gave up on {video_path}: {last_error}")
+        else:
+            self.completed += 1
+
+        latency = time.monotonic() - submitted_at
+        self.total_latency += latency
+        metrics.observe("vlm_incident", latency)
+        logger.info(f"Phase 3 finished in {latency:.1f} s "
+                    f"(queued: {self.pending - self.in_flight - 1}, in flight: {self.in_flight})")
+
+        await asyncio.to_thread(self.on_report, video_path, report, context)
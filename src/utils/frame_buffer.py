@@ -0,0 +1,351 @@
+import cv2
+import queue
+import threading
+import numpy as np
+from collections import deque
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+
+
+class FrameRing:
+    """
+    Preallocated pre-event history.
+    Responsibility:
+    1. Holds the last `capacity` frames in ONE (capacity + spare, H, W, 3) uint8 array.
+    2. Lets the decoder write straight into a free slot (no per-frame allocation, no copy).
+       A capture thread decoding ahead of the pipeline borrows up to `spare` slots (lease()).
+    3. Yields the frames in chronological order when an incident is flushed.
+    """
+    def __init__(self, capacity, spare=0):
+        self.capacity = max(0, int(capacity))
+        self.spare = max(0, int(spare))
+        self.storage = None      # Allocated on the first frame, once the resolution is known
+        self.scratch = None      # Decode target when capacity is 0 (no pre-roll wanted)
+        self.order = deque()     # Slot indices of the buffered frames, oldest first
+        self.free = deque()      # Slot indices nobody is writing to
+        self.pending = None      # Slot returned by next_slot(), waiting for commit()
+        self.lent = 0            # Slots lent to the capture thread
+        self._lock = threading.Lock() # lease()/release() run on the capture thread
+
+    def next_slot(self, shape):
+        """
+        Returns the writable slot for the next frame. Call commit() once it is filled.
+        (Re)allocates the storage only if the frame shape changed.
+        """
+        shape = tuple(shape)
+        if self.capacity == 0:
+            if self.scratch is None or self.scratch.shape != shape:
+                self.scratch = np.empty(shape, dtype=np.uint8)
+            return self.scratch
+
+        with self._lock:
+            if self.storage is None or self.storage.shape[1:] != shape:
+                self._allocate(shape)
+            if self.pending is None:
+                # Every slot taken: the oldest frame is decoded over
+                self.pending = self.free.popleft() if self.free else self.order.popleft()
+            return self.storage[self.pending]
+
+    def commit(self):
+        """Marks the slot returned by next_slot() as the newest frame."""
+        if self.capacity == 0:
+            return
+        with self._lock:
+            if self.pending is not None:
+                self._append(self.pending)
+                self.pending = None
+
+    def push(self, frame):
+        """
+        Adds a frame. A frame decoded into a leased slot is committed in place,
+        any other frame is copied into the ring.
+        """
+        if self.capacity == 0:
+            return
+        with self._lock:
+            index = self._index(frame)
+            if index is not None:
+                if index == self.pending:
+                    self.pending = None
+                else:
+                    self.lent -= 1
+                self._append(index)
+                return
+
+        np.copyto(self.next_slot(frame.shape), frame)
+        self.commit()
+
+    def lease(self, shape):
+        """
+        Lends a free slot to a decoder running on another thread (e.g. VideoStream).
+        The frame comes back through push(), or release() if it is dropped.
+        Returns None if no slot is free or the ring has no storage at this shape yet:
+        the decoder allocates its own frame, which push() copies (storage is only
+        ever allocated on the pipeline thread).
+        """
+        with self._lock:
+            if self.storage is None or self.storage.shape[1:] != tuple(shape):
+                return None
+            if self.lent >= self.spare or not self.free:
+                return None
+            self.lent += 1
+            return self.storage[self.free.popleft()]
+
+    def release(self, frame):
+        """Takes back a leased slot that will not be pushed (e.g. a stale live frame)."""
+        with self._lock:
+            index = self._index(frame)
+            if index is not None and index != self.pending:
+                self.lent -= 1
+                self.free.append(index)
+
+    def _index(self, frame):
+        # Slot index of a view into the current storage (None for any other frame,
+        # including slots of a storage that was detached or reallocated since)
+        if self.storage is None or frame.base is not self.storage:
+            return None
+        return (frame.ctypes.data - self.storage.ctypes.data) // self.storage[0].nbytes
+
+    def _append(self, index):
+        self.order.append(index)
+        while len(self.order) > self.capacity:
+            self.free.append(self.order.popleft())
+
+    def _allocate(self, shape):
+        self.storage = np.empty((self.capacity + self.spare, *shape), dtype=np.uint8)
+        self.order.clear()
+        self.free = deque(range(len(self.storage)))
+        self.pending, self.lent = None, 0
+
+    def frames(self):
+        """Yields the buffered frames, oldest first (views into the ring, do not keep them)."""
+        with self._lock:
+            storage, order = self.storage, list(self.order)
+        for index in order:
+            yield storage[index]
+
+    def resize(self, capacity):
+        """Changes the ring length, keeping the newest frames."""
+        capacity = max(0, int(capacity))
+        if capacity == self.capacity:
+            return
+
+        with self._lock:
+            newest = [self.storage[i] for i in self.order][-capacity:] if capacity else []
+            shape = self.storage.shape[1:] if self.storage is not None else None
+            self.capacity = capacity
+            if shape is None or not capacity:
+                self.storage, self.pending, self.lent = None, None, 0
+                self.order.clear()
+                self.free.clear()
+                return
+
+            # Slots still lent out belong to the old storage: push() copies them
+            self._allocate(shape)
+            for frame in newest:
+                index = self.free.popleft()
+                self.storage[index] = frame
+                self.order.append(index)
+
+    def detach(self):
+        """
+        Hands the buffered frames (oldest first) to a consumer and starts a fresh ring.
+        No copy: the old storage now belongs to the consumer, the next frame allocates a new one.
+        """
+        with self._lock:
+            frames = [self.storage[i] for i in self.order]
+            self.storage, self.pending, self.lent = None, None, 0
+            self.order.clear()
+            self.free.clear()
+        return frames
+
+    def clear(self):
+        with self._lock:
+            self.free.extend(self.order)
+            self.order.clear()
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"mode": "raw", "frames": len(self.order), "bytes": self.nbytes, "dropped": 0}
+
+    def __iter__(self):
+        return self.frames()
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def nbytes(self):
+        return self.storage.nbytes if self.storage is not None else 0
+
+
+class CompressedFrameBuffer:
+    """
+    Compressed pre-event history for long pre-roll windows (10-30 s).
+    Responsibility:
+    1. Keeps the last `capacity` frames JPEG/PNG-encoded in memory.
+    2. Encodes on a background thread; the capture loop only pays one memcpy.
+    3. Decodes only when an incident is flushed to the VideoWriter.
+    Memory is bounded by `capacity` frames and, optionally, by `max_bytes`.
+    """
+    def __init__(self, capacity, fmt="jpeg", quality=85, max_bytes=None, staging_slots=4):
+        self.capacity = max(0, int(capacity))
+        self.ext = ".png" if fmt == "png" else ".jpg"
+        self.params = [int(cv2.IMWRITE_PNG_COMPRESSION), int(quality)] if fmt == "png" \
+            else [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self.max_bytes = max_bytes
+
+        self.encoded = deque()   # Encoded frames, oldest first
+        self.encoded_bytes = 0
+        self.dropped = 0         # Frames skipped because the encoder fell behind
+        self._lock = threading.Lock()
+
+        # Staging: a few preallocated frames the encoder thread reads from
+        self.staging_slots = staging_slots
+        self._free = queue.Queue()
+        self._work = queue.Queue()
+        self._staging_shape = None
+        self._scratch = None
+
+        self._running = True
+        self._thread = threading.Thread(target=self._encoder_loop, daemon=True)
+        self._thread.start()
+
+    def next_slot(self, shape):
+        """Reusable decode target; its content is staged for encoding by commit()."""
+        shape = tuple(shape)
+        if self._scratch is None or self._scratch.shape != shape:
+            self._scratch = np.empty(shape, dtype=np.uint8)
+        return self._scratch
+
+    def commit(self):
+        self.push(self._scratch)
+
+    def push(self, frame):
+        """Hands a copy of the frame to the encoder thread (never blocks)."""
+        if self.capacity == 0:
+            return
+        if self._staging_shape != frame.shape:
+            self._allocate_staging(frame.shape)
+
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        if slot.shape != frame.shape: # Old-shape slot recycled during a resolution change
+            self.dropped += 1
+            return
+        np.copyto(slot, frame)
+        self._work.put(slot)
+
+    def _allocate_staging(self, shape):
+        # In-flight old-shape slots are not recycled by the encoder (nobody waits for them)
+        self._free = queue.Queue()
+        for _ in range(self.staging_slots):
+            self._free.put(np.empty(shape, dtype=np.uint8))
+        self._staging_shape = shape
+
+    def _encoder_loop(self):
+        while self._running:
+            try:
+                slot = self._work.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                ok, buffer = cv2.imencode(self.ext, slot, self.params)
+                if ok:
+                    self._append(buffer.tobytes())
+            except Exception as e:
+                logger.error(f"Pre-event encoder error: {e}")
+            finally:
+                if slot.shape == self._staging_shape:
+                    self._free.put(slot)
+                self._work.task_done()
+
+    def _append(self, data):
+        with self._lock:
+            self.encoded.append(data)
+            self.encoded_bytes += len(data)
+            while self.encoded and (len(self.encoded) > self.capacity or
+                                    (self.max_bytes and self.encoded_bytes > self.max_bytes)):
+                self.encoded_bytes -= len(self.encoded.popleft())
+
+    def snapshot(self):
+        """
+        The encoded frames right now, oldest first (cheap: bytes are immutable).
+        Never waits for the encoder: the last frame or two may still be in flight.
+        """
+        with self._lock:
+            return list(self.encoded)
+
+    def frames(self):
+        """Decodes and yields the buffered frames, oldest first."""
+        return self._decode(self.snapshot())
+
+    def detach(self):
+        """
+        Hands the buffered frames to a consumer and empties the buffer.
+        Returns a lazy iterator: decoding happens wherever it is consumed.
+        Called on the capture thread when an incident starts, so it takes what is already
+        encoded instead of waiting for the frames still in flight.
+        """
+        with self._lock:
+            encoded = list(self.encoded)
+            self.encoded.clear()
+            self.encoded_bytes = 0
+        return self._decode(encoded)
+
+    @staticmethod
+    def _decode(encoded):
+        for data in encoded:
+            yield cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def resize(self, capacity):
+        with self._lock:
+            self.capacity = max(0, int(capacity))
+            while len(self.encoded) > self.capacity:
+                self.encoded_bytes -= len(self.encoded.popleft())
+
+    def clear(self):
+        with self._lock:
+            self.encoded.clear()
+            self.encoded_bytes = 0
+
+    def close(self):
+        """Stops the encoder; returns once it has finished the frame it was encoding."""
+        self._running = False
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    def __iter__(self):
+        return self.frames()
+
+    def __len__(self):
+        return len(self.encoded)
+
+    @property
+    def nbytes(self):
+        staging = self.staging_slots * int(np.prod(self._staging_shape)) if self._staging_shape else 0
+        return self.encoded_bytes + staging
+
+    def stats(self):
+        return {"mode": self.ext[1:], "frames": len(self.encoded), "bytes": self.nbytes, "dropped": self.dropped}
+
+
+def create_pre_event_buffer(capacity, spare=0):
+    """
+    Builds the pre-event buffer selected by system.pre_event_compression.
+    spare: extra raw slots a capture thread may decode into ahead of the pipeline.
+    """
+    mode = cfg['system'].get('pre_event_compression', 'none')
+    if mode in ('jpeg', 'png'):
+        max_mb = cfg['system'].get('pre_event_max_mb')
+        return CompressedFrameBuffer(
+            capacity, fmt=mode,
+            quality=cfg['system'].get('pre_event_quality', 85 if mode == 'jpeg' else 1),
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else None
+        )
+    return FrameRing(capacity, spare)
@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.config_loader import cfg
+from src.utils.logger import logger
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Series:
+    """One latency series: running count/sum plus a bounded window for the quantiles."""
+    __slots__ = ("count", "total", "window")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.window = deque(maxlen=window)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics (latencies, counters, gauges).
+    Responsibility:
+    1. Low-overhead recording: one perf_counter pair and a deque append per timed stage.
+    2. p50/p95/p99 over the last `window` samples of every latency series.
+    3. Exports Prometheus text format (HTTP endpoint) and JSON (periodic dump).
+    Collectors registered with add_collector() refresh gauges right before every export,
+    so components keep their own counters and nothing is double counted.
+    """
+    def __init__(self, enabled=True, window=1024, prefix="sentinai"):
+        self.enabled = enabled
+        self.window = window
+        self.prefix = prefix
+
+        self.latencies = {}   # (name, labels) -> _Series
+        self.counters = {}    # (name, labels) -> float
+        self.gauges = {}      # (name, labels) -> float
+        self.collectors = []
+        self._lock = threading.Lock()
+
+        self._server = None
+        self._dump_thread = None
+        self._stop = threading.Event()
+
+    # --- Recording ---
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with metrics.timer("detect", stream="cam0"): ..."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self.latencies.get(key)
+            if series is None:
+                series = self.latencies[key] = _Series(self.window)
+            series.count += 1
+            series.total += seconds
+            series.window.append(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_total(self, name, value, **labels):
+        """Sets a counter from a component's own cumulative count (used by collectors)."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = value
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def add_collector(self, collector):
+        """collector() is called before every export to refresh gauges."""
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    # --- Export ---
+
+    def snapshot(self):
+        """Everything as plain dicts (the JSON dump format)."""
+        self._collect()
+        with self._lock:
+            latencies = {key: (s.count, s.total, sorted(s.window)) for key, s in self.latencies.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        def label_str(labels):
+            return ",".join(f"{k}={v}" for k, v in labels)
+
+        report = {"timestamp": time.time(), "latency_ms": {}, "counters": {}, "gauges": {}}
+        for (name, labels), (count, total, window) in latencies.items():
+            entry = {"count": count, "mean": total * 1000 / count if count else 0.0}
+            for q in QUANTILES:
+                entry[f"p{int(q * 100)}"] = self._quantile(window, q) * 1000
+            report["latency_ms"].setdefault(name, {})[label_str(labels)] = entry
+        for (name, labels), value in counters.items():
+            report["counters"].setdefault(name, {})[label_str(labels)] = value
+        for (name, labels), value in gauges.items():
+            report["gauges"].setdefault(name, {})[label_str(labels)] = value
+        return report
+
+    def prometheus_text(self):
+        self._collect()
+        with self._lock:
+            latencies = {key: (s.count, s.total, sorted(s.window)) for key, s in self.latencies.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({n for n, _ in series}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} {kind}")
+                for (n, labels), value in series.items():
+                    if n == name:
+                        lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        for name in sorted({n for n, _ in latencies}):
+            metric = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (n, labels), (count, total, window) in latencies.items():
+                if n != name:
+                    continue
+                for q in QUANTILES:
+                    lines.append(f"{metric}{self._labels(labels + (('quantile', q),))} {self._quantile(window, q):.6f}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {total:.6f}")
+                lines.append(f"{metric}_count{self._labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    # --- Serving ---
+
+    def start(self, http_host="127.0.0.1", http_port=None, json_path=None, json_interval=30.0):
+        """Starts the HTTP endpoint and/or the periodic JSON dump (both optional)."""
+        if not self.enabled:
+            return
+        self._stop.clear()
+
+        if http_port:
+            registry = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.startswith("/metrics.json"):
+                        body, content_type = json.dumps(registry.snapshot(), indent=2).encode(), "application/json"
+                    elif self.path.startswith("/metrics"):
+                        body, content_type = registry.prometheus_text().encode(), "text/plain; version=0.0.4"
+                    else:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer((http_host, int(http_port)), Handler)
+                threading.Thread(target=self._server.serve_forever, daemon=True).start()
+                logger.info(f"Metrics endpoint: http://{http_host}:{http_port}/metrics")
+            except OSError as e:
+                logger.error(f"Metrics endpoint could not start on port {http_port}: {e}")
+
+        if json_path:
+            self._dump_thread = threading.Thread(target=self._dump_loop, args=(json_path, json_interval), daemon=True)
+            self._dump_thread.start()
+
+    def stop(self, json_path=None):
+        """Stops serving; writes a last JSON dump if a path is given."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        if json_path and self.enabled:
+            self.dump_json(json_path)
+
+    def dump_json(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".partial"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    # --- Internals ---
+
+    def _dump_loop(self, path, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.dump_json(path)
+            except Exception as e:
+                logger.error(f"Metrics dump failed: {e}")
+
+    def _collect(self):
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+
+    @staticmethod
+    def _quantile(sorted_window, q):
+        if not sorted_window:
+            return 0.0
+        return sorted_window[min(len(sorted_window) - 1, int(q * len(sorted_window)))]
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# Global metrics instance
+metrics = MetricsRegistry(
+    enabled=cfg.get('metrics', {}).get('enabled', True),
+    window=cfg.get('metrics', {}).get('window', 1024)
+)
@@ -0,0 +1,137 @@
+import copy
+import os
+import shutil
+import numpy as np
+import torch
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+
+# onnxruntime is only needed when a phase is switched to backend: "onnx"
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+except ImportError:
+    ort = None
+
+
+def _onnx_cfg():
+    return cfg.get('onnx', {}) or {}
+
+def artifact_path(name, quantize=None):
+    """
+    Where an exported model lives: models/onnx/<name>[_int8].onnx
+    """
+    cache_dir = _onnx_cfg().get('cache_dir', os.path.join(cfg['paths'].get('model_dir', 'models/'), 'onnx'))
+    os.makedirs(cache_dir, exist_ok=True)
+    suffix = "_int8" if quantize == "int8" else ""
+    return os.path.join(cache_dir, f"{name}{suffix}.onnx")
+
+def require_onnxruntime():
+    if ort is None:
+        raise ImportError("onnxruntime is not installed. Run: pip install onnxruntime onnx")
+
+def quantize_int8(fp32_path, int8_path):
+    """Dynamic INT8 quantization (weights INT8, activations quantized on the fly)."""
+    require_onnxruntime()
+    logger.info(f"Quantizing {fp32_path} -> {int8_path} (dynamic INT8)...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+def create_session(model_path):
+    """
+    Creates an onnxruntime session with the configured thread pools.
+    intra_op_threads: threads inside one operator (matmul/conv). 0 = onnxruntime default.
+    inter_op_threads: threads running independent operators in parallel. 0 = default.
+    """
+    require_onnxruntime()
+    settings = _onnx_cfg()
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = int(settings.get('intra_op_threads', 0))
+    options.inter_op_num_threads = int(settings.get('inter_op_threads', 0))
+    if options.inter_op_num_threads > 1:
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+    logger.info(f"Creating ONNX Runtime session for {model_path} "
+                f"(intra={options.intra_op_num_threads}, inter={options.inter_op_num_threads})")
+    return ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+def export_yolo(yolo_model, weights_path, quantize=None):
+    """
+    Exports the YOLO detector to ONNX (once) and returns the cached artifact path.
+    """
+    name = os.path.splitext(os.path.basename(weights_path))[0]
+    fp32_path = artifact_path(name)
+    if not os.path.exists(fp32_path):
+        logger.info(f"Exporting YOLO model {weights_path} to ONNX...")
+        exported = yolo_model.export(format="onnx", imgsz=640, dynamic=False, simplify=True, verbose=False)
+        shutil.move(exported, fp32_path)
+
+    if quantize != "int8":
+        return fp32_path
+
+    int8_path = artifact_path(name, quantize)
+    if not os.path.exists(int8_path):
+        quantize_int8(fp32_path, int8_path)
+    return int8_path
+
+
+class _ImageTower(torch.nn.Module):
+    """encode_image + L2 normalization, the exact features Phase 2 scores against."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, images):
+        features = self.model.encode_image(images)
+        return features / features.norm(dim=-1, keepdim=True)
+
+
+class OnnxImageEncoder:
+    """
+    The CoCa image tower running on ONNX Runtime.
+    Responsibility:
+    1. Exports the image tower to models/onnx/ on first use (FP32, optionally INT8).
+    2. Encodes a preprocessed (N, 3, 224, 224) batch into normalized embeddings.
+    """
+    def __init__(self, model, name, image_size=224, quantize=None):
+        fp32_path = artifact_path(name)
+        if not os.path.exists(fp32_path):
+            self._export(model, fp32_path, image_size)
+
+        self.model_path = fp32_path
+        if quantize == "int8":
+            self.model_path = artifact_path(name, quantize)
+            if not os.path.exists(self.model_path):
+                quantize_int8(fp32_path, self.model_path)
+
+        self.session = create_session(self.model_path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    @staticmethod
+    def _export(model, path, image_size):
+        require_onnxruntime()
+        if isinstance(image_size, int):
+            image_size = (image_size, image_size)
+        logger.info(f"Exporting CoCa image tower to {path} (one-time, may take a minute)...")
+
+        # Export from an FP32 CPU copy so the live model is left untouched
+        tower = _ImageTower(copy.deepcopy(model).float().cpu()).eval()
+        dummy = torch.zeros(1, 3, *image_size)
+        with torch.no_grad():
+            torch.onnx.export(
+                tower, dummy, path,
+                input_names=["images"], output_names=["embeddings"],
+                dynamic_axes={"images": {0: "batch"}, "embeddings": {0: "batch"}},
+                opset_version=17
+            )
+
+    def __call__(self, image_batch):
+        """
+        Input: (N, 3, H, W) float tensor
+        Output: (N, D) normalized float32 tensor (on CPU)
+        """
+        images = image_batch.detach().float().cpu().numpy()
+        embeddings = self.session.run(None, {self.input_name: np.ascontiguousarray(images)})[0]
+        return torch.from_numpy(embeddings)
@@ -1,17 +1,53 @@
 import cv2
+import os
 import threading
-import queue
 import time
+import numpy as np
+from collections import deque
 from src.utils.logger import logger
+from src.utils.metrics import metrics
 
 class VideoStream:
-    """Reads frames from a video file in a separate thread."""
-    def __init__(self, path, queue_size=4):
+    """
+    Reads frames from a video file or camera in a separate thread.
+    Two policies:
+    - "file": never drops. The reader waits (no polling) while `queue_size` frames are pending.
+    - "live": keeps only the newest frame; older unread frames are dropped and counted,
+      so the lag behind the camera stays bounded when processing is slower than real time.
+      A failed read is retried (`read_retries` times), then the source is reopened up to
+      `reconnect_attempts` times, `reconnect_delay` seconds apart (doubling), before the
+      stream ends. RTSP cameras hiccup routinely; a file end is final.
+    Decode targets come from `slots` when given (e.g. the pre-event FrameRing: frames are
+    decoded straight into it and handed back through its push()/release()), otherwise
+    from the frames the consumer recycles.
+    Decode time is recorded as the "decode" metric, labelled with `name` (default: the path).
+    """
+    def __init__(self, path, queue_size=4, mode="file", read_retries=5, reconnect_attempts=3, reconnect_delay=1.0,
+                 slots=None, name=None):
         """Initializes the video stream."""
         self.path = path
+        self.mode = mode
+        self.queue_size = max(1, queue_size)
+        self.read_retries = max(0, int(read_retries))
+        self.reconnect_attempts = max(0, int(reconnect_attempts))
+        self.reconnect_delay = reconnect_delay
+        self.slots = slots
+        self.name = str(path) if name is None else name
         self.stopped = False
-        self.Q = queue.Queue(maxsize=queue_size)
-        
+        self.ended = False
+
+        self.buffer = deque()      # (frame, capture_time), oldest first
+        self.free = deque()        # Frames handed back through recycle(), decoded into again
+        self.condition = threading.Condition()
+        self.thread = None
+
+        # Counters
+        self.frames_read = 0
+        self.dropped = 0
+        self.last_lag = 0.0        # Seconds between decode and read() of the last frame
+        self.reconnects = 0        # Successful reopenings of a live source
+        self._failures = 0         # Consecutive failed reads
+
         self.cap = cv2.VideoCapture(path)
         if not self.cap.isOpened():
             logger.error(f"Could not open video file: {path}")
@@ -21,37 +57,137 @@ class VideoStream:
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
-        
-        logger.info(f"Video Stream initialized: {self.width}x{self.height} @ {self.fps} FPS")
+
+        logger.info(f"Video Stream initialized: {self.width}x{self.height} @ {self.fps} FPS ({mode} mode)")
 
     def start(self):
         """Starts the thread to read frames from the video."""
-        t = threading.Thread(target=self.update, args=())
-        t.daemon = True # Thread dies when main program dies
-        t.start()
+        self.thread = threading.Thread(target=self.update, args=())
+        self.thread.daemon = True # Thread dies when main program dies
+        self.thread.start()
         return self
 
     def update(self):
-        """Worker function: Keeps reading frames until the queue is full."""
-        while not self.stopped:
-            if not self.Q.full():
-                ret, frame = self.cap.read()
+        """Worker function: decodes frames and applies the file/live policy."""
+        try:
+            while not self.stopped:
+                # File mode: sleep on the condition until the consumer makes room
+                if self.mode != "live":
+                    with self.condition:
+                        while len(self.buffer) >= self.queue_size and not self.stopped:
+                            self.condition.wait()
+                    if self.stopped:
+                        break
+
+                target = self._decode_target()
+                with metrics.timer("decode", stream=self.name):
+                    ret, frame = self.cap.read(target) if target is not None else self.cap.read()
+                if target is not None and not (ret and np.shares_memory(frame, target)):
+                    self._release(target) # Read failed, or the backend ignored the target
                 if not ret:
-                    self.stop()
-                    return
-                self.Q.put(frame)
-            else:
-                time.sleep(0.01) # Don't burn CPU if queue is full
+                    if self.mode == "live" and self._recover():
+                        continue
+                    break
+                self._failures = 0
+
+                with self.condition:
+                    if self.mode == "live" and self.buffer:
+                        # Only the newest frame matters for a live camera
+                        self.dropped += len(self.buffer)
+                        while self.buffer:
+                            stale, _ = self.buffer.popleft()
+                            self._release(stale)
+                    self.buffer.append((frame, time.monotonic()))
+                    self.condition.notify_all()
+        finally:
+            with self.condition:
+                self.ended = True
+                self.condition.notify_all()
+            self.cap.release()
+
+    def _decode_target(self):
+        if self.slots is not None:
+            return self.slots.lease((self.height, self.width, 3))
+        return self.free.popleft() if self.free else None
+
+    def _release(self, frame):
+        """Gives back a decode target that will never reach the consumer."""
+        if self.slots is not None:
+            self.slots.release(frame)
+        elif len(self.free) < self.queue_size + 2:
+            self.free.append(frame)
+
+    def _recover(self):
+        """
+        Live mode, after a failed read: retry, then reopen the source.
+        Returns True once a read may be attempted again, False to end the stream.
+        """
+        if os.path.isfile(str(self.path)):
+            return False # A file forced into live mode: its end is final, never replay it
+        self._failures += 1
+        if self._failures <= self.read_retries:
+            return not self._sleep(0.05)
+
+        for attempt in range(self.reconnect_attempts):
+            delay = self.reconnect_delay * (2 ** attempt)
+            logger.warning(f"Live source stalled, reconnecting in {delay:.1f} s "
+                           f"(attempt {attempt + 1}/{self.reconnect_attempts}): {self.path}")
+            if self._sleep(delay):
+                return False
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.path)
+            if self.cap.isOpened():
+                self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                self.reconnects += 1
+                self._failures = 0
+                logger.info(f"Live source reconnected: {self.path}")
+                return True
+
+        logger.error(f"Live source lost after {self.reconnect_attempts} reconnect attempts: {self.path}")
+        return False
+
+    def _sleep(self, seconds):
+        """Waits unless stop() is called first. Returns True if the stream was stopped."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.stopped, timeout=seconds)
+            return self.stopped
+
+    def read(self, timeout=None):
+        """
+        Main Thread calls this to get the next frame.
+        Returns None on timeout or once the stream has ended (see running()).
+        """
+        with self.condition:
+            while not self.buffer and not self.ended and not self.stopped:
+                if not self.condition.wait(timeout):
+                    return None
+            if not self.buffer:
+                return None
+            frame, captured_at = self.buffer.popleft()
+            self.condition.notify_all() # Room for the reader (file mode)
+
+        self.frames_read += 1
+        self.last_lag = time.monotonic() - captured_at
+        return frame
 
-    def read(self):
-        """Main Thread calls this to get the next frame."""
-        return self.Q.get()
+    def recycle(self, frame):
+        """Hands a frame the caller no longer uses back as a decode target (no re-allocation)."""
+        if self.slots is not None:
+            return # The pre-event ring owns the decode targets
+        if len(self.free) < self.queue_size + 2 and frame.shape == (self.height, self.width, 3):
+            self.free.append(frame)
 
     def running(self):
         """Returns True if the video stream is running."""
-        return not self.stopped or not self.Q.empty()
+        return not (self.ended or self.stopped) or bool(self.buffer)
 
     def stop(self):
         """Stops the video stream."""
-        self.stopped = True
-        self.cap.release()
\ No newline at end of file
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        elif self.thread is None:
+            self.cap.release()
@@ -21,11 +21,14 @@ class Visualizer:
         if detections.tracker_id is None:
             return annotated_frame
 
+        # One consistent view of the visible tracks (the workers keep updating the states)
+        snapshot = state_manager.snapshot([int(tid) for tid in detections.tracker_id])
+
         for box, track_id in zip(detections.xyxy, detections.tracker_id):   
             tracker_id = int(track_id)
             
             # Ask the brain what color and text to use
-            color, text = state_manager.get_ui_data(tracker_id)
+            color, text = state_manager.get_ui_data(tracker_id, snapshot)
             label = f"ID #{tracker_id} | {text}"
 
             # Draw Bounding Box
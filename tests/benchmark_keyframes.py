@@ -0,0 +1,68 @@
+import argparse
+import time
+import cv2
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+from src.core.analysis.vlm.keyframes import KeyframeSampler, encode_jpeg_base64, read_keyframes_sequential
+
+def seek_per_keyframe(video_path, num_frames):
+    """The previous Phase 3 path: one CAP_PROP_POS_FRAMES seek per keyframe."""
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total_frames // num_frames)
+    frames = []
+    for idx in [i * step for i in range(num_frames)]:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+def load_frames(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret: break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def run_benchmark(video_path):
+    logger.info("--- Phase 3 Keyframe Extraction Benchmark ---")
+    extraction = cfg['vlm']['extraction']
+    num_frames = extraction.get('num_frames', 8)
+    resize_dim = (extraction.get('resize_width', 480), extraction.get('resize_height', 270))
+    quality = extraction.get('jpeg_quality', 80)
+
+    def encode(frames):
+        return [encode_jpeg_base64(f, resize_dim, quality) for f in frames]
+
+    # 1. Reading back from the finished file
+    for name, reader in (("seek per keyframe", seek_per_keyframe), ("sequential grab()", read_keyframes_sequential)):
+        start = time.perf_counter()
+        images = encode(reader(video_path, num_frames))
+        logger.info(f"{name:<20}: {(time.perf_counter() - start) * 1000:7.1f} ms ({len(images)} keyframes)")
+
+    # 2. Sampled while recording: the per-frame cost is paid on the writer thread,
+    #    only encode() is left when the file closes
+    frames = load_frames(video_path)
+    sampler = KeyframeSampler(num_frames, resize_dim, quality)
+    start = time.perf_counter()
+    for frame in frames:
+        sampler.add(frame)
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    images = sampler.encode()
+    close_time = time.perf_counter() - start
+    logger.info(f"{'in-memory sampler':<20}: {close_time * 1000:7.1f} ms at close ({len(images)} keyframes), "
+                f"{add_time * 1000 / max(len(frames), 1):.3f} ms/frame while recording")
+    logger.info("--- Benchmark Complete ---")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Phase 3 keyframe extraction paths")
+    parser.add_argument("video", help="An incident MP4 (e.g. from data/outputs/)")
+    args = parser.parse_args()
+    run_benchmark(args.video)
@@ -0,0 +1,86 @@
+import time
+from src.utils.config_loader import cfg
+from src.core.analysis.vlm.interface import IVisionReasoner
+from src.core.analysis.vlm.keyframes import KeyframeSampler
+
+
+class FakeSession:
+    """Per-stream state of the fake detector (only the frame counter)."""
+    def __init__(self):
+        self.frame_index = 0
+
+    def resume(self):
+        pass
+
+
+class FakeDetector:
+    """
+    Phase 1 stand-in: returns the synthetic people exactly, with stable IDs.
+    `cost_ms` simulates the YOLO + ByteTrack time per frame.
+    """
+    def __init__(self, video, cost_ms=0.0):
+        self.video = video
+        self.cost_ms = cost_ms
+        self.session = self.create_session()
+
+    def create_session(self, detection_interval=None, propagation=None, regions=None):
+        return FakeSession()
+
+    def create_regions(self, rois=None, tiling=None):
+        return None # Synthetic people are detected exactly, wherever they are
+
+    def process_frame(self, frame, session=None):
+        session = session or self.session
+        if self.cost_ms:
+            time.sleep(self.cost_ms / 1000)
+        detections = self.video.detections(session.frame_index)
+        session.frame_index += 1
+        return detections
+
+
+class FakeActionRecognizer:
+    """
+    Phase 2 stand-in with the ActionRecognizer interface.
+    Tracks in `violent_ids` always score as a fight, everyone else as normal behavior.
+    `ms_per_clip` simulates the CoCa forward pass.
+    """
+    def __init__(self, violent_ids=(), ms_per_clip=0.0):
+        self.violent_ids = set(violent_ids)
+        self.ms_per_clip = ms_per_clip
+        self.max_batch_size = cfg['action'].get('max_batch_size', 8)
+        self.violent_label = next((p for p in cfg['action']['prompts']
+                                   if p not in cfg['action'].get('safe_prompts', [])), "people fighting")
+        self.safe_label = (cfg['action'].get('safe_prompts') or ["normal behavior"])[0]
+        self.clips_scored = 0
+
+    def get_action_score(self, frame_list):
+        return self.get_action_scores({0: frame_list}).get(0)
+
+    def get_action_scores(self, clips, cache=None):
+        if self.ms_per_clip:
+            time.sleep(self.ms_per_clip * len(clips) / 1000)
+        self.clips_scored += len(clips)
+
+        scores = {}
+        for key in clips:
+            tracker_id = key[1] if isinstance(key, tuple) else key
+            label = self.violent_label if tracker_id in self.violent_ids else self.safe_label
+            scores[key] = {label: 0.95}
+        return scores
+
+
+class FakeReasoner(IVisionReasoner):
+    """Phase 3 stand-in: confirms every incident after `latency_s` seconds."""
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.model_id = "fake-vlm"
+        self.prompt = "fake"
+        self.calls = 0
+
+    def create_keyframe_sampler(self):
+        return KeyframeSampler()
+
+    def analyze_incident(self, video_path: str, frames_b64: list = None) -> dict:
+        time.sleep(self.latency_s)
+        self.calls += 1
+        return {"threat_detected": True, "description": f"Fake report ({len(frames_b64 or [])} keyframes)."}
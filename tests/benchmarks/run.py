@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import queue
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+from src.utils.visualization import Visualizer
+from src.core.memory.evidence import EvidenceManager
+from src.core.memory.embedding_cache import EmbeddingCache
+from src.core.memory.state_manager import SecurityStateManager
+from src.pipelines.scheduler import Phase2Scheduler
+from src.pipelines.incident_writer import IncidentWriter
+from src.pipelines.stream_context import StreamContext
+from tests.benchmarks.synthetic import SyntheticVideo
+from tests.benchmarks.fakes import FakeDetector, FakeActionRecognizer, FakeReasoner
+
+RESOLUTIONS = {"640x360": (640, 360), "1280x720": (1280, 720), "1920x1080": (1920, 1080)}
+CROWDS = [1, 5, 20, 50]
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1000
+    return {"mean_ms": float(samples.mean()), "p95_ms": float(np.percentile(samples, 95)), "iterations": len(samples)}
+
+def timed(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+# --- Individual hot paths ---
+
+def bench_evidence_update(video, frames, iterations):
+    memory = EvidenceManager()
+    return timed(lambda i: memory.update(frames[i % len(frames)], video.detections(i)), iterations)
+
+def bench_state_manager(video, iterations):
+    manager = SecurityStateManager(cfg['action'].get('alert_trigger_count', 3))
+    ids = list(range(1, video.people + 1))
+
+    def step(i):
+        for tracker_id in ids:
+            manager.update_phase2(tracker_id, (tracker_id + i) % 3 == 0, "people fighting", 0.9)
+        manager.cleanup(ids)
+    return timed(step, iterations)
+
+def bench_draw(video, frames, iterations):
+    visualizer = Visualizer()
+    manager = SecurityStateManager()
+    detections = [video.detections(i) for i in range(len(frames))]
+    return timed(lambda i: visualizer.draw(frames[i % len(frames)], detections[i % len(frames)], manager), iterations)
+
+def bench_dispatch(video, frames, iterations):
+    """Scheduler submit + dispatch on the clips EvidenceManager really produces."""
+    detector = FakeDetector(video)
+    stream = StreamContext("bench", None, detector, EmbeddingCache())
+    scheduler = Phase2Scheduler()
+    analysis_queue = queue.Queue(maxsize=cfg['action'].get('max_batch_size', 8))
+
+    samples = []
+    for i in range(iterations):
+        detections = video.detections(i)
+        ready_clips = stream.memory.update(frames[i % len(frames)], detections)
+
+        start = time.perf_counter()
+        scheduler.submit(stream, ready_clips, detections)
+        scheduler.dispatch(analysis_queue, analysis_queue.maxsize)
+        samples.append(time.perf_counter() - start)
+
+        while not analysis_queue.empty(): # The worker side, not timed
+            analysis_queue.get_nowait()
+    return dict(summarize(samples), **{"scheduler": scheduler.stats()})
+
+def bench_recording(video, frames, iterations, out_dir):
+    """Capture-loop cost of recording (start + per-frame hand-off) and the writer's own throughput."""
+    writer = IncidentWriter(on_finished=lambda recording: None, queue_size=cfg['system'].get('incident_queue_size', 64),
+                            policy="block", block_timeout=5.0)
+    path = os.path.join(out_dir, f"bench_{video.width}x{video.height}_{video.people}.mp4")
+    pre_roll = [frames[i % len(frames)] for i in range(min(iterations, 60))]
+
+    wall_start = time.perf_counter()
+    start = time.perf_counter()
+    recording = writer.start(None, path, 30, (video.width, video.height), pre_roll)
+    start_ms = (time.perf_counter() - start) * 1000
+
+    result = timed(lambda i: writer.write(recording, frames[i % len(frames)]), iterations)
+    writer.finish(recording)
+    writer.stop()
+    wall = time.perf_counter() - wall_start
+
+    result.update({"start_ms": start_ms, "writer_fps": (len(pre_roll) + iterations) / wall,
+                   "dropped": recording.frames_dropped, "file_ok": not recording.failed})
+    return result
+
+def bench_pipeline(video, num_frames, out_dir):
+    """End to end: RapidPipeline on a synthetic file with stub models (headless)."""
+    from src.pipelines.rapid_flow import RapidPipeline
+
+    path = video.write(os.path.join(out_dir, f"synthetic_{video.width}x{video.height}_{video.people}.mp4"), num_frames)
+    cfg['paths']['output_dir'] = out_dir
+    pipeline = RapidPipeline(
+        headless=True, detector=FakeDetector(video),
+        brain=FakeActionRecognizer(violent_ids={1}), reasoner=FakeReasoner()
+    )
+    start = time.perf_counter()
+    pipeline.run(path)
+    elapsed = time.perf_counter() - start
+    return {"mean_ms": elapsed * 1000 / num_frames, "fps": num_frames / elapsed, "iterations": num_frames,
+            "clips_scored": pipeline.brain.clips_scored, "vlm_calls": pipeline.reasoner.calls}
+
+# --- Suite ---
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_suite(resolutions, crowds, iterations, include_pipeline):
+    # Benchmarks never open a port or write dumps
+    cfg.setdefault('metrics', {}).update({'http_port': None, 'json_path': None})
+
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for resolution in resolutions:
+            width, height = RESOLUTIONS[resolution]
+            for people in crowds:
+                video = SyntheticVideo(width, height, people)
+                frames = [video.frame(i) for i in range(min(iterations, 32))]
+
+                benches = {
+                    "evidence_update": lambda: bench_evidence_update(video, frames, iterations),
+                    "state_manager": lambda: bench_state_manager(video, iterations),
+                    "visualizer_draw": lambda: bench_draw(video, frames, iterations),
+                    "phase2_dispatch": lambda: bench_dispatch(video, frames, iterations),
+                }
+                # Recording cost depends on the resolution only
+                if people == crowds[0]:
+                    benches["incident_recording"] = lambda: bench_recording(video, frames, iterations, out_dir)
+                if include_pipeline:
+                    benches["pipeline_end_to_end"] = lambda: bench_pipeline(video, iterations, out_dir)
+
+                for name, bench in benches.items():
+                    result = dict(bench=name, resolution=resolution, people=people, **bench())
+                    results.append(result)
+                    logger.info(f"{name:<20} {resolution:>9} {people:>3} people: "
+                                f"{result['mean_ms']:8.3f} ms (p95 {result.get('p95_ms', result['mean_ms']):8.3f})")
+
+    return {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                        "python": platform.python_version(), "cpus": os.cpu_count()},
+            "iterations": iterations, "results": results}
+
+def compare(current, baseline_path, tolerance):
+    """Prints mean-time ratios against an earlier run; returns the regressions."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["bench"], r["resolution"], r["people"]): r for r in baseline["results"]}
+
+    logger.info(f"--- Compared with {baseline.get('commit', '?')} ({baseline_path}) ---")
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["bench"], result["resolution"], result["people"]))
+        if not old or not old["mean_ms"]:
+            continue
+        ratio = result["mean_ms"] / old["mean_ms"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        if flag:
+            regressions.append(result)
+        logger.info(f"{result['bench']:<20} {result['resolution']:>9} {result['people']:>3} people: "
+                    f"{old['mean_ms']:8.3f} -> {result['mean_ms']:8.3f} ms (x{ratio:.2f}) {flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU-only benchmarks of the pipeline logic with stub models")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--crowds", nargs="+", type=int, default=CROWDS)
+    parser.add_argument("--iterations", type=int, default=120)
+    parser.add_argument("--pipeline", action="store_true", help="Also run the full pipeline end to end")
+    parser.add_argument("--output", default="tests/benchmarks/results.json")
+    parser.add_argument("--compare", help="An earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown flagged as regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    logger.info("--- Hardware-free Benchmark Suite ---")
+    report = run_suite(args.resolutions, args.crowds, args.iterations, args.pipeline)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    logger.info(f"Results written to {args.output} (commit {report['commit']})")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.tolerance)
+        if regressions:
+            raise SystemExit(1)
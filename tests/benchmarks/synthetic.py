@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import supervision as sv
+
+
+class SyntheticVideo:
+    """
+    Deterministic stand-in for a CCTV stream: coloured rectangles ("people")
+    moving at constant speed and bouncing off the borders.
+    The exact boxes are known, so a fake detector can return them with stable IDs.
+    """
+    def __init__(self, width=1280, height=720, people=5, seed=0):
+        self.width, self.height = width, height
+        self.people = people
+        rng = np.random.default_rng(seed)
+
+        # A "person" is roughly a quarter of the frame tall and 2.5x taller than wide
+        box_h = rng.uniform(0.18, 0.32, people) * height
+        self.sizes = np.stack([box_h / 2.5, box_h], axis=1)
+        self.limits = np.array([width, height], dtype=np.float64) - self.sizes
+        self.start = rng.uniform(0, 1, (people, 2)) * self.limits
+        self.velocity = rng.uniform(-6, 6, (people, 2)) * (height / 720)
+        self.colors = rng.integers(40, 255, (people, 3))
+        self.background = np.full((height, width, 3), 90, dtype=np.uint8)
+
+    def boxes(self, index):
+        """(people, 4) xyxy boxes at frame `index`."""
+        position = self.start + self.velocity * index
+        period = 2 * self.limits
+        position = np.mod(position, period)
+        position = np.where(position > self.limits, period - position, position)
+        return np.concatenate([position, position + self.sizes], axis=1).astype(np.float32)
+
+    def detections(self, index):
+        n = self.people
+        return sv.Detections(
+            xyxy=self.boxes(index),
+            confidence=np.ones(n, dtype=np.float32),
+            class_id=np.zeros(n, dtype=int),
+            tracker_id=np.arange(1, n + 1)
+        )
+
+    def frame(self, index):
+        frame = self.background.copy()
+        for (x1, y1, x2, y2), color in zip(self.boxes(index).astype(int), self.colors):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), tuple(int(c) for c in color), -1)
+        return frame
+
+    def write(self, path, num_frames, fps=30):
+        """Renders the clip to disk (mp4v, available in every OpenCV build)."""
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (self.width, self.height))
+        for i in range(num_frames):
+            writer.write(self.frame(i))
+        writer.release()
+        return path
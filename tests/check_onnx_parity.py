@@ -0,0 +1,87 @@
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+from src.utils.onnx_backend import OnnxImageEncoder
+from src.core.analysis.action_rec import ActionRecognizer
+
+def load_clips(video_path, num_clips, window_size):
+    """Center crops from a real video (falls back to random crops if it is missing)."""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while cap.isOpened() and len(frames) < num_clips * window_size:
+        ret, frame = cap.read()
+        if not ret: break
+        h, w = frame.shape[:2]
+        side = min(h, w)
+        y, x = (h - side) // 2, (w - side) // 2
+        frames.append(cv2.resize(frame[y:y + side, x:x + side], (224, 224)))
+    cap.release()
+
+    if len(frames) < num_clips * window_size:
+        logger.warning("Sample video unavailable or too short; using random crops.")
+        rng = np.random.default_rng(0)
+        frames = list(rng.integers(0, 256, size=(num_clips * window_size, 224, 224, 3), dtype=np.uint8))
+
+    return {i: frames[i * window_size:(i + 1) * window_size] for i in range(num_clips)}
+
+def compare(reference, candidate):
+    """Largest score difference and top-1 agreement between two score dictionaries."""
+    max_diff, agree = 0.0, 0
+    for tracker_id, ref_scores in reference.items():
+        cand_scores = candidate[tracker_id]
+        for label in set(ref_scores) | set(cand_scores):
+            max_diff = max(max_diff, abs(float(ref_scores.get(label, 0.0)) - float(cand_scores.get(label, 0.0))))
+        agree += max(ref_scores, key=ref_scores.get) == max(cand_scores, key=cand_scores.get)
+    return max_diff, agree / max(len(reference), 1)
+
+def run_parity_check(video_path, num_clips, tolerance):
+    logger.info("--- ONNX Runtime Parity Check (Phase 2 scores) ---")
+
+    # 1. PyTorch reference (the config must keep action.backend: torch for this run)
+    engine = ActionRecognizer()
+    engine.onnx_encoder = None
+    clips = load_clips(video_path, num_clips, cfg['action'].get('window_size', 8))
+
+    start = time.perf_counter()
+    reference = engine.get_action_scores(clips)
+    torch_time = time.perf_counter() - start
+    logger.info(f"torch: {torch_time * 1000:.1f} ms for {num_clips} clips")
+
+    model_name = cfg['action'].get('model_name', 'coca_ViT-L-14')
+    weights_name = os.path.splitext(os.path.basename(cfg['action'].get('weights_path', 'models/coca_l14.bin')))[0]
+
+    # 2. Same clips through the FP32 and INT8 ONNX image towers
+    report = {}
+    for quantize in ("none", "int8"):
+        engine.onnx_encoder = OnnxImageEncoder(
+            engine.model, name=f"{model_name}_{weights_name}_image",
+            image_size=engine.tensor_preprocess.image_size, quantize=quantize
+        )
+        engine.get_action_scores({0: clips[0]}) # Warmup
+        start = time.perf_counter()
+        candidate = engine.get_action_scores(clips)
+        elapsed = time.perf_counter() - start
+
+        max_diff, top1 = compare(reference, candidate)
+        passed = max_diff <= tolerance and top1 == 1.0
+        report[quantize] = {"max_abs_score_diff": max_diff, "top1_agreement": top1,
+                            "ms": elapsed * 1000, "passed": passed}
+        logger.info(f"onnx[{quantize}]: {elapsed * 1000:.1f} ms | max |diff| = {max_diff:.4f} "
+                    f"(tol {tolerance}) | top-1 agreement = {top1:.0%} | {'PASS' if passed else 'FAIL'}")
+
+    engine.onnx_encoder = None
+    logger.info("--- Parity Check Complete ---")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ONNX Runtime scores against PyTorch")
+    parser.add_argument("video", nargs="?", default=cfg['paths']['input_source'])
+    parser.add_argument("--clips", type=int, default=8)
+    parser.add_argument("--tolerance", type=float, default=0.02)
+    args = parser.parse_args()
+
+    run_parity_check(args.video, args.clips, args.tolerance)
@@ -0,0 +1,2 @@
+# Smoke scripts that load the real models (run them with `python -m tests.<name>`), not pytest suites
+collect_ignore = ["test_env.py", "test_phase2.py"]
@@ -0,0 +1,92 @@
+import argparse
+import time
+import cv2
+import numpy as np
+import supervision as sv
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+from src.core.perception.detector import Detector
+
+def match_boxes(baseline, propagated, iou_threshold=0.5):
+    """Greedy IoU matching. Returns the IoU of every matched pair."""
+    if len(baseline) == 0 or len(propagated) == 0:
+        return []
+    iou = sv.box_iou_batch(baseline.xyxy, propagated.xyxy)
+    matched = []
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        matched.append(iou[i, j])
+        iou[i, :] = -1
+        iou[:, j] = -1
+    return matched
+
+def evaluate(video_path, interval, propagation, max_frames):
+    """
+    Runs full detection (every frame) and detection skipping side by side on the
+    same frames, and scores the skipped run against the full-detection baseline.
+    """
+    detector = Detector()
+    baseline_session = detector.create_session(detection_interval=1)
+    skip_session = detector.create_session(detection_interval=interval, propagation=propagation)
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.error(f"Failed to open input video: {video_path}")
+        return None
+
+    stats = {"frames": 0, "baseline_boxes": 0, "skip_boxes": 0, "matched": 0, "iou_sum": 0.0,
+             "baseline_time": 0.0, "skip_time": 0.0}
+    baseline_ids, skip_ids = set(), set()
+
+    while stats["frames"] < max_frames:
+        ret, frame = cap.read()
+        if not ret: break
+        stats["frames"] += 1
+
+        start = time.perf_counter()
+        baseline = detector.process_frame(frame, session=baseline_session)
+        stats["baseline_time"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        skipped = detector.process_frame(frame, session=skip_session)
+        stats["skip_time"] += time.perf_counter() - start
+
+        ious = match_boxes(baseline, skipped)
+        stats["baseline_boxes"] += len(baseline)
+        stats["skip_boxes"] += len(skipped)
+        stats["matched"] += len(ious)
+        stats["iou_sum"] += float(np.sum(ious))
+        if baseline.tracker_id is not None: baseline_ids.update(baseline.tracker_id.tolist())
+        if skipped.tracker_id is not None: skip_ids.update(skipped.tracker_id.tolist())
+
+    cap.release()
+
+    frames = max(stats["frames"], 1)
+    report = {
+        "detection_interval": interval,
+        "propagation": propagation,
+        "frames": stats["frames"],
+        "recall@0.5": round(stats["matched"] / max(stats["baseline_boxes"], 1), 3),
+        "precision@0.5": round(stats["matched"] / max(stats["skip_boxes"], 1), 3),
+        "mean_iou": round(stats["iou_sum"] / max(stats["matched"], 1), 3),
+        # More distinct IDs than the baseline means propagation broke tracks apart
+        "track_ids_baseline": len(baseline_ids),
+        "track_ids_skipping": len(skip_ids),
+        "baseline_fps": round(frames / max(stats["baseline_time"], 1e-6), 1),
+        "skipping_fps": round(frames / max(stats["skip_time"], 1e-6), 1),
+    }
+
+    logger.info("=== DETECTION SKIPPING REPORT ===")
+    for key, value in report.items():
+        logger.info(f"{key:>20}: {value}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propagated boxes vs. full detection")
+    parser.add_argument("video", nargs="?", default=cfg['paths']['input_source'])
+    parser.add_argument("--interval", type=int, default=3)
+    parser.add_argument("--propagation", default="velocity", choices=["velocity", "flow"])
+    parser.add_argument("--max-frames", type=int, default=900)
+    args = parser.parse_args()
+
+    evaluate(args.video, args.interval, args.propagation, args.max_frames)
@@ -0,0 +1,111 @@
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+import supervision as sv
+from src.utils.logger import logger
+from src.utils.config_loader import cfg
+from src.core.perception.detector import Detector
+from tests.evaluate_detection_interval import match_boxes
+
+def evaluate(video_path, rois, tiling, max_frames, stride):
+    """
+    Runs full-frame YOLO and ROI / tiled YOLO on the same frames (raw detections, no tracking).
+    Without ground truth, the full-frame boxes are the reference: recall says how many of them
+    the regions still find; "extra" counts people only the regions found (usually small, distant ones).
+    """
+    detector = Detector()
+    regions = detector.create_regions(rois, tiling)
+    if regions is None:
+        logger.error("Nothing to compare: give --roi and/or enable tiling.")
+        return None
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.error(f"Failed to open input video: {video_path}")
+        return None
+
+    stats = {"frames": 0, "full_boxes": 0, "region_boxes": 0, "matched": 0, "iou_sum": 0.0}
+    full_times, region_times, extra_heights = [], [], []
+    index, frame_shape = -1, None
+
+    while stats["frames"] < max_frames:
+        ret, frame = cap.read()
+        if not ret: break
+        index += 1
+        if index % stride:
+            continue
+        stats["frames"] += 1
+        frame_shape = frame.shape
+
+        start = time.perf_counter()
+        full = detector.detect(frame)
+        full_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tiled = detector.detect(frame, regions)
+        region_times.append(time.perf_counter() - start)
+
+        # With ROIs, only the full-frame boxes standing inside them are expected back
+        if regions.rois and len(full):
+            full = full[regions.inside_roi(full)]
+
+        ious = match_boxes(full, tiled)
+        stats["full_boxes"] += len(full)
+        stats["region_boxes"] += len(tiled)
+        stats["matched"] += len(ious)
+        stats["iou_sum"] += float(np.sum(ious))
+
+        # Heights of the boxes no full-frame box overlaps
+        if len(tiled):
+            best = sv.box_iou_batch(tiled.xyxy, full.xyxy).max(axis=1) if len(full) else np.zeros(len(tiled))
+            extra = tiled.xyxy[best < 0.5]
+            extra_heights += (extra[:, 3] - extra[:, 1]).tolist()
+
+    cap.release()
+
+    windows = regions.windows(frame_shape) if frame_shape else []
+    report = {
+        "backend": detector.backend,
+        "rois": len(regions.rois),
+        "tiled": regions.tiled,
+        "windows_per_frame": len(windows),
+        "frames": stats["frames"],
+        "recall_vs_full@0.5": round(stats["matched"] / max(stats["full_boxes"], 1), 3),
+        "mean_iou": round(stats["iou_sum"] / max(stats["matched"], 1), 3),
+        "full_boxes": stats["full_boxes"],
+        "region_boxes": stats["region_boxes"],
+        "extra_boxes": len(extra_heights),
+        "extra_median_height_px": round(float(np.median(extra_heights)), 1) if extra_heights else None,
+        "full_ms_mean": round(1000 * float(np.mean(full_times)), 2) if full_times else None,
+        "full_ms_p95": round(1000 * float(np.percentile(full_times, 95)), 2) if full_times else None,
+        "region_ms_mean": round(1000 * float(np.mean(region_times)), 2) if region_times else None,
+        "region_ms_p95": round(1000 * float(np.percentile(region_times, 95)), 2) if region_times else None,
+    }
+
+    logger.info("=== TILED / ROI DETECTION REPORT ===")
+    for key, value in report.items():
+        logger.info(f"{key:>24}: {value}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ROI / tiled detection vs. full-frame detection")
+    parser.add_argument("video", nargs="?", default=cfg['paths']['input_source'])
+    parser.add_argument("--roi", help='JSON list of polygons, e.g. "[[[0.5,0.2],[1,0.2],[1,1],[0.5,1]]]"')
+    parser.add_argument("--no-tiles", action="store_true", help="ROI crops only, no tiling")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--stride", type=int, default=5, help="Evaluate every Nth frame")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=cfg['detection'].get('backend', 'torch'),
+                        help="YOLO backend for both modes (onnx runs the crops one at a time)")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+    cfg['detection']['backend'] = args.backend
+
+    tiling = {"enabled": not args.no_tiles, "tile_size": args.tile_size, "overlap": args.overlap}
+    report = evaluate(args.video, json.loads(args.roi) if args.roi else None, tiling, args.max_frames, args.stride)
+    if report and args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
@@ -2,93 +2,377 @@ import os
 import cv2
 import time
 import json
+import argparse
+import itertools
+import multiprocessing as mp
+import numpy as np
 from glob import glob
 from src.utils.logger import logger
 from src.utils.config_loader import cfg
 
 from src.core.perception.detector import Detector
 from src.core.memory.evidence import EvidenceManager
+from src.core.memory.track_cache import TrackCache
+from src.core.memory.embedding_store import EmbeddingStore, EmbeddingStoreWriter
 from src.core.analysis.action_rec import ActionRecognizer
 
+CHECKPOINT_PATH = "data/outputs/evaluation_checkpoint.jsonl"
+
 class ThesisEvaluator:
-    def __init__(self, dataset_path="data/dataset"):
+    def __init__(self, dataset_path="data/dataset", load_models=True, use_track_cache=None):
         logger.info("Initializing Headless Evaluator...")
         self.dataset_path = dataset_path
-        
+
+        # Phase 1 cache: YOLO + ByteTrack output does not depend on prompts or thresholds
+        cache_cfg = cfg.get('evaluation', {}).get('track_cache', {})
+        self.use_track_cache = cache_cfg.get('enabled', False) if use_track_cache is None else use_track_cache
+        self.track_cache = None
+
         # Load core modules (No UI, No Threading)
-        self.detector = Detector()
-        self.memory = EvidenceManager()
-        self.brain = ActionRecognizer()
-        
+        # A parallel run's coordinator skips this: only the worker processes need models
+        if load_models:
+            self.detector = Detector()
+            self.memory = EvidenceManager()
+            self.brain = ActionRecognizer()
+            if self.use_track_cache:
+                self.track_cache = TrackCache(
+                    cache_dir=cache_cfg.get('dir', 'data/cache/phase1'),
+                    store_crops=cache_cfg.get('store_crops', False)
+                )
+
         self.conf_threshold = cfg['action']['threshold']
         self.trigger_count = cfg['action'].get('alert_trigger_count', 3)
         self.safe_actions = [
-            'a person standing completely upright and casually walking forward', 
+            'a person standing completely upright and casually walking forward',
             'a person standing completely still and doing nothing',
             'unknown_benign_activity'
         ]
 
     def process_video(self, video_path):
         """Runs the AI on a single video and returns True if violence is confirmed."""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            return False, 0
-            
+        # 0. Phase 1 source: the track cache (hit), or YOLO + ByteTrack recorded into it (miss)
+        cached, writer = self._open_track_cache(video_path)
+
+        # Every video starts with fresh tracks and buffers, so results do not
+        # depend on which videos ran before it (or on which worker ran it)
+        self.memory = EvidenceManager()
+
         alert_counters = {}
         violence_detected = False
         frame_count = 0
-        
+
         start_time = time.time()
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret: break
-            frame_count += 1
-            
-            # 1. Perception
-            detections = self.detector.process_frame(frame)
-            ready_clips = self.memory.update(frame, detections)
-            
-            # 2. Analysis
-            for tracker_id, clip in ready_clips.items():
-                scores = self.brain.get_action_score(clip)
-                if not scores: continue
-                
-                top_action = max(scores, key=scores.get)
-                top_score = scores[top_action]
-                
-                # 3. State Machine Logic
-                if top_action not in self.safe_actions and top_score > self.conf_threshold:
-                    alert_counters[tracker_id] = alert_counters.get(tracker_id, 0) + 1
-                    if alert_counters[tracker_id] >= self.trigger_count:
-                        violence_detected = True
-                        break # Stop processing, we found violence!
-                else:
-                    alert_counters[tracker_id] = 0
-                    
-            if violence_detected:
-                break
-                
-        end_time = time.time()
-        cap.release()
-        
-        processing_time = end_time - start_time
+        end_time = None
+
+        try:
+            for frame, detections, crops in self._phase1_frames(video_path, cached, writer):
+                # After the verdict we only keep going to complete the Phase 1 cache
+                if violence_detected:
+                    continue
+                frame_count += 1
+
+                # 1. Perception
+                ready_clips = self.memory.update(frame, detections, crops=crops)
+
+                # 2. Analysis
+                all_scores = self.brain.get_action_scores(ready_clips, cache=self.memory.embedding_cache)
+                for tracker_id, scores in all_scores.items():
+                    if not scores: continue
+
+                    top_action = max(scores, key=scores.get)
+                    top_score = scores[top_action]
+
+                    # 3. State Machine Logic
+                    if top_action not in self.safe_actions and top_score > self.conf_threshold:
+                        alert_counters[tracker_id] = alert_counters.get(tracker_id, 0) + 1
+                        if alert_counters[tracker_id] >= self.trigger_count:
+                            violence_detected = True
+                            break # Stop processing, we found violence!
+                    else:
+                        alert_counters[tracker_id] = 0
+
+                if violence_detected:
+                    end_time = time.time()
+                    if writer is None:
+                        break
+
+            if writer is not None:
+                writer.close()
+                writer = None
+        finally:
+            if writer is not None:
+                writer.abort()
+
+        processing_time = (end_time or time.time()) - start_time
         return violence_detected, frame_count, processing_time
 
-    def run_benchmark(self):
-        """Processes the dataset and calculates scientific metrics."""
+    def _open_track_cache(self, video_path):
+        """Returns (cached_tracks, cache_writer); at most one of them is not None."""
+        if self.track_cache is None:
+            return None, None
+        key = self.track_cache.key_for(video_path)
+        cached = self.track_cache.load(video_path, key=key)
+        if cached is None:
+            return None, self.track_cache.writer(video_path, key=key)
+        logger.info(f"Phase 1 cache hit: {os.path.basename(video_path)}")
+        return cached, None
+
+    def _phase1_frames(self, video_path, cached, writer):
+        """
+        Yields (frame, detections, crops) for every frame of the video.
+        - Cache hit with crops: no decoding at all (frame is None).
+        - Cache hit without crops: decode only, tracks come from the cache.
+        - Cache miss / no cache: YOLO + ByteTrack, recorded into `writer` if given.
+        """
+        if cached is not None and cached.crops is not None:
+            for _, detections, crops in cached.frames():
+                yield None, detections, crops
+            return
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return
+
+        replay = cached.frames() if cached is not None else None
+        session = self.detector.create_session(regions=self.detector.create_regions()) if cached is None else None
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret: break
+
+                if replay is not None:
+                    entry = next(replay, None)
+                    if entry is None: break
+                    yield frame, entry[1], None
+                    continue
+
+                detections = self.detector.process_frame(frame, session=session)
+                crops = None
+                if writer is not None:
+                    if writer.store_crops:
+                        crops = [self.memory._process_crop(frame, box) for box in detections.xyxy]
+                    writer.add(detections, crops)
+                yield frame, detections, crops
+        finally:
+            cap.release()
+
+    def evaluate_video(self, video_path, label):
+        """Processes one video and returns its per-video result record."""
+        logger.info(f"Testing {label.capitalize()} Video: {os.path.basename(video_path)}")
+        alerted, frames, p_time = self.process_video(video_path)
+        return {
+            "video": os.path.abspath(video_path),
+            "label": label,
+            "alerted": bool(alerted),
+            "frames": frames,
+            "time_s": round(p_time, 3),
+            "fps": round(frames / max(p_time, 0.001), 2)
+        }
+
+    def run_benchmark(self, workers=1, resume=True, checkpoint_path=CHECKPOINT_PATH):
+        """
+        Processes the dataset and calculates scientific metrics.
+
+        Args:
+            workers: Number of processes. Each one loads its own models once and takes videos from a shared pool.
+            resume: Skip videos already recorded in the checkpoint file (an interrupted run continues).
+            checkpoint_path: JSON-lines file with one result record per finished video.
+        """
+        jobs = self._discover_videos()
+        if jobs is None:
+            return
+
+        # 1. Resume: load what previous (possibly interrupted) runs already finished
+        records = self._load_checkpoint(checkpoint_path) if resume else {}
+        if not resume and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        pending = [(vid, label) for vid, label in jobs if os.path.abspath(vid) not in records]
+        logger.info(f"{len(records)} videos restored from checkpoint, {len(pending)} to process.")
+
+        # 2. Process the rest (sequentially, or sharded across worker processes)
+        wall_start = time.time()
+        os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            for record in self._iter_results(pending, workers):
+                records[record["video"]] = record
+                checkpoint.write(json.dumps(record) + "\n")
+                checkpoint.flush()
+        wall_time = time.time() - wall_start
+
+        # 3. Merge every per-video result into the confusion matrix
+        wanted = {os.path.abspath(vid) for vid, _ in jobs}
+        per_video = [r for r in records.values() if r["video"] in wanted]
         results = {"TP": 0, "FP": 0, "TN": 0, "FN": 0}
-        total_frames = 0
-        total_time = 0.0
-        
+        for r in per_video:
+            if r["label"] == "violent":
+                results["TP" if r["alerted"] else "FN"] += 1  # True Positive / False Negative
+            else:
+                results["FP" if r["alerted"] else "TN"] += 1  # False Positive / True Negative
+
+        total_frames = sum(r["frames"] for r in per_video)
+        total_time = sum(r["time_s"] for r in per_video)
+        if total_frames > 0:
+            self._generate_report(results, total_frames, total_time, per_video=per_video, wall_time=wall_time)
+
+    def build_embedding_store(self, store_path, encode_batch=64):
+        """
+        Encodes every crop that Phase 2 would ever score, once, for the whole dataset,
+        and records the exact clips built from them. See rescore_embeddings().
+        """
+        jobs = self._discover_videos()
+        if jobs is None:
+            return None
+
+        window_size = cfg['action'].get('window_size', 16)
+        stride = cfg['action'].get('stride', 1)
+        store = EmbeddingStoreWriter(store_path, window_size, stride, cfg['action'].get('model_name'))
+
+        for vid, label in jobs:
+            logger.info(f"Embedding {label} video: {os.path.basename(vid)}")
+            store.begin_video(vid, label)
+            self.memory = EvidenceManager()
+            cached, writer = self._open_track_cache(vid)
+
+            # Crops are encoded in large batches; clips wait until their crops are stored
+            pending_keys, pending_crops, pending_clips = [], [], []
+            queued = set()
+
+            def flush():
+                if pending_crops:
+                    features = self.brain._encode_images(pending_crops)
+                    store.add_embeddings(pending_keys, features.float().cpu().numpy())
+                for tracker_id, frame_ids in pending_clips:
+                    store.add_clip(tracker_id, frame_ids)
+                pending_keys.clear(); pending_crops.clear(); pending_clips.clear(); queued.clear()
+
+            frames = 0
+            try:
+                for frame, detections, crops in self._phase1_frames(vid, cached, writer):
+                    frames += 1
+                    ready_clips = self.memory.update(frame, detections, crops=crops)
+                    for tracker_id, clip in ready_clips.items():
+                        for frame_id, crop in zip(clip.frame_ids, clip):
+                            key = (tracker_id, frame_id)
+                            if not store.has(*key) and key not in queued:
+                                queued.add(key)
+                                pending_keys.append(key)
+                                pending_crops.append(crop)
+                        pending_clips.append((tracker_id, clip.frame_ids))
+                    if len(pending_crops) >= encode_batch:
+                        flush()
+                flush()
+
+                if writer is not None:
+                    writer.close()
+                    writer = None
+            finally:
+                if writer is not None:
+                    writer.abort()
+            store.end_video(frames)
+
+        store = store.close()
+        logger.info(f"Embedding store written to {store_path}: {len(store.rows)} crops, {len(store.clips)} clips")
+        return store
+
+    def rescore_embeddings(self, store_path, prompts=None, thresholds=None, trigger_counts=None,
+                           logit_scales=None, osr_thresholds=None):
+        """
+        Re-scores a stored dataset without touching the image tower.
+        Every combination of the given parameter lists is evaluated; each one yields
+        the same metrics as a full run. Returns the reports, best accuracy first.
+        """
+        start = time.time()
+        store = EmbeddingStore(store_path)
+        prompts = prompts or cfg['action']['prompts']
+        text_embeddings = self._text_embeddings_for(store, prompts)
+
+        thresholds = thresholds or [self.conf_threshold]
+        trigger_counts = trigger_counts or [self.trigger_count]
+        logit_scales = logit_scales or [float(cfg['action'].get('logit_scale', 100.0))]
+        osr_thresholds = osr_thresholds or [cfg['action'].get('osr_threshold', 0.25)]
+
+        clip_index = np.asarray(store.clip_index)
+        total_frames = sum(v["frames"] for v in store.videos)
+        safe_ids = {i for i, p in enumerate(prompts) if p in self.safe_actions}
+
+        reports = []
+        for logit_scale, osr in itertools.product(logit_scales, osr_thresholds):
+            # The expensive part (one matmul over all crops) is shared by every threshold / trigger
+            top_prompt, top_score = store.score(text_embeddings, logit_scale, osr)
+            is_safe = (top_prompt < 0) | np.isin(top_prompt, list(safe_ids))
+
+            for threshold, trigger in itertools.product(thresholds, trigger_counts):
+                violent = ~is_safe & (top_score > threshold)
+                alerted = self._alerted_videos(clip_index, violent, trigger, len(store.videos))
+
+                results = {"TP": 0, "FP": 0, "TN": 0, "FN": 0}
+                for video, hit in zip(store.videos, alerted):
+                    if video["label"] == "violent":
+                        results["TP" if hit else "FN"] += 1
+                    else:
+                        results["FP" if hit else "TN"] += 1
+
+                report = self._generate_report(
+                    results, total_frames, time.time() - start,
+                    report_path=None, quiet=True
+                )
+                report["parameters"] = {"threshold": threshold, "alert_trigger_count": trigger,
+                                        "logit_scale": logit_scale, "osr_threshold": osr, "prompts": prompts}
+                reports.append(report)
+
+        reports.sort(key=lambda r: r["metrics"]["accuracy"], reverse=True)
+        logger.info(f"Re-scored {len(reports)} configuration(s) in {time.time() - start:.2f}s")
+
+        # The best configuration gets the usual report file and log; the whole sweep is kept too
+        best = reports[0]
+        logger.info(f"Best parameters: { {k: v for k, v in best['parameters'].items() if k != 'prompts'} }")
+        self._generate_report(best["confusion_matrix"], total_frames, time.time() - start,
+                              report_path="data/outputs/rescore_report.json")
+        with open("data/outputs/rescore_sweep.json", "w") as f:
+            json.dump(reports, f, indent=4)
+        return reports
+
+    @staticmethod
+    def _alerted_videos(clip_index, violent, trigger_count, num_videos):
+        """
+        Replays the evaluator's state machine over the stored clips (already in emission
+        order): a video alerts once any track collects `trigger_count` violent clips in a row.
+        """
+        alerted = [False] * num_videos
+        counters = {}
+        for (video_id, tracker_id, _), is_violent in zip(clip_index, violent):
+            if alerted[video_id]:
+                continue
+            key = (video_id, tracker_id)
+            if is_violent:
+                counters[key] = counters.get(key, 0) + 1
+                if counters[key] >= trigger_count:
+                    alerted[video_id] = True
+            else:
+                counters[key] = 0
+        return alerted
+
+    def _text_embeddings_for(self, store, prompts):
+        """Text embeddings from the store's cache; the model is only loaded for new prompts."""
+        cache = store.load_text_cache()
+        missing = [p for p in prompts if p not in cache]
+        if missing:
+            brain = getattr(self, "brain", None) or ActionRecognizer()
+            encoded = brain._encode_text(missing).float().cpu().numpy()
+            cache.update(zip(missing, encoded))
+            store.save_text_cache(cache)
+        return np.stack([cache[p] for p in prompts])
+
+    def _discover_videos(self):
+        """Returns [(video_path, 'violent'|'safe'), ...] or None if the dataset is missing."""
         # --- SWE FIX: Robust File Discovery & Validation ---
         violent_dir = os.path.join(self.dataset_path, "violent")
         safe_dir = os.path.join(self.dataset_path, "safe")
-        
+
         if not os.path.exists(violent_dir) or not os.path.exists(safe_dir):
             logger.error(f"Dataset folders missing! Looked for: {violent_dir} and {safe_dir}")
-            return
-            
+            return None
+
         # Support multiple video formats
         violent_vids = []
         safe_vids = []
@@ -98,35 +382,44 @@ class ThesisEvaluator:
 
         if len(violent_vids) == 0 and len(safe_vids) == 0:
             logger.error(f"No videos found! Check if files are directly inside {violent_dir} and {safe_dir}.")
-            return
-            
+            return None
+
         logger.info(f"Found {len(violent_vids)} violent videos and {len(safe_vids)} safe videos. Starting...")
         # --------------------------------------------------
-        
-        # 1. Test Violent Videos (Should trigger alert)
-        for vid in violent_vids:
-            logger.info(f"Testing Violent Video: {os.path.basename(vid)}")
-            alerted, frames, p_time = self.process_video(vid)
-            total_frames += frames
-            total_time += p_time
-            if alerted: results["TP"] += 1  # True Positive
-            else: results["FN"] += 1        # False Negative
-
-        # 2. Test Safe Videos (Should NOT trigger alert)
-        for vid in safe_vids:
-            logger.info(f"Testing Safe Video: {os.path.basename(vid)}")
-            alerted, frames, p_time = self.process_video(vid)
-            total_frames += frames
-            total_time += p_time
-            if alerted: results["FP"] += 1  # False Positive
-            else: results["TN"] += 1        # True Negative
+        return [(v, "violent") for v in sorted(violent_vids)] + [(v, "safe") for v in sorted(safe_vids)]
 
-        if total_frames > 0:
-            self._generate_report(results, total_frames, total_time)
+    def _iter_results(self, pending, workers):
+        """Yields result records as videos finish."""
+        if workers <= 1:
+            for vid, label in pending:
+                yield self.evaluate_video(vid, label)
+            return
+
+        # 'spawn' keeps CUDA and the model threads safe in the children
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(processes=workers, initializer=_init_worker,
+                      initargs=(self.dataset_path, workers, self.use_track_cache)) as pool:
+            for record in pool.imap_unordered(_evaluate_in_worker, pending):
+                yield record
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path):
+        records = {}
+        if not os.path.exists(checkpoint_path):
+            return records
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # Half-written line from an interrupted run
+                records[record["video"]] = record
+        return records
 
-    def _generate_report(self, res, frames, p_time):
+    def _generate_report(self, res, frames, p_time, per_video=None, wall_time=None,
+                         report_path="data/outputs/evaluation_report.json", quiet=False):
         TP, FP, TN, FN = res["TP"], res["FP"], res["TN"], res["FN"]
-        
+
         # Avoid division by zero
         accuracy = (TP + TN) / max((TP + TN + FP + FN), 1)
         precision = TP / max((TP + FP), 1)
@@ -146,18 +439,70 @@ class ThesisEvaluator:
             },
             "confusion_matrix": res
         }
+        if wall_time is not None:
+            # Throughput of the whole run (all workers together)
+            report["performance"]["wall_time_s"] = round(wall_time, 1)
+        if per_video is not None:
+            report["per_video"] = sorted(per_video, key=lambda r: r["video"])
 
         os.makedirs("data/outputs", exist_ok=True)
-        with open("data/outputs/evaluation_report.json", "w") as f:
-            json.dump(report, f, indent=4)
-            
+        if report_path is not None:
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=4)
+
+        if quiet:
+            return report
+
         logger.info("\n=== EVALUATION COMPLETE ===")
         logger.info(f"Accuracy:  {accuracy:.1%}")
         logger.info(f"Precision: {precision:.1%}")
         logger.info(f"Recall:    {recall:.1%}")
         logger.info(f"Speed:     {fps:.1f} FPS")
-        logger.info("Report saved to data/outputs/evaluation_report.json")
+        if report_path is not None:
+            logger.info(f"Report saved to {report_path}")
+        return report
+
+
+# --- Process pool plumbing (one evaluator, i.e. one set of models, per process) ---
+_worker_evaluator = None
+
+def _init_worker(dataset_path, workers, use_track_cache):
+    global _worker_evaluator
+    import torch
+    # Share the cores between the workers instead of oversubscribing them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    _worker_evaluator = ThesisEvaluator(dataset_path, use_track_cache=use_track_cache)
+
+def _evaluate_in_worker(job):
+    vid, label = job
+    return _worker_evaluator.evaluate_video(vid, label)
+
 
 if __name__ == "__main__":
-    evaluator = ThesisEvaluator()
-    evaluator.run_benchmark()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Two-phase accuracy benchmark")
+    parser.add_argument("--dataset", default="data/dataset")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (each loads its own models)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and start over")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--track-cache", action="store_true", default=None,
+                        help="Replay cached YOLO/ByteTrack output (built on the first run)")
+    parser.add_argument("--build-embeddings", metavar="STORE",
+                        help="Encode the dataset once into an embedding store and exit")
+    parser.add_argument("--rescore", metavar="STORE",
+                        help="Re-score an embedding store (no video decoding, no image tower)")
+    parser.add_argument("--thresholds", type=float, nargs="+")
+    parser.add_argument("--triggers", type=int, nargs="+")
+    parser.add_argument("--logit-scales", type=float, nargs="+")
+    parser.add_argument("--osr-thresholds", type=float, nargs="+")
+    args = parser.parse_args()
+
+    if args.rescore:
+        evaluator = ThesisEvaluator(args.dataset, load_models=False)
+        evaluator.rescore_embeddings(args.rescore, thresholds=args.thresholds, trigger_counts=args.triggers,
+                                     logit_scales=args.logit_scales, osr_thresholds=args.osr_thresholds)
+    elif args.build_embeddings:
+        evaluator = ThesisEvaluator(args.dataset, use_track_cache=args.track_cache)
+        evaluator.build_embedding_store(args.build_embeddings)
+    else:
+        evaluator = ThesisEvaluator(args.dataset, load_models=args.workers <= 1, use_track_cache=args.track_cache)
+        evaluator.run_benchmark(workers=args.workers, resume=not args.fresh, checkpoint_path=args.checkpoint)
@@ -0,0 +1,98 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.logger import logger
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /api/chat like Ollama does (non-streaming), after a fixed delay.
+    Every `fail_every`-th request returns HTTP 500 to exercise the retries.
+    """
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        with server.lock:
+            server.requests += 1
+            request_number = server.requests
+
+        time.sleep(server.delay)
+        if self.path != "/api/chat" or (server.fail_every and request_number % server.fail_every == 0):
+            self._reply(500, {"error": "fake failure"})
+            return
+
+        images = len(body.get("messages", [{}])[-1].get("images", []))
+        content = json.dumps({"threat_detected": True, "description": f"Fake report from {images} frames."})
+        self._reply(200, {
+            "model": body.get("model", "fake"), "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": content}, "done": True
+        })
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_fake_server(delay=1.0, fail_every=0, port=0):
+    """Starts the fake server on a background thread. Returns (server, url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.delay, server.fail_every = delay, fail_every
+    server.requests, server.lock = 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def run_pool_check(incidents, concurrency, delay, timeout, fail_every):
+    from src.core.analysis.vlm.local_strategy import LocalOllamaStrategy
+    from src.pipelines.vlm_pool import VLMWorkerPool
+
+    logger.info("--- Phase 3 Worker Pool vs Fake Ollama ---")
+    server, url = start_fake_server(delay, fail_every)
+
+    reasoner = LocalOllamaStrategy()
+    reasoner.host = url
+    reports = []
+    pool = VLMWorkerPool(reasoner, on_report=lambda path, report, _ctx: reports.append(report),
+                         concurrency=concurrency, timeout=timeout, max_retries=2, retry_backoff=0.1)
+
+    # Keyframes are passed in memory, so no incident file is needed
+    start = time.perf_counter()
+    for i in range(incidents):
+        pool.submit(f"incident_{i}.mp4", frames_b64=["ZmFrZQ=="] * 8)
+    pool.join()
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    server.shutdown()
+
+    ok = sum(1 for r in reports if "error" not in r)
+    logger.info(f"{incidents} incidents in {elapsed:.2f} s (serial would take ~{incidents * delay:.1f} s), "
+                f"{ok} ok, {server.requests} HTTP requests")
+    logger.info(f"Pool stats: {pool.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama server for Phase 3 tests")
+    parser.add_argument("--serve", action="store_true", help="Only run the server (point vlm.host at it)")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--incidents", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--fail-every", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.serve:
+        server, url = start_fake_server(args.delay, args.fail_every, args.port)
+        logger.info(f"Fake Ollama listening on {url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        run_pool_check(args.incidents, args.concurrency, args.delay, args.timeout, args.fail_every)
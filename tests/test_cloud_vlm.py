@@ -0,0 +1,59 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("cv2")
+
+from src.core.analysis.vlm.cloud_strategy import CloudQwenStrategy
+
+
+class Response:
+    def __init__(self, content, status=200):
+        self.content, self.status = content, status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class Client:
+    """httpx.Client / AsyncClient stand-in recording the requests."""
+    def __init__(self, report, status=200):
+        self.content, self.status = json.dumps(report), status
+        self.requests = []
+
+    def post(self, url, headers, json):
+        self.requests.append((url, json))
+        return Response(self.content, self.status)
+
+
+class AsyncClient(Client):
+    async def post(self, url, headers, json):
+        return Client.post(self, url, headers, json)
+
+
+REPORT = {"threat_detected": True, "description": "two people fighting"}
+
+
+def test_sync_and_async_paths_send_the_same_request():
+    strategy = CloudQwenStrategy()
+    strategy.client = Client(REPORT)
+    strategy.async_client = AsyncClient(REPORT)
+
+    assert strategy.analyze_incident("a.mp4", ["abc"]) == REPORT
+    assert asyncio.run(strategy.analyze_incident_async("a.mp4", ["abc"])) == REPORT
+    assert strategy.client.requests == strategy.async_client.requests
+    url, body = strategy.client.requests[0]
+    assert url.endswith("/chat/completions")
+    assert body["messages"][0]["content"][0]["image_url"]["url"] == "data:image/jpeg;base64,abc"
+
+
+def test_sync_failure_is_reported_not_faked():
+    strategy = CloudQwenStrategy()
+    strategy.client = Client(REPORT, status=401)
+    report = strategy.analyze_incident("a.mp4", ["abc"])
+    assert report["error"] == "HTTP 401"
+    assert report["threat_detected"] is False
@@ -0,0 +1,41 @@
+from src.core.memory.embedding_cache import EmbeddingCache
+
+
+def test_ring_keeps_the_newest_frames():
+    cache = EmbeddingCache(capacity=3)
+    cache.open(7)
+    for frame_index in range(5):
+        cache.put(7, frame_index, f"e{frame_index}")
+    assert cache.get(7, 0) is None
+    assert cache.get(7, 1) is None
+    assert [cache.get(7, i) for i in (2, 3, 4)] == ["e2", "e3", "e4"]
+    assert len(cache) == 3
+
+
+def test_overwriting_a_frame_does_not_evict():
+    cache = EmbeddingCache(capacity=2)
+    cache.open(1)
+    cache.put(1, 0, "a")
+    cache.put(1, 1, "b")
+    cache.put(1, 1, "b2")
+    assert (cache.get(1, 0), cache.get(1, 1)) == ("a", "b2")
+
+
+def test_put_after_evict_is_ignored():
+    cache = EmbeddingCache(capacity=4)
+    cache.open(1)
+    cache.put(1, 0, "a")
+    cache.evict(1)
+    cache.put(1, 1, "late")  # The worker finished after the person left
+    assert cache.get(1, 1) is None
+    assert len(cache) == 0
+
+
+def test_tracks_are_independent():
+    cache = EmbeddingCache(capacity=1)
+    cache.open(("cam0", 1))
+    cache.open(("cam1", 1))
+    cache.put(("cam0", 1), 0, "left")
+    cache.put(("cam1", 1), 0, "right")
+    assert cache.get(("cam0", 1), 0) == "left"
+    assert cache.get(("cam1", 1), 0) == "right"
@@ -0,0 +1,96 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.utils.frame_buffer import FrameRing
+
+
+def frame(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def values(frames):
+    return [int(f[0, 0, 0]) for f in frames]
+
+
+def test_ring_keeps_the_newest_frames_in_order():
+    ring = FrameRing(3)
+    for value in range(5):
+        ring.push(frame(value))
+    assert len(ring) == 3
+    assert values(ring.frames()) == [2, 3, 4]
+
+
+def test_decode_in_place_through_next_slot():
+    ring = FrameRing(2)
+    slot = ring.next_slot((4, 6, 3))
+    slot[:] = 9
+    ring.commit()
+    assert values(ring.frames()) == [9]
+    assert ring.nbytes == 2 * 4 * 6 * 3
+
+
+def test_resolution_change_restarts_the_ring():
+    ring = FrameRing(3)
+    ring.push(frame(1))
+    ring.push(frame(2, shape=(8, 8, 3)))
+    assert values(ring.frames()) == [2]
+
+
+def test_resize_keeps_the_newest_frames():
+    ring = FrameRing(4)
+    for value in range(4):
+        ring.push(frame(value))
+    ring.resize(2)
+    assert values(ring.frames()) == [2, 3]
+    ring.push(frame(4))
+    assert values(ring.frames()) == [3, 4]
+
+
+def test_detach_hands_over_storage():
+    ring = FrameRing(3)
+    for value in range(3):
+        ring.push(frame(value))
+    detached = ring.detach()
+    ring.push(frame(7))  # Must not overwrite the detached frames
+    assert values(detached) == [0, 1, 2]
+    assert values(ring.frames()) == [7]
+
+
+def test_zero_capacity_keeps_nothing():
+    ring = FrameRing(0)
+    ring.push(frame(1))
+    assert len(ring) == 0
+    assert list(ring.frames()) == []
+
+
+def test_leased_slot_is_committed_in_place():
+    ring = FrameRing(2, spare=2)
+    ring.push(frame(0))  # Storage exists from the first frame on
+    slot = ring.lease((4, 6, 3))
+    slot[:] = 5
+    ring.push(slot)
+    assert values(ring.frames()) == [0, 5]
+    assert ring.lent == 0
+
+
+def test_lease_is_bounded_by_spare_and_released_slots_come_back():
+    ring = FrameRing(2, spare=2)
+    ring.push(frame(0))
+    leased = [ring.lease((4, 6, 3)) for _ in range(3)]
+    assert leased[2] is None  # Only `spare` slots are lent out
+    ring.release(leased[0])  # e.g. a stale live frame
+    assert ring.lease((4, 6, 3)) is not None
+
+
+def test_slot_leased_before_detach_does_not_touch_the_detached_frames():
+    ring = FrameRing(2, spare=1)
+    for value in range(2):
+        ring.push(frame(value))
+    slot = ring.lease((4, 6, 3))
+    detached = ring.detach()
+    slot[:] = 9  # The capture thread was still decoding
+    ring.push(slot)
+    assert values(detached) == [0, 1]
+    assert values(ring.frames()) == [9]
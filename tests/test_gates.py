@@ -0,0 +1,117 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.core.perception.interaction import InteractionGate, nearest_neighbor_distances
+
+
+class Boxes:
+    """Minimal sv.Detections stand-in: xyxy and tracker_id."""
+    def __init__(self, boxes):
+        self.tracker_id = np.array(list(boxes), dtype=int)
+        self.xyxy = np.array(list(boxes.values()), dtype=np.float32).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.tracker_id)
+
+
+def brute_force(xyxy, radius):
+    centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+    sizes = np.maximum(xyxy[:, 2:] - xyxy[:, :2], 1.0).max(axis=1)
+    distances = np.linalg.norm(centers[:, None] - centers[None], axis=2) / ((sizes[:, None] + sizes[None]) / 2)
+    np.fill_diagonal(distances, np.inf)
+    nearest = distances.min(axis=1)
+    nearest[nearest > radius] = np.inf
+    return nearest
+
+
+# --- Spatial grid ---
+
+def test_grid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 2000, size=(200, 2))
+    sizes = rng.uniform(20, 150, size=(200, 2))
+    xyxy = np.hstack([corners, corners + sizes]).astype(np.float32)
+    np.testing.assert_allclose(nearest_neighbor_distances(xyxy, 1.5), brute_force(xyxy, 1.5), rtol=1e-5)
+
+
+def test_grid_alone_is_infinite():
+    assert np.isinf(nearest_neighbor_distances([[0, 0, 10, 20]], 1.5)).all()
+    assert len(nearest_neighbor_distances(np.empty((0, 4)), 1.5)) == 0
+
+
+# --- Interaction gate ---
+
+UPRIGHT = (0, 0, 50, 100)
+
+def test_interacting_people_pass():
+    gate = InteractionGate(radius=1.5, isolated_sample_frames=0)
+    boxes = Boxes({1: UPRIGHT, 2: (40, 0, 90, 100), 3: (5000, 0, 5050, 100)})
+    selected = gate.select({1: "c1", 2: "c2", 3: "c3"}, boxes)
+    assert set(selected) == {1, 2}
+    assert gate.stats()["gated"] == 1
+
+
+def test_lone_person_is_sampled_at_low_rate():
+    gate = InteractionGate(isolated_sample_frames=10, fall_detection=False)
+    alone = Boxes({1: UPRIGHT})
+    passed = [frame for frame in range(25) if gate.select({1: "clip"}, alone)]
+    assert passed == [0, 10, 20]
+    assert gate.stats()["sampled"] == 3
+
+
+def test_fall_lets_a_lone_person_through():
+    gate = InteractionGate(isolated_sample_frames=0, fall_window_frames=10, fall_hold_frames=5)
+    for _ in range(5):
+        assert gate.select({}, Boxes({1: UPRIGHT})) == {}
+    lying = Boxes({1: (0, 50, 100, 100)})
+    assert gate.select({1: "clip"}, lying) == {1: "clip"}
+    assert gate.stats()["falls"] == 1
+
+    # Lying still is not a new fall, and the pass expires after the hold
+    for _ in range(6):
+        gate.select({}, lying)
+    assert gate.select({1: "clip"}, lying) == {}
+    assert gate.stats()["falls"] == 1
+
+
+def test_departed_tracks_are_forgotten():
+    gate = InteractionGate(isolated_sample_frames=100)
+    gate.select({1: "clip"}, Boxes({1: UPRIGHT}))
+    gate.select({}, Boxes({2: UPRIGHT}))
+    assert 1 not in gate.last_sampled and 1 not in gate.shapes
+
+
+# --- Motion gate ---
+
+def test_motion_gate_sleeps_on_static_scene_and_wakes_on_motion():
+    pytest.importorskip("cv2")
+    from src.core.perception.motion import MotionGate
+
+    gate = MotionGate(width=16, hold_frames=2)
+    static = np.zeros((64, 64, 3), dtype=np.uint8)
+    decisions = [gate.update(static) for _ in range(6)]
+    assert decisions == [True, True, True, False, False, False]
+    assert not gate.is_awake
+
+    moving = static.copy()
+    moving[16:48, 16:48] = 255
+    assert gate.update(moving)
+    assert gate.stats()["wakeups"] == 1
+    assert gate.skipped_ratio() == pytest.approx(3 / 7)
+
+
+def test_motion_on_the_last_hold_frame_is_not_a_wakeup():
+    pytest.importorskip("cv2")
+    from src.core.perception.motion import MotionGate
+
+    gate = MotionGate(width=16, hold_frames=2)
+    static = np.zeros((64, 64, 3), dtype=np.uint8)
+    moving = static.copy()
+    moving[16:48, 16:48] = 255
+    assert [gate.update(static) for _ in range(3)] == [True, True, True]  # Hold used up
+
+    # The previous frame was perceived: the tracker saw it, no resume (keyframe) needed
+    assert gate.is_awake
+    assert gate.update(moving)
+    assert gate.stats()["wakeups"] == 0
@@ -0,0 +1,70 @@
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.pipelines import incident_writer
+from src.pipelines.incident_writer import IncidentWriter
+
+
+class SlowVideoWriter:
+    """cv2.VideoWriter stand-in that takes `delay` seconds per frame."""
+    delay = 0.01
+
+    def __init__(self, path, fourcc, fps, size):
+        self.frames = 0
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        time.sleep(self.delay)
+        self.frames += 1
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture(autouse=True)
+def slow_writer(monkeypatch):
+    monkeypatch.setattr(incident_writer.cv2, "VideoWriter", SlowVideoWriter)
+
+
+def frame(value=0):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_close_is_never_dropped_behind_a_slow_writer():
+    finished = []
+    writer = IncidentWriter(finished.append, queue_size=2, policy="block", block_timeout=0.01)
+
+    # A long pre-roll keeps the writer busy while the post-event frames pile up
+    recording = writer.start("cam0", "a.mp4", 30, (6, 4), [frame() for _ in range(30)])
+    accepted = sum(writer.write(recording, frame(1)) for _ in range(10))
+    writer.finish(recording)
+    writer.stop()
+
+    assert finished == [recording]
+    assert not recording.failed
+    assert recording.pre_roll_frames == 30
+    assert recording.frames_written == accepted  # Every admitted frame lands before the close
+    assert recording.frames_dropped == 10 - accepted > 0
+
+
+def test_frames_of_consecutive_incidents_stay_in_order():
+    finished = []
+    writer = IncidentWriter(finished.append, queue_size=4, policy="block", block_timeout=1.0)
+    first = writer.start("cam0", "a.mp4", 30, (6, 4), [])
+    for _ in range(3):
+        writer.write(first, frame())
+    writer.finish(first)
+    second = writer.start("cam0", "b.mp4", 30, (6, 4), [frame()])
+    writer.write(second, frame())
+    writer.finish(second)
+    writer.stop()
+
+    assert finished == [first, second]
+    assert (first.frames_written, second.frames_written, second.pre_roll_frames) == (3, 1, 1)
+    assert writer.stats()["dropped"] == 0
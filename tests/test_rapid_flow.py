@@ -0,0 +1,58 @@
+import queue
+import pytest
+
+np = pytest.importorskip("numpy")
+rapid_flow = pytest.importorskip("src.pipelines.rapid_flow")  # Needs the full model stack
+
+from src.core.memory import state_manager as sm
+from src.core.memory.state_manager import SecurityStateManager
+from src.pipelines.scheduler import Phase2Scheduler
+
+
+class Boxes:
+    """Minimal sv.Detections stand-in: xyxy and tracker_id."""
+    def __init__(self, boxes):
+        self.tracker_id = np.array(list(boxes), dtype=int)
+        self.xyxy = np.array(list(boxes.values()), dtype=np.float32).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.tracker_id)
+
+
+class Memory:
+    def __init__(self, ids):
+        self.buffers = {tid: [] for tid in ids}
+
+
+class Stream:
+    """What Phase 2 dispatch reads from a StreamContext."""
+    def __init__(self, ids):
+        self.memory = Memory(ids)
+        self.state_manager = SecurityStateManager(expiry_seconds=10.0)
+        self.interaction_gate = None
+
+
+def test_visible_track_without_a_clip_is_not_expired(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sm.time, "monotonic", lambda: now[0])
+    pipeline = rapid_flow.RapidPipeline.__new__(rapid_flow.RapidPipeline)
+    pipeline.scheduler = Phase2Scheduler(max_wait_seconds=60)
+    pipeline.analysis_queue = queue.Queue()
+
+    stream = Stream([1, 2])
+    stream.state_manager.update_phase2(1, True, "people fighting", 0.9)
+    stream.state_manager.update_phase2(2, False, "normal behavior", 0.9)
+    boxes = Boxes({1: (0, 0, 50, 100), 2: (1000, 0, 1050, 100)})
+
+    # Track 1 stays on camera but its next clip is not due yet; only track 2 emits one
+    for _ in range(12):
+        now[0] += 1.0
+        pipeline._dispatch_phase2_analysis(stream, {2: "clip"}, boxes, max_clips=4)
+
+    assert set(stream.state_manager.snapshot()) == {1, 2}
+    assert stream.state_manager.view(1).strike_count == 1
+
+    # Once it leaves the camera, it expires as before
+    now[0] += 11.0
+    pipeline._dispatch_phase2_analysis(stream, {}, Boxes({2: (1000, 0, 1050, 100)}), max_clips=4)
+    assert set(stream.state_manager.snapshot()) == {2}
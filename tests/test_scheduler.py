@@ -0,0 +1,159 @@
+import queue
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.pipelines import scheduler as sched
+from src.pipelines.scheduler import Phase2Scheduler
+from src.core.memory.state_manager import SecurityStateManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Memory:
+    def __init__(self, ids):
+        self.buffers = {tid: [] for tid in ids}
+
+
+class Stream:
+    """What the scheduler reads from a StreamContext."""
+    def __init__(self, ids, trigger_count=3):
+        self.memory = Memory(ids)
+        self.state_manager = SecurityStateManager(trigger_count)
+
+
+class Boxes:
+    """Minimal sv.Detections stand-in: xyxy and tracker_id."""
+    def __init__(self, boxes):
+        self.tracker_id = np.array(list(boxes), dtype=int)
+        self.xyxy = np.array(list(boxes.values()), dtype=np.float32).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.tracker_id)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sched.time, "monotonic", clock)
+    return clock
+
+
+def far_apart(ids):
+    return Boxes({tid: (1000 * i, 0, 1000 * i + 50, 100) for i, tid in enumerate(ids)})
+
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait()[1])
+    return items
+
+
+def test_strikes_rank_ahead_of_bystanders(clock):
+    stream = Stream([1, 2, 3])
+    stream.state_manager.update_phase2(2, True, "people fighting", 0.9)
+    stream.state_manager.update_phase2(2, True, "people fighting", 0.9)
+    scheduler = Phase2Scheduler(trigger_count=3, max_wait_seconds=60)
+
+    scheduler.submit(stream, {1: "c1", 2: "c2", 3: "c3"}, far_apart([1, 2, 3]))
+    q = queue.Queue()
+    assert scheduler.dispatch(q, max_clips=1) == 1
+    assert drain(q) == [2]
+
+
+def test_orange_beats_strikes_and_proximity_counts(clock):
+    stream = Stream([1, 2, 3], trigger_count=1)
+    stream.state_manager.update_phase2(3, True, "people fighting", 0.9)  # Orange
+    scheduler = Phase2Scheduler(trigger_count=1, max_wait_seconds=60)
+
+    # 1 and 2 stand next to each other, 3 is alone but Orange
+    boxes = Boxes({1: (0, 0, 50, 100), 2: (40, 0, 90, 100), 3: (5000, 0, 5050, 100)})
+    scheduler.submit(stream, {1: "c1", 2: "c2", 3: "c3"}, boxes)
+    q = queue.Queue()
+    scheduler.dispatch(q, max_clips=3)
+    order = drain(q)
+    assert order[0] == 3
+    assert set(order[1:]) == {1, 2}
+
+
+def test_starvation_guard_serves_overdue_track_first(clock):
+    stream = Stream([1, 2], trigger_count=1)
+    scheduler = Phase2Scheduler(trigger_count=1, max_wait_seconds=2.0)
+    scheduler.submit(stream, {1: "old"}, far_apart([1, 2]))
+
+    clock.now += 3.0
+    stream.state_manager.update_phase2(2, True, "people fighting", 0.9)  # Orange, fresh clip
+    scheduler.submit(stream, {2: "new"}, far_apart([1, 2]))
+    q = queue.Queue()
+    scheduler.dispatch(q, max_clips=1)
+    assert drain(q) == [1]
+    assert scheduler.stats()["starvation_promotions"] == 1
+
+
+def test_deferred_counts_each_clip_once(clock):
+    stream = Stream([1, 2])
+    scheduler = Phase2Scheduler(max_wait_seconds=60)
+    scheduler.submit(stream, {1: "c1", 2: "c2"}, far_apart([1, 2]))
+    q = queue.Queue()
+    for _ in range(30):
+        scheduler.dispatch(q, max_clips=1)
+        drain(q)
+    stats = scheduler.stats()
+    assert stats["dispatched"] == 2
+    assert stats["deferred"] == 1
+
+
+def test_newer_clip_replaces_pending_one(clock):
+    stream = Stream([1])
+    scheduler = Phase2Scheduler(max_wait_seconds=60)
+    scheduler.submit(stream, {1: "old"}, far_apart([1]))
+    scheduler.submit(stream, {1: "new"}, far_apart([1]))
+    q = queue.Queue()
+    scheduler.dispatch(q, max_clips=4)
+    assert q.get_nowait()[2] == "new"
+    assert scheduler.stats()["dropped"] == 1
+
+
+def test_stale_track_is_purged_on_dispatch(clock):
+    stream = Stream([1, 2])
+    scheduler = Phase2Scheduler(max_wait_seconds=60)
+    scheduler.submit(stream, {1: "c1", 2: "c2"}, far_apart([1, 2]))
+    del stream.memory.buffers[2]  # Track 2 left before it was served
+    q = queue.Queue()
+    scheduler.dispatch(q, max_clips=4)
+    assert drain(q) == [1]
+    assert scheduler.stats()["pending"] == 0
+
+
+def test_budget_and_queue_room_limit_admission(clock):
+    stream = Stream([1, 2, 3, 4])
+    scheduler = Phase2Scheduler(budget_ms_per_frame=50, max_wait_seconds=60)
+    scheduler.record_service_time(0.1, clips=4)  # 25 ms per clip -> 2 clips per frame
+    scheduler.submit(stream, {tid: f"c{tid}" for tid in (1, 2, 3, 4)}, far_apart([1, 2, 3, 4]))
+
+    assert scheduler.dispatch(queue.Queue(), max_clips=8) == 2
+    assert scheduler.dispatch(queue.Queue(maxsize=1), max_clips=8) == 1
+
+
+def test_resubmitting_every_frame_does_not_starve_a_bystander(clock):
+    stream = Stream([1, 2], trigger_count=1)
+    stream.state_manager.update_phase2(1, True, "people fighting", 0.9)  # Orange, always ranked first
+    scheduler = Phase2Scheduler(trigger_count=1, max_wait_seconds=2.0)
+
+    served = []
+    for _ in range(300):  # 10 s at 30 FPS, one Phase 2 slot per frame
+        clock.now += 1 / 30
+        scheduler.submit(stream, {1: "c1", 2: "c2"}, far_apart([1, 2]))
+        q = queue.Queue()
+        scheduler.dispatch(q, max_clips=1)
+        served += drain(q)
+
+    assert served.count(2) >= 4  # At least once per max_wait_seconds
+    assert scheduler.stats()["starvation_promotions"] >= 4
@@ -0,0 +1,99 @@
+import pytest
+from src.core.memory import state_manager as sm
+from src.core.memory.state_manager import SecurityStateManager
+
+
+class Clock:
+    """Replaces time.monotonic inside the state manager."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sm.time, "monotonic", clock)
+    return clock
+
+
+def test_escalates_to_orange_after_trigger_count():
+    manager = SecurityStateManager(alert_trigger_count=3)
+    assert manager.update_phase2(1, True, "people fighting", 0.9) == 0
+    assert manager.update_phase2(1, True, "people fighting", 0.9) == 0
+    assert manager.update_phase2(1, True, "people fighting", 0.9) == 1
+    assert manager.view(1).label == "PEOPLE FIGHTING (90%)"
+
+
+def test_safe_clip_resets_strikes():
+    manager = SecurityStateManager(alert_trigger_count=3)
+    manager.update_phase2(1, True, "people fighting", 0.9)
+    manager.update_phase2(1, True, "people fighting", 0.9)
+    manager.update_phase2(1, False, "normal behavior", 0.8)
+    assert manager.view(1).strike_count == 0
+    assert manager.update_phase2(1, True, "people fighting", 0.9) == 0
+
+
+def test_red_is_latched_against_phase2():
+    manager = SecurityStateManager(alert_trigger_count=1)
+    manager.update_phase2(1, True, "people fighting", 0.9)
+    manager.update_phase3(1, True, "two people fighting")
+    assert manager.update_phase2(1, False, "normal behavior", 0.9) == 2
+    assert manager.view(1).vlm_summary == "two people fighting"
+
+
+def test_phase3_false_alarm_downgrades_to_green():
+    manager = SecurityStateManager(alert_trigger_count=1)
+    manager.update_phase2(1, True, "people fighting", 0.9)
+    manager.update_phase3(1, False, "hugging")
+    state = manager.view(1)
+    assert (state.level, state.strike_count) == (0, 0)
+
+
+def test_failed_phase3_keeps_the_level():
+    manager = SecurityStateManager(alert_trigger_count=1)
+    manager.update_phase2(1, True, "people fighting", 0.9)
+    manager.mark_unverified(1, "VLM request timed out")
+    state = manager.view(1)
+    assert state.level == 1
+    assert state.label.startswith("UNVERIFIED")
+
+
+def test_cleanup_expires_only_absent_tracks(clock):
+    manager = SecurityStateManager(expiry_seconds=10.0)
+    manager.update_phase2(1, False, "normal behavior", 0.9)
+    manager.update_phase2(2, False, "normal behavior", 0.9)
+
+    clock.now += 5
+    manager.cleanup([1, 2])
+    assert set(manager.snapshot()) == {1, 2}
+
+    clock.now += 6
+    manager.cleanup([1])  # 2 left the camera 11 s ago, 1 is still visible
+    assert set(manager.snapshot()) == {1}
+
+    clock.now += 11
+    manager.cleanup([])
+    assert manager.snapshot() == {}
+
+
+def test_seen_again_is_not_expired(clock):
+    manager = SecurityStateManager(expiry_seconds=10.0)
+    manager.update_phase2(1, False, "normal behavior", 0.9)
+    clock.now += 8
+    manager.update_phase2(1, False, "normal behavior", 0.9)  # Leaves a stale heap entry behind
+    clock.now += 8
+    manager.cleanup([])
+    assert 1 in manager.snapshot()
+
+
+def test_snapshot_restricted_and_ui_data():
+    manager = SecurityStateManager(alert_trigger_count=1)
+    manager.update_phase2(1, True, "people fighting", 0.9)
+    manager.update_phase2(2, False, "normal behavior", 0.9)
+    snapshot = manager.snapshot([1, 3])
+    assert set(snapshot) == {1}
+    assert manager.get_ui_data(1, snapshot)[0] == (0, 165, 255)
+    assert manager.get_ui_data(3, snapshot) == ((0, 255, 0), "analyzing")
@@ -0,0 +1,108 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.core.analysis.vlm import cache as vlm_cache
+from src.core.analysis.vlm.cache import CachedVisionReasoner
+from src.core.analysis.vlm.interface import IVisionReasoner
+
+
+class Reasoner(IVisionReasoner):
+    def __init__(self, prompt="fight?", report=None):
+        self.model_id = "stub-vlm"
+        self.prompt = prompt
+        self.report = report or {"threat_detected": True, "description": "fight"}
+        self.calls = 0
+
+    def analyze_incident(self, video_path, frames_b64=None):
+        self.calls += 1
+        return dict(self.report)
+
+
+@pytest.fixture(autouse=True)
+def hex_hashes(monkeypatch):
+    """Keyframes are given as 16-digit hex strings: their "dHash" is the number itself."""
+    monkeypatch.setattr(vlm_cache, "dhash", lambda image: int(image, 16))
+
+
+FRAMES = ["00000000000000ff", "0f0f0f0f0f0f0f0f"]
+
+
+def test_repeated_scene_is_served_from_cache():
+    inner = Reasoner()
+    cached = CachedVisionReasoner(inner, max_hamming=2)
+    first = cached.analyze_incident("a.mp4", FRAMES)
+    second = cached.analyze_incident("b.mp4", FRAMES)
+    assert inner.calls == 1
+    assert "cache_hit" not in first
+    assert second["cache_hit"] and second["cached_from"] == "a.mp4"
+    assert cached.cache_stats()["hit_rate"] == 0.5
+
+
+def test_tolerance_on_hamming_distance():
+    inner = Reasoner()
+    cached = CachedVisionReasoner(inner, max_hamming=2)
+    cached.analyze_incident("a.mp4", FRAMES)
+    near = ["00000000000000fe", "0f0f0f0f0f0f0f0e"]   # 1 bit per keyframe
+    far = ["ffffffffffffffff", "f0f0f0f0f0f0f0f0"]
+    assert cached.analyze_incident("b.mp4", near).get("cache_hit")
+    assert not cached.analyze_incident("c.mp4", far).get("cache_hit")
+    assert inner.calls == 2
+
+
+def test_failed_reports_are_not_cached():
+    inner = Reasoner(report={"error": "timeout", "threat_detected": False})
+    cached = CachedVisionReasoner(inner)
+    cached.analyze_incident("a.mp4", FRAMES)
+    cached.analyze_incident("b.mp4", FRAMES)
+    assert inner.calls == 2
+
+
+def test_cached_report_is_a_private_copy():
+    inner = Reasoner()
+    cached = CachedVisionReasoner(inner)
+    report = cached.analyze_incident("a.mp4", FRAMES)
+    report["stream_id"] = "cam0"
+    hit = cached.analyze_incident("b.mp4", FRAMES)
+    hit["description"] = "changed"
+    assert "stream_id" not in cached.analyze_incident("c.mp4", FRAMES)
+    assert cached.analyze_incident("d.mp4", FRAMES)["description"] == "fight"
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(vlm_cache.time, "time", lambda: now[0])
+    inner = Reasoner()
+    cached = CachedVisionReasoner(inner, ttl_seconds=60)
+    cached.analyze_incident("a.mp4", FRAMES)
+    now[0] += 61
+    assert not cached.analyze_incident("b.mp4", FRAMES).get("cache_hit")
+    assert inner.calls == 2
+
+
+def test_least_recently_used_is_evicted():
+    inner = Reasoner()
+    cached = CachedVisionReasoner(inner, max_entries=2, max_hamming=0)
+    scenes = [[f"{i:016x}", f"{i:016x}"] for i in (0x1, 0xff00, 0xff0000)]
+    for i, frames in enumerate(scenes):
+        cached.analyze_incident(f"{i}.mp4", frames)
+    assert len(cached.entries) == 2
+    assert not cached.analyze_incident("again.mp4", scenes[0]).get("cache_hit")
+
+
+def test_prompt_change_invalidates():
+    cached = CachedVisionReasoner(Reasoner(prompt="fight?"))
+    cached.analyze_incident("a.mp4", FRAMES)
+    other = CachedVisionReasoner(Reasoner(prompt="weapon?"))
+    other.entries = cached.entries
+    assert not other.analyze_incident("b.mp4", FRAMES).get("cache_hit")
+
+
+def test_persists_across_restarts(tmp_path):
+    path = str(tmp_path / "vlm_cache.json")
+    CachedVisionReasoner(Reasoner(), path=path).analyze_incident("a.mp4", FRAMES)
+    inner = Reasoner()
+    restarted = CachedVisionReasoner(inner, path=path)
+    assert restarted.analyze_incident("b.mp4", FRAMES)["cache_hit"]
+    assert inner.calls == 0